@@ -1,12 +1,9 @@
 import streamlit as st
-import threading
-import queue
-import websocket
-import time
-import json
-from streamlit_autorefresh import st_autorefresh
 from utils.auth_utils import get_current_user
 from utils.auth_utils import require_auth, render_userbox
+from utils.assign_utils import get_user_assignments
+from utils.live_feed import sync_live_state
+from utils.alert_utils import render_live_alert_list
 
 # 페이지 설정
 st.set_page_config(
@@ -15,9 +12,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# 1초마다 자동 새로고침
-st_autorefresh(interval=1000, key="main_refresh")
-
 # 인증되지 않았다면 소개 페이지로 이동하여 인라인 로그인 유도
 user = get_current_user()
 if not user:
@@ -29,77 +23,15 @@ if not user:
 require_auth(allowed_roles=["clinician", "admin"])  # 인증 게이트
 render_userbox()
 
-# --- WebSocket 초기화 (백그라운드에서 실행) ---
-def ws_listener(q):
-    def on_message(ws, message):
-        print(f"[WebSocket] 메시지 수신: {message}")
-        q.put(message)
-
-    def on_error(ws, error):
-        print(f"[WebSocket] 오류 발생: {error}")
-
-    def on_close(ws, close_status_code, close_msg):
-        print(f"[WebSocket] 연결 종료됨: {close_status_code} {close_msg}")
-
-    def on_open(ws):
-        print("[WebSocket] 연결 성공")
-
-    ws = websocket.WebSocketApp("ws://localhost:6789",
-                              on_message=on_message,
-                              on_error=on_error,
-                              on_close=on_close,
-                              on_open=on_open)
-    ws.run_forever()
-
-# WebSocket 초기화 (세션 상태에 저장)
-if "queue" not in st.session_state:
-    st.session_state.queue = queue.Queue()
-
-if "loadcell_data" not in st.session_state:
-    st.session_state.loadcell_data = {}
-
-if "loadcell_history" not in st.session_state:
-    st.session_state.loadcell_history = {}
-
-# 스레드는 단 한 번만 시작되어야 합니다.
-if "ws_thread_started" not in st.session_state:
-    st.session_state.ws_thread_started = True
-    # 백그라운드에서 WebSocket 리스너 시작
-    threading.Thread(target=ws_listener, args=(st.session_state.queue,), daemon=True).start()
-    print("[Main] WebSocket 리스너 스레드 시작됨")
-
-# 백그라운드에서 메시지 처리 (데이터는 표시하지 않음)
-q = st.session_state.queue
-while not q.empty():
-    msg = q.get()
-    try:
-        data = json.loads(msg)
-        loadcel = data.get("loadcel")
-        if loadcel:
-            # float 캐스팅 시도
-            try:
-                current_weight = float(data.get("current_weight", 0))
-            except:
-                current_weight = 0
-            try:
-                remaining_sec = float(data.get("remaining_sec", -1))
-            except:
-                remaining_sec = -1
-            # 데이터를 세션 상태에 저장 (다른 페이지에서 사용)
-            st.session_state.loadcell_data[loadcel] = {
-                "current_weight": current_weight,
-                "remaining_sec": remaining_sec
-            }
-            # 디버그용 출력
-            print(f"[로드셀 데이터] id: {loadcel}, 무게: {current_weight}, 남은 시간: {remaining_sec}")
-            # 무게 히스토리 저장 (최대 30개)
-            if loadcel not in st.session_state.loadcell_history:
-                st.session_state.loadcell_history[loadcel] = []
-            st.session_state.loadcell_history[loadcel].append(current_weight)
-            if len(st.session_state.loadcell_history[loadcel]) > 30:
-                st.session_state.loadcell_history[loadcel] = st.session_state.loadcell_history[loadcel][-30:]
-    except Exception as e:
-        print(f"메시지 파싱 오류: {msg} | 오류: {e}")
+# --- 실시간 데이터: 서버 프로세스 공용 수신기(LiveFeed)에서 읽기 ---
+# 의료진은 배정된 장비만 보고, 관리자는 전체 폴대를 봅니다.
+if "subscribed_poles" not in st.session_state:
+    st.session_state.subscribed_poles = None
+    if user.get('role') == 'clinician':
+        st.session_state.subscribed_poles = get_user_assignments(user.get('username', ''))
+
+# 최신값/히스토리를 세션 상태에 반영 (다른 페이지에서 사용)
+sync_live_state()
 
 # 사이드바 내용 추가
 st.sidebar.header("Wake Up, It's a Hospital")
@@ -126,63 +58,9 @@ if "noti_open" not in st.session_state:
 def toggle_noti():
     st.session_state.noti_open = not st.session_state.noti_open
 
-# ====== 알림 템플릿 딕셔너리 ======
-ALERT_TEMPLATES = {
-    1: "{pole}번 폴대의 {bottle} 수액이 다 투여되었습니다.",
-    2: "{pole}번 폴대의 {bottle} 수액이 거의 다 되었습니다. (남은 시간: {remaining_sec:.0f}분, 무게: {current_weight:.1f}g)",
-    3: "{pole}번 폴대의 배터리가 거의 방전되었습니다. (남은 배터리: {battery:.0f}%",
-    4: "{pole}번 폴대에서 너스콜이 발생했습니다."
-}
-
-# ====== 알림 추가 함수 (ID와 파라미터 기반) ======
-def add_alert(alert_id, **params):
-    template = ALERT_TEMPLATES.get(alert_id)
-    if template is None:
-        return
-    msg = template.format(**params)
-    # 중복 방지: 같은 알림이 이미 있으면 추가하지 않음
-    key = (alert_id, tuple(sorted(params.items())))
-    if "alert_flags" not in st.session_state:
-        st.session_state.alert_flags = set()
-    if key in st.session_state.alert_flags:
-        return
-    st.session_state.alert_flags.add(key)
-    st.session_state.alert_list.append({
-        "id": alert_id,
-        "msg": msg,
-        "params": params
-    })
-
-# ====== 알림 리스트 및 플래그 초기화 ======
+# ====== 알림 리스트 초기화 ======
 if "alert_list" not in st.session_state:
     st.session_state.alert_list = []
-if "alert_flags" not in st.session_state:
-    st.session_state.alert_flags = set()
-
-# ====== 알림 조건 체크 및 이벤트 트리거 (ID/파라미터 기반으로 변경) ======
-# ALMOST_DONE_WEIGHT =300  # 50g 이하
-# DONE_WEIGHT = 150  # 5g 이하
-
-for loadcel, data in st.session_state.loadcell_data.items():
-    pole = loadcel  # 폴대 번호 (loadcel이 곧 폴대 번호라고 가정)
-    bottle = "오른쪽"     # 링거 번호 (예시, 실제 데이터에 맞게 수정)
-    # 각 장비별 임계값 불러오기
-    almost_key = f'alert_almost_weight_{loadcel}'
-    done_key = f'alert_done_weight_{loadcel}'
-    almost_weight = st.session_state.get(almost_key, 300)
-    done_weight = st.session_state.get(done_key, 150)
-    # 투여 거의 완료 (무게만으로 판단)
-    if (0 < data.get("current_weight", 99999) <= almost_weight):
-        add_alert(2, pole=pole, bottle=bottle, remaining_sec=data.get("remaining_sec", -1), current_weight=data.get("current_weight", 0))
-    # 투여 완료
-    if (0 < data.get("current_weight", 99999) <= done_weight):
-        add_alert(1, pole=pole, bottle=bottle)
-    # 배터리 부족
-    if "battery" in data and data["battery"] <= 20:  # 예시: 20% 이하일 때 알림
-        add_alert(3, pole=pole, battery=data["battery"])
-    # 너스콜
-    if data.get("nurse_call", False):
-        add_alert(4, pole=pole)
 
 # --- 1. 히어로 섹션 ---
 with st.container():
@@ -461,22 +339,10 @@ with st.container():
     </div>
     """, unsafe_allow_html=True)
 
-# ====== 사이드바에 알림 리스트 출력 ======
-st.sidebar.markdown("### 📋 알림")
-if st.session_state.get('alert_list'):
-    for alert in st.session_state['alert_list']:
-        if alert["id"] == 1:
-            st.sidebar.success(alert["msg"])
-        elif alert["id"] == 2:
-            st.sidebar.warning(alert["msg"])
-        elif alert["id"] == 3:
-            st.sidebar.error(alert["msg"])
-        elif alert["id"] == 4:
-            st.sidebar.error(alert["msg"])
-        else:
-            st.sidebar.info(alert["msg"])
-else:
-    st.sidebar.info("새로운 알림이 없습니다.")
+# ====== 브로드캐스터가 보낸 알림 이벤트 반영 + 사이드바에 알림 리스트 출력 ======
+# 페이지 전체 대신 이 조각(fragment)만 주기적으로 다시 실행합니다. (소개 섹션 HTML은 한 번만 그림)
+with st.sidebar:
+    render_live_alert_list()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,18 @@
 import streamlit as st
 import pandas as pd
-from streamlit_autorefresh import st_autorefresh
+import numpy as np
 import plotly.graph_objs as go
 import time
 import streamlit.components.v1 as components
-import json
-import boto3
+from utils.storage import get_table
 import os
 from datetime import datetime, timezone, timedelta
 import threading
 from utils.auth_utils import require_auth, render_userbox, get_current_user
+from utils.alert_utils import render_live_alert_list
+from utils.live_feed import get_live_feed, HISTORY_WINDOW, REFRESH_SECONDS
+from utils.ring_buffer import RingBuffer
+from utils.pole_grid import pole_grid, POLE_GRID_ENABLED
 
 KST = timezone(timedelta(hours=9))
 
@@ -22,31 +25,15 @@ if not user:
         st.stop()
 render_userbox()
 
-# 1초마다 자동 새로고침
-st_autorefresh(interval=1000, key="datarefresh")
-
 # 사이드바 내용 추가
 st.sidebar.header("실시간 대시보드")
 st.sidebar.write("수액의 현재 무게와")
 st.sidebar.write("남은 시간을 확인합니다.")
 st.sidebar.markdown("---")
 
-# ====== 사이드바에 알림 리스트 출력 ======
-st.sidebar.markdown("### 📋 알림")
-if st.session_state.get('alert_list'):
-    for alert in st.session_state['alert_list']:
-        if alert["id"] == 1:
-            st.sidebar.success(alert["msg"])
-        elif alert["id"] == 2:
-            st.sidebar.warning(alert["msg"])
-        elif alert["id"] == 3:
-            st.sidebar.error(alert["msg"])
-        elif alert["id"] == 4:
-            st.sidebar.error(alert["msg"])
-        else:
-            st.sidebar.info(alert["msg"])
-else:
-    st.sidebar.info("새로운 알림이 없습니다.")
+# ====== 사이드바에 알림 리스트 출력 (이 조각만 주기적으로 다시 실행) ======
+with st.sidebar:
+    render_live_alert_list()
 
 # ====== 시스템 상태 표시 ======
 st.sidebar.markdown("---")
@@ -78,42 +65,19 @@ except Exception as e:
 # --- UI 표시 ---
 st.title("실시간 대시보드")
 
-# 메인 페이지에서 이미 초기화된 session_state 데이터 사용
-loadcell_data = st.session_state.get('loadcell_data', {})
-loadcell_history = st.session_state.get('loadcell_history', {})
-
-# 추가 데이터 로드 및 통합
+# 추가(저장된) 데이터는 페이지 전체 실행 때 한 번만 읽어 폴대 카드 조각에 넘겨줍니다.
+additional_data = {}
+additional_history = {}
 try:
     from utils.dummy_data_utils import get_additional_data_for_dashboard_exclude_last, is_additional_data_available, get_additional_history_data_for_dashboard
     
     if is_additional_data_available():
         additional_data = get_additional_data_for_dashboard_exclude_last()
-        additional_history = get_additional_history_data_for_dashboard()
-        
-        # 추가 데이터를 session_state에 병합
-        for pole_id, pole_data in additional_data.items():
-            if pole_id not in loadcell_data:
-                loadcell_data[pole_id] = pole_data
-            else:
-                # 기존 데이터와 병합
-                loadcell_data[pole_id].update(pole_data)
-        
-        # 추가 히스토리 데이터를 session_state에 병합
-        if 'loadcell_history' not in st.session_state:
-            st.session_state.loadcell_history = {}
-        
-        for pole_id, history_list in additional_history.items():
-            if pole_id not in st.session_state.loadcell_history:
-                st.session_state.loadcell_history[pole_id] = []
-            # 기존 히스토리와 병합 (중복 제거)
-            existing_timestamps = {h[0] for h in st.session_state.loadcell_history[pole_id]}
-            for timestamp, weight in history_list:
-                if timestamp not in existing_timestamps:
-                    st.session_state.loadcell_history[pole_id].append((timestamp, weight))
-        
+        additional_history = {
+            pole_id: RingBuffer.from_items(history_list, HISTORY_WINDOW)
+            for pole_id, history_list in get_additional_history_data_for_dashboard().items()
+        }
         # 성공 메시지는 표시하지 않음 (사용자에게는 투명하게)
-    else:
-        pass
 except ImportError:
     # 유틸리티가 없는 경우 조용히 처리
     pass
@@ -121,14 +85,36 @@ except Exception as e:
     # 오류가 발생해도 사용자에게는 표시하지 않음
     pass
 
-# DynamoDB 연결 (환경변수나 credentials 필요)
-dynamodb = boto3.resource('dynamodb', region_name='ap-northeast-2')  # 리전은 실제 환경에 맞게 수정
+# 실시간 값은 서버 프로세스 공용 수신기(LiveFeed)에서 폴대 카드 조각이 직접 읽습니다.
+live_feed = get_live_feed()
+subscribed_poles = st.session_state.get("subscribed_poles")
+known_poles = set(live_feed.pole_ids(subscribed_poles)) | set(additional_data)
+
+def read_pole_values(loadcel_id):
+    """폴대 하나의 최신값 (실시간 값 위에 추가 데이터를 덮어씀, 둘 다 없으면 None)"""
+    live_values = live_feed.latest([loadcel_id]).get(loadcel_id)
+    extra_values = additional_data.get(loadcel_id)
+    if live_values is None and extra_values is None:
+        return None
+    return {**(live_values or {}), **(extra_values or {})}
+
+def read_pole_history(loadcel_id):
+    """폴대 하나의 그래프용 히스토리 (영점 시각 이후 실시간 히스토리 앞에 추가 히스토리를 붙인 RingBuffer, 없으면 None)"""
+    tare_time = st.session_state.get(f'tare_time_{loadcel_id}')
+    history = live_feed.history([loadcel_id], since={loadcel_id: tare_time} if tare_time else None).get(loadcel_id)
+    stored = additional_history.get(loadcel_id)
+    if stored is not None:
+        history = stored if history is None else history.with_earlier(stored, HISTORY_WINDOW)
+    return history
+
+# 저장소 연결 (STORAGE_BACKEND=dynamodb이면 AWS credentials 필요, sqlite이면 로컬 파일)
+# 테이블 핸들은 프로세스 공용 캐시에서 가져오므로 재실행마다 새로 만들지 않습니다.
 POLESTAT_TABLE = 'pole_stat'
-table_polestat = dynamodb.Table(POLESTAT_TABLE)
+table_polestat = get_table(POLESTAT_TABLE)
 LOADCELL_TABLE = 'loadcell'
-table_loadcell = dynamodb.Table(LOADCELL_TABLE)
+table_loadcell = get_table(LOADCELL_TABLE)
 TARE_TABLE = 'tare'
-table_tare = dynamodb.Table(TARE_TABLE)
+table_tare = get_table(TARE_TABLE)
 
 def set_tare_required(loadcel_id, value=True):
     timestamp = datetime.now(KST).isoformat()
@@ -146,82 +132,62 @@ def reset_tare_required(loadcel_id, delay=10):
     set_tare_required(loadcel_id, False)
     st.session_state[f"tare_in_progress_{loadcel_id}"] = False
 
-# WebSocket에서 받은 메시지 처리 (main.py와 동일하게)
-q = st.session_state.get("queue", None)
-if q is not None:
-    while not q.empty():
-        msg = q.get()
-        try:
-            data = json.loads(msg)
-            loadcel = data.get("loadcel")
-            timestamp = data.get("timestamp")
-            if loadcel:
-                try:
-                    current_weight = float(data.get("current_weight", 0))
-                except:
-                    current_weight = 0
-                # === 기존 서버에서 remaining_sec 받아오는 부분 주석처리 ===
-                # try:
-                #     remaining_sec = float(data.get("remaining_sec", -1))
-                # except:
-                #     remaining_sec = -1
-                # === 남은 시간 계산: 현재 무게 기반 ===
-                # 1kg = 1000g, 시간당 250ml(=250g) 소모, 남은 시간(초)
-                if 'weight_sec_calc' not in st.session_state:
-                    st.session_state['weight_sec_calc'] = {}
-                prev_sec = st.session_state['weight_sec_calc'].get(loadcel, None)
-                est_sec = (current_weight / 250) * 3600 if current_weight > 0 else -1
-                if est_sec > 0:
-                    est_sec = int((est_sec + 299) // 300) * 300
-                if prev_sec is not None and est_sec > prev_sec:
-                    est_sec = prev_sec
-                st.session_state['weight_sec_calc'][loadcel] = est_sec
-                weight_sec = est_sec
-                st.session_state.loadcell_data[loadcel] = {
-                    "current_weight": current_weight,
-                    # "weight_sec": weight_sec  # 서버 기반 남은 시간 저장 주석처리
-                }
-                if loadcel not in st.session_state.loadcell_history:
-                    st.session_state.loadcell_history[loadcel] = []
-                st.session_state.loadcell_history[loadcel].append((timestamp, current_weight))
-                if len(st.session_state.loadcell_history[loadcel]) > 30:
-                    st.session_state.loadcell_history[loadcel] = st.session_state.loadcell_history[loadcel][-30:]
-        except Exception as e:
-            print(f"메시지 파싱 오류: {msg} | 오류: {e}")
-
 # ====== 로컬 Tare(영점) 기능을 위한 offset 관리 ======
 if 'tare_offsets' not in st.session_state:
     st.session_state['tare_offsets'] = {}
 
-# 로드셀 ID 순서대로 정렬하여 항상 같은 순서로 표시
-for loadcel_id in sorted(loadcell_data.keys()):
-    values = loadcell_data[loadcel_id]
-    
-    st.write("---")
-    st.subheader(f"로드셀 #{loadcel_id}")
+# 원점 설정 버튼 및 피드백
+def send_tare_false(battery_level, is_lost):
+    import time
+    time.sleep(10)
+    timestamp = datetime.now(KST).isoformat()
+    table_polestat.put_item(
+        Item={
+            'pole_id': 1,
+            'timestamp': timestamp,
+            'battery_level': battery_level,
+            'is_lost': is_lost,
+            'tare_requested': False
+        }
+    )
 
-    # 원점 설정 버튼 및 피드백
-    def send_tare_false(battery_level, is_lost):
-        import time
-        time.sleep(10)
-        timestamp = datetime.now(KST).isoformat()
-        table_polestat.put_item(
-            Item={
-                'pole_id': 1,
-                'timestamp': timestamp,
-                'battery_level': battery_level,
-                'is_lost': is_lost,
-                'tare_requested': False
-            }
-        )
+@st.fragment(run_every=REFRESH_SECONDS)
+def render_live_cards():
+    """
+    폴대 카드 목록. 이 조각 하나만 REFRESH_SECONDS마다 다시 실행되고,
+    제목과 사이드바 등 나머지 화면은 다시 그리지 않습니다.
+    카드는 LiveFeed 수신 버전이 바뀐 폴대만 최신값/히스토리를 다시 읽어 그래프를 새로 만듭니다.
+    """
+    # 새 폴대 데이터가 들어오면 카드 목록을 다시 그리도록 페이지 전체를 다시 실행
+    if not set(live_feed.pole_ids(subscribed_poles)) <= known_poles:
+        st.rerun()
+    versions = live_feed.versions(subscribed_poles)
+    # 로드셀 ID 순서대로 정렬하여 항상 같은 순서로 표시
+    for loadcel_id in sorted(known_poles):
+        st.write("---")
+        st.subheader(f"로드셀 #{loadcel_id}")
+        render_pole_card(loadcel_id, versions.get(loadcel_id, 0))
+
+def render_pole_card(loadcel_id, version):
+    """
+    폴대 카드 하나 (무게/남은 시간/잔량 인디케이터/그래프).
+    수신 버전이 지난번과 같으면 세션에 보관한 최신값을, 영점 상태까지 같으면 그래프도 그대로 다시 씁니다.
+    """
+    cache = st.session_state.setdefault('pole_card_cache', {})
+    entry = cache.get(loadcel_id)
+    if entry is None or entry['version'] != version:
+        entry = cache[loadcel_id] = {'version': version, 'values': read_pole_values(loadcel_id),
+                                     'figure_key': None, 'figure': None}
+    values = entry['values']
+    if values is None:
+        st.info("ℹ️ 데이터가 없습니다.")
+        return
 
     # === 대시보드에서만 동작하는 Tare 버튼 ===
     tare_btn = st.button(f"영점 설정", key=f"tare_{loadcel_id}")
     if tare_btn:
         # 현재 값을 offset으로 저장
         st.session_state['tare_offsets'][loadcel_id] = values['current_weight']
-        # 그래프 히스토리도 리셋
-        st.session_state.loadcell_history[loadcel_id] = []
         # === 추가: 영점 시각 기록 및 full_weight 초기화 ===
         st.session_state[f'tare_time_{loadcel_id}'] = time.time()
         st.session_state[f'full_weight_{loadcel_id}'] = None
@@ -243,12 +209,12 @@ for loadcel_id in sorted(loadcell_data.keys()):
     if display_weight < 0:
         display_weight = 0
     display_weight = round(display_weight, 1)
-    # === weight_sec를 매번 계산 ===
-    if display_weight > 0:
-        weight_sec = (display_weight / 250) * 3600
-        weight_sec = int((weight_sec + 299) // 300) * 300
-    else:
-        weight_sec = -1
+    # === 남은 시간: 브로드캐스터 추정값 표시 ===
+    # 로컬 영점(tare)을 적용한 경우에만 추정 투여 속도로 영점 이후 무게를 환산합니다.
+    weight_sec = values.get('remaining_sec', -1)
+    flow_rate = values.get('flow_rate')
+    if tare_offset and flow_rate:
+        weight_sec = (display_weight / flow_rate) * 3600 if display_weight > 0 else -1
     # 데이터가 있는 로드셀만 그래프와 metric 표시
     if values['current_weight'] == 0 and weight_sec == -1:
         st.warning("수액이 연결되지 않았습니다.")
@@ -315,12 +281,54 @@ for loadcel_id in sorted(loadcell_data.keys()):
         col3.metric(label="수액 잔량", value="")
         col3.markdown(indicator_html, unsafe_allow_html=True)
         # plotly 그래프 추가 (history가 1개 이상일 때만)
-        history = loadcell_history.get(loadcel_id, [])
-        tuple_history = [h for h in history if isinstance(h, tuple) and len(h) == 2]
-        if tuple_history and not (values['current_weight'] == 0 and weight_sec == -1):
-            timestamps = [h[0] for h in tuple_history]
-            weights = [round(max(0, h[1] - tare_offset), 1) for h in tuple_history]
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=timestamps, y=weights, mode='lines+markers', name='무게'))
-            fig.update_layout(title="무게 변화 추이 (최근 30초, 대시보드 기준)", xaxis_title="시간", yaxis_title="무게")
-            st.plotly_chart(fig, use_container_width=True)
+        # 영점 버튼 처리 이후에 읽어야 영점 시각 이후 히스토리만 그래프에 표시됨
+        figure_key = (tare_offset, tare_time)
+        if entry['figure_key'] != figure_key:
+            history = read_pole_history(loadcel_id)
+            fig = None
+            if history is not None and len(history):
+                timestamps, weights = history.window(HISTORY_WINDOW)
+                weights = np.round(np.clip(weights - tare_offset, 0, None), 1)
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(x=timestamps, y=weights, mode='lines+markers', name='무게'))
+                fig.update_layout(title=f"무게 변화 추이 (최근 {HISTORY_WINDOW}개, 대시보드 기준)", xaxis_title="시간", yaxis_title="무게")
+            entry['figure'], entry['figure_key'] = fig, figure_key
+        if entry['figure'] is not None:
+            st.plotly_chart(entry['figure'], use_container_width=True)
+
+def handle_grid_action(action):
+    """실시간 그리드 컴포넌트가 보낸 사용자 동작을 세션 상태에 반영합니다."""
+    loadcel_id = str(action.get("pole"))
+    if action.get("action") == "tare":
+        # 현재 값을 offset으로 저장하고 영점 시각 기록, full_weight 초기화
+        st.session_state['tare_offsets'][loadcel_id] = float(action.get("weight") or 0)
+        st.session_state[f'tare_time_{loadcel_id}'] = time.time()
+        st.session_state[f'full_weight_{loadcel_id}'] = None
+    elif action.get("action") == "full_weight":
+        st.session_state[f'full_weight_{loadcel_id}'] = float(action.get("value") or 0) or None
+
+if POLE_GRID_ENABLED:
+    # 브라우저가 브로드캐스터 웹소켓을 직접 받아 그리므로,
+    # Python은 처음 한 번과 사용자 동작(영점 설정)이 있을 때만 다시 실행됩니다.
+    tare_state = {
+        loadcel_id: {
+            "offset": offset,
+            "tare_time": st.session_state.get(f'tare_time_{loadcel_id}'),
+            "full_weight": st.session_state.get(f'full_weight_{loadcel_id}'),
+        }
+        for loadcel_id, offset in st.session_state['tare_offsets'].items()
+    }
+    action = pole_grid(
+        poles=subscribed_poles,
+        initial={loadcel_id: read_pole_values(loadcel_id) for loadcel_id in known_poles},
+        tare=tare_state,
+        history_window=HISTORY_WINDOW,
+        key="pole_grid",
+    )
+    # 컴포넌트 값은 재실행 후에도 남아 있으므로 nonce로 한 번만 처리
+    if action and action.get("nonce") != st.session_state.get("pole_grid_nonce"):
+        st.session_state["pole_grid_nonce"] = action.get("nonce")
+        handle_grid_action(action)
+        st.rerun()
+else:
+    render_live_cards()
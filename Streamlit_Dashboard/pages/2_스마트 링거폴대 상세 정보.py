@@ -1,13 +1,11 @@
 import streamlit as st
 import pandas as pd
-import json
-# === 추가: DynamoDB 및 Key 임포트 ===
-import boto3
-from boto3.dynamodb.conditions import Key
 from utils.alert_utils import render_alert_sidebar, check_all_alerts
 from utils.logo_utils import show_logo
 from utils.auth_utils import require_auth, render_userbox, get_current_user
 from utils.assign_utils import require_device_access, get_user_assignments
+from utils.pole_stat_cache import get_pole_stat_cache
+from utils.live_feed import sync_live_state, merge_additional_history, HISTORY_WINDOW
 
 st.set_page_config(layout="wide")
 st.title("스마트 링거폴대 상세 정보")
@@ -86,8 +84,6 @@ st.sidebar.markdown("---")
 # ====== 알림 리스트 초기화 ======
 if "alert_list" not in st.session_state:
     st.session_state.alert_list = []
-if "alert_flags" not in st.session_state:
-    st.session_state.alert_flags = set()
 
 # ====== 통합 알림 체크 ======
 check_all_alerts()
@@ -95,42 +91,8 @@ check_all_alerts()
 # ====== 사이드바에 알림 리스트 출력 ======
 render_alert_sidebar()
 
-# WebSocket에서 받은 메시지 처리 (main.py와 동일하게)
-q = st.session_state.get("queue", None)
-if q is not None:
-    while not q.empty():
-        msg = q.get()
-        try:
-            data = json.loads(msg)
-            loadcel = data.get("loadcel")
-            timestamp = data.get("timestamp")
-            if loadcel:
-                try:
-                    current_weight = float(data.get("current_weight", 0))
-                except:
-                    current_weight = 0
-                # === 남은 시간 계산: 현재 무게 기반 ===
-                if current_weight > 0:
-                    remaining_sec = (current_weight / 250) * 3600
-                else:
-                    remaining_sec = -1
-                # 배터리 레벨 처리
-                try:
-                    battery_level = int(data.get("battery_level", -1)) if data.get("battery_level") is not None else None
-                except:
-                    battery_level = None
-                st.session_state.loadcell_data[loadcel] = {
-                    "current_weight": current_weight,
-                    "remaining_sec": remaining_sec,
-                    "battery_level": battery_level  # 배터리 레벨 추가
-                }
-                if loadcel not in st.session_state.loadcell_history:
-                    st.session_state.loadcell_history[loadcel] = []
-                st.session_state.loadcell_history[loadcel].append((timestamp, current_weight))
-                if len(st.session_state.loadcell_history[loadcel]) > 30:
-                    st.session_state.loadcell_history[loadcel] = st.session_state.loadcell_history[loadcel][-30:]
-        except Exception as e:
-            print(f"메시지 파싱 오류: {msg} | 오류: {e}")
+# 공용 수신기(LiveFeed)의 최신값/히스토리를 세션 상태에 반영
+sync_live_state()
 
 loadcell_data = st.session_state.get('loadcell_data', {})
 
@@ -145,23 +107,13 @@ try:
         # 추가 데이터를 session_state에 병합
         for pole_id, pole_data in additional_data.items():
             if pole_id not in loadcell_data:
-                loadcell_data[pole_id] = pole_data
+                loadcell_data[pole_id] = dict(pole_data)  # 캐시된 읽기 전용 뷰를 세션용 dict로 복사
             else:
                 # 기존 데이터와 병합
                 loadcell_data[pole_id].update(pole_data)
         
-        # 추가 히스토리 데이터를 session_state에 병합
-        if 'loadcell_history' not in st.session_state:
-            st.session_state.loadcell_history = {}
-        
-        for pole_id, history_list in additional_history.items():
-            if pole_id not in st.session_state.loadcell_history:
-                st.session_state.loadcell_history[pole_id] = []
-            # 기존 히스토리와 병합 (중복 제거)
-            existing_timestamps = {h[0] for h in st.session_state.loadcell_history[pole_id]}
-            for timestamp, weight in history_list:
-                if timestamp not in existing_timestamps:
-                    st.session_state.loadcell_history[pole_id].append((timestamp, weight))
+        # 추가 히스토리 데이터를 session_state에 병합 (실시간 히스토리보다 이전 구간만)
+        merge_additional_history(additional_history)
         
         # 성공 메시지는 표시하지 않음 (사용자에게는 투명하게)
     else:
@@ -187,11 +139,6 @@ else:
     if selected_device:
         require_device_access(selected_device)
 
-    # === 추가: DynamoDB 연결 ===
-    dynamodb = boto3.resource('dynamodb', region_name='ap-northeast-2')
-    POLESTAT_TABLE = 'pole_stat'
-    table_polestat = dynamodb.Table(POLESTAT_TABLE)
-
     if selected_device:
         st.write("---")
         st.header(f"{selected_device}번 폴대의 상세 정보")
@@ -199,16 +146,11 @@ else:
         # === 배터리 정보 조회 (웹소켓에서 받은 데이터 우선 사용) ===
         battery_level = device_data.get('battery_level', None)
         if battery_level is None:
-            # 웹소켓에서 받지 못한 경우 DynamoDB에서 조회
+            # 웹소켓에서 받지 못한 경우 프로세스 공용 pole_stat 캐시에서 조회 (메모리 조회만, DB 호출 없음)
             try:
-                response = table_polestat.query(
-                    KeyConditionExpression=Key('pole_id').eq(int(selected_device)),
-                    ScanIndexForward=False,  # 최신순 정렬
-                    Limit=1
-                )
-                if response.get('Items'):
-                    battery_level = response['Items'][0].get('battery_level', None)
-            except Exception as e:
+                cached_level = get_pole_stat_cache().battery_level(selected_device)
+                battery_level = int(float(cached_level)) if cached_level is not None else None
+            except (TypeError, ValueError):
                 battery_level = None
         # === 표시용 무게 계산 ===
         display_weight = device_data.get('current_weight', 0)
@@ -216,12 +158,9 @@ else:
         # === 4열 레이아웃 ===
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("현재 무게 (g)", f"{display_weight}g")
-        # === 남은 시간: 무게 기반 단순 계산 ===
-        if display_weight > 0:
-            remaining_sec = (display_weight / 250) * 3600
-        else:
-            remaining_sec = -1
-        if remaining_sec < 0:
+        # === 남은 시간: 브로드캐스터 추정값 표시 ===
+        remaining_sec = device_data.get('remaining_sec', -1) if display_weight > 0 else -1
+        if remaining_sec is None or remaining_sec < 0:
             remaining_str = '정보 없음'
         else:
             minutes = int((remaining_sec + 299) // 300) * 5
@@ -235,6 +174,12 @@ else:
                 else:
                     remaining_str = f"{hours}시간 {mins}분 이하"
         col2.metric("남은 시간", remaining_str)
+        # 추정 신뢰 구간 / 투여 속도
+        remaining_low = device_data.get('remaining_sec_low')
+        remaining_high = device_data.get('remaining_sec_high')
+        if remaining_sec is not None and remaining_sec >= 0 and remaining_low is not None:
+            high_str = f"{remaining_high // 60}분" if remaining_high is not None else "미정"
+            col2.caption(f"예상 범위: {remaining_low // 60}분 ~ {high_str} (투여 속도 {device_data.get('flow_rate', 0):.0f}g/h)")
         # 인디케이터
         full_weight = 1000
         percent = max(0, min(display_weight / full_weight, 1))
@@ -280,21 +225,22 @@ else:
         col4.metric("배터리 상태", "")
         col4.markdown(render_battery_bars(battery_level), unsafe_allow_html=True)
         # 무게 변화 plotly 그래프 (Overview와 동일)
-        st.subheader("무게 변화 추이 (최근 30개)")
+        st.subheader(f"무게 변화 추이 (최근 {HISTORY_WINDOW}개)")
         loadcell_history = st.session_state.get('loadcell_history', {})
-        history = loadcell_history.get(selected_device, [])
-        tuple_history = [h for h in history if isinstance(h, tuple) and len(h) == 2]
-        if tuple_history:
+        history = loadcell_history.get(selected_device)
+        has_history = history is not None and len(history) > 0
+        if has_history:
+            import numpy as np
             import plotly.graph_objs as go
-            timestamps = [h[0] for h in tuple_history]
-            weights = [round(max(0, h[1]), 1) for h in tuple_history]
+            timestamps, weights = history.window(HISTORY_WINDOW)
+            weights = np.round(np.clip(weights, 0, None), 1)
             fig = go.Figure()
             fig.add_trace(go.Scatter(x=timestamps, y=weights, mode='lines+markers', name='무게'))
-            fig.update_layout(title="무게 변화 추이 (최근 30개)", xaxis_title="시간", yaxis_title="무게")
+            fig.update_layout(title=f"무게 변화 추이 (최근 {HISTORY_WINDOW}개)", xaxis_title="시간", yaxis_title="무게")
             st.plotly_chart(fig, use_container_width=True)
         # 3. (향후 기능) 과거 데이터 차트
         st.subheader("시간별 무게 변화")
-        if tuple_history:
+        if has_history:
             st.line_chart(pd.DataFrame({'시간': timestamps, '무게': weights}).set_index('시간'))
         else:
             st.info("ℹ️ 데이터가 없습니다.")
@@ -1,5 +1,4 @@
 import streamlit as st
-import json
 import pandas as pd
 import plotly.express as px
 import numpy as np
@@ -10,48 +9,17 @@ from statsmodels.tsa.seasonal import STL
 from statsmodels.tsa.arima.model import ARIMA
 import statsmodels.api as sm
 from statsmodels.tsa.stattools import acf as sm_acf, pacf as sm_pacf
-import boto3
 import pytz
 from utils.alert_utils import render_alert_sidebar, check_all_alerts
 from utils.logo_utils import show_logo
 from utils.auth_utils import require_auth, render_userbox, get_current_user
+from utils.live_feed import sync_live_state
+from utils.history_store import read_history_df, HISTORY_COLUMNS
+from utils.storage import get_resource
+from utils.rollups import read_rollup_df
 
-# WebSocket에서 받은 메시지 처리 (main.py와 동일하게)
-q = st.session_state.get("queue", None)
-if q is not None:
-    while not q.empty():
-        msg = q.get()
-        try:
-            data = json.loads(msg)
-            loadcel = data.get("loadcel")
-            timestamp = data.get("timestamp")
-            if loadcel:
-                try:
-                    current_weight = float(data.get("current_weight", 0))
-                except:
-                    current_weight = 0
-                # === 남은 시간 계산: 현재 무게 기반 ===
-                if current_weight > 0:
-                    remaining_sec = (current_weight / 250) * 3600
-                else:
-                    remaining_sec = -1
-                # 배터리 레벨 처리
-                try:
-                    battery_level = int(data.get("battery_level", -1)) if data.get("battery_level") is not None else None
-                except:
-                    battery_level = None
-                st.session_state.loadcell_data[loadcel] = {
-                    "current_weight": current_weight,
-                    "remaining_sec": remaining_sec,
-                    "battery_level": battery_level  # 배터리 레벨 추가
-                }
-                if loadcel not in st.session_state.loadcell_history:
-                    st.session_state.loadcell_history[loadcel] = []
-                st.session_state.loadcell_history[loadcel].append((timestamp, current_weight))
-                if len(st.session_state.loadcell_history[loadcel]) > 30:
-                    st.session_state.loadcell_history[loadcel] = st.session_state.loadcell_history[loadcel][-30:]
-        except Exception as e:
-            print(f"메시지 파싱 오류: {msg} | 오류: {e}")
+# 공용 수신기(LiveFeed)의 최신값/히스토리를 세션 상태에 반영
+sync_live_state()
 
 user = get_current_user()
 if not user:
@@ -70,8 +38,6 @@ st.sidebar.markdown("---")
 # ====== 알림 리스트 초기화 ======
 if "alert_list" not in st.session_state:
     st.session_state.alert_list = []
-if "alert_flags" not in st.session_state:
-    st.session_state.alert_flags = set()
 
 # ====== 통합 알림 체크 ======
 check_all_alerts()
@@ -82,6 +48,19 @@ render_alert_sidebar()
 st.title("수액 사용 통계 분석")
 
 # 데이터 불러오기
+def convert_history_chunk(chunk):
+    """scan 청크의 문자열 값을 숫자/날짜로 변환 (청크 단위로 변환해 메모리 사용을 줄임)"""
+    chunk['current_weight_history'] = pd.to_numeric(chunk['current_weight_history'], errors='coerce')
+    # === 남은 시간: 브로드캐스터 추정기가 기록한 값 사용 ===
+    chunk['remaining_sec_history'] = pd.to_numeric(chunk['remaining_sec_history'], errors='coerce').fillna(-1)
+    chunk['timestamp'] = pd.to_datetime(chunk['timestamp'])
+    return chunk
+
+def load_db_history_df():
+    """히스토리 전체를 저장 형식(행 단위 / 시간 버킷)과 관계없이 행 단위 DataFrame으로 반환"""
+    dynamodb = get_resource()
+    return read_history_df(dynamodb, convert=convert_history_chunk)
+
 @st.cache_data
 def get_history_df():
     # 추가 데이터와 실제 DB 데이터를 병합하여 반환
@@ -95,51 +74,131 @@ def get_history_df():
             return df
         else:
             # 실제 DB 데이터 사용
-            dynamodb = boto3.resource('dynamodb', region_name='ap-northeast-2')
-            table = dynamodb.Table('loadcell_history')
-            response = table.scan()
-            items = response['Items']
-            df = pd.DataFrame(items)
-            if not df.empty:
-                df['current_weight_history'] = pd.to_numeric(df['current_weight_history'], errors='coerce')
-                # === 남은 시간 컬럼을 무게 기반으로 새로 계산 ===
-                df['remaining_sec_history'] = df['current_weight_history'].apply(lambda w: (w/250)*3600 if w > 0 else -1)
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-            return df
+            return load_db_history_df()
             
     except ImportError:
         # 추가 데이터 유틸리티가 없는 경우 실제 DB만 사용
-        dynamodb = boto3.resource('dynamodb', region_name='ap-northeast-2')
-        table = dynamodb.Table('loadcell_history')
-        response = table.scan()
-        items = response['Items']
-        df = pd.DataFrame(items)
-        if not df.empty:
-            df['current_weight_history'] = pd.to_numeric(df['current_weight_history'], errors='coerce')
-            df['remaining_sec_history'] = df['current_weight_history'].apply(lambda w: (w/250)*3600 if w > 0 else -1)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-        return df
+        return load_db_history_df()
     except Exception as e:
         st.error(f"❌ 데이터 로드 실패: {e}")
         return pd.DataFrame()
 
-df = get_history_df()
+@st.cache_data(ttl=60)
+def load_hourly_rollup(start, end, poles, tz=None):
+    """
+    브로드캐스터가 수집 시점에 유지하는 롤업에서 폴대별 시간당 사용량(g)을 읽습니다.
+    (1시간 티어, 보관 기간을 넘으면 1분 티어를 시간 단위로 다시 묶음)
+
+    Returns:
+        pd.DataFrame: loadcel, timestamp(시간 시작), usage(g). 추가 데이터 사용 중이거나 롤업이 없으면 빈 DataFrame
+    """
+    try:
+        from utils.dummy_data_utils import is_additional_data_available
+        if is_additional_data_available():
+            return pd.DataFrame()
+    except ImportError:
+        pass
+    try:
+        dynamodb = get_resource()
+        rollup = read_rollup_df(dynamodb, 3600, start, end, list(poles))
+    except Exception:
+        return pd.DataFrame()
+    if rollup.empty:
+        return pd.DataFrame()
+    rollup['timestamp'] = pd.to_datetime(rollup['timestamp'], utc=True)
+    if tz is not None:
+        rollup['timestamp'] = rollup['timestamp'].dt.tz_convert(tz)
+    rollup['timestamp'] = rollup['timestamp'].dt.floor('h')
+    return rollup.groupby(['loadcel', 'timestamp'], as_index=False)['usage'].sum()
+
+@st.cache_data(ttl=60)
+def load_daily_rollup():
+    """
+    롤업에서 폴대별 일별 측정수/평균을 읽습니다. (1일 티어, 보관 기간을 넘으면 1시간 티어)
+    상단 카드, 장비 목록, 기간 기본값은 원본 히스토리 대신 이 값으로 만듭니다.
+
+    Returns:
+        pd.DataFrame: loadcel, timestamp(구간 시작), day(현지 날짜), count, mean, ...
+        추가 데이터 사용 중이거나 롤업이 없으면 빈 DataFrame (원본 히스토리 사용)
+    """
+    try:
+        from utils.dummy_data_utils import is_additional_data_available
+        if is_additional_data_available():
+            return pd.DataFrame()
+    except ImportError:
+        pass
+    try:
+        rollup = read_rollup_df(get_resource(), 86400)
+    except Exception:
+        return pd.DataFrame()
+    if rollup.empty:
+        return pd.DataFrame()
+    # 일 구간은 샘플 시간대의 자정에서 시작하므로 현지 시각 기준 날짜로 묶음
+    rollup['day'] = pd.to_datetime([t.replace(tzinfo=None) for t in rollup['timestamp']]).normalize()
+    return rollup
+
+@st.cache_data(ttl=60)
+def load_history_range(start, end, poles):
+    """
+    선택한 기간/장비의 원본 히스토리만 읽습니다. (그래프/분석처럼 샘플 단위가 필요한 부분에서 사용)
+
+    Args:
+        start / end: 기간 시작 / 끝 (시간대 포함)
+        poles: 폴대 ID 튜플
+    """
+    poles = [str(p) for p in poles]
+    frame = read_history_df(get_resource(), start, end, poles, convert=convert_history_chunk)
+    if frame.empty:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    # 비교할 수 있도록 시각을 기간의 시간대로 맞춤
+    if frame['timestamp'].dt.tz is None:
+        frame['timestamp'] = frame['timestamp'].dt.tz_localize(start.tz)
+    else:
+        frame['timestamp'] = frame['timestamp'].dt.tz_convert(start.tz)
+    return frame[frame['loadcel'].isin(poles) & (frame['timestamp'] >= start) & (frame['timestamp'] <= end)]
+
+def hourly_usage_from_history(history):
+    """롤업이 없을 때 원본 히스토리에서 폴대별 시간당 사용량(g)을 계산합니다. (직전 대비 감소분의 합)"""
+    tmp = history.sort_values(['loadcel', 'timestamp'])
+    tmp = tmp.assign(
+        usage=(-tmp.groupby('loadcel')['current_weight_history'].diff()).clip(lower=0).fillna(0),
+        timestamp=tmp['timestamp'].dt.floor('h'),
+    )
+    return tmp.groupby(['loadcel', 'timestamp'], as_index=False)['usage'].sum()
+
+# 일별 롤업이 있으면 카드/필터는 롤업으로 만들고, 원본 히스토리는 선택한 기간/장비만 읽음
+daily = load_daily_rollup()
+if daily.empty:
+    df = get_history_df()
+    base = df
+    if not df.empty:
+        tz = df['timestamp'].dt.tz
+        # 일별 무게 합계 (현지 날짜 기준)
+        local = df['timestamp'].dt.tz_localize(None) if tz is not None else df['timestamp']
+        day_totals = pd.DataFrame({'day': local.dt.normalize(), 'total': df['current_weight_history']})
+        first_date, last_date = df['timestamp'].min().date(), df['timestamp'].max().date()
+else:
+    df = None
+    base = daily
+    tz = daily['timestamp'].iloc[0].tzinfo
+    # 일별 평균 x 측정수 = 그날 무게 합계
+    day_totals = pd.DataFrame({'day': daily['day'], 'total': daily['mean'] * daily['count']})
+    first_date, last_date = daily['day'].min().date(), daily['day'].max().date()
 
 # === 상단 카드 요약 ===
-if not df.empty:
-    tz = df['timestamp'].dt.tz
-    today = pd.Timestamp.now(tz=tz).normalize()
+if not base.empty:
+    today = pd.Timestamp.now(tz=tz).normalize().replace(tzinfo=None)
     week_start = today - pd.Timedelta(days=today.weekday())
     month_start = today.replace(day=1)
-    today_sum = df[df['timestamp'].dt.date == today.date()]['current_weight_history'].sum() / 1000
-    week_sum = df[(df['timestamp'] >= week_start)]['current_weight_history'].sum() / 1000
-    month_sum = df[(df['timestamp'] >= month_start)]['current_weight_history'].sum() / 1000
+    today_sum = day_totals[day_totals['day'] == today]['total'].sum() / 1000
+    week_sum = day_totals[day_totals['day'] >= week_start]['total'].sum() / 1000
+    month_sum = day_totals[day_totals['day'] >= month_start]['total'].sum() / 1000
     col1, col2, col3 = st.columns(3)
     col1.metric("오늘 총 사용량", f"{today_sum:.1f}kg")
     col2.metric("이번주 총 사용량", f"{week_sum:.1f}kg")
     col3.metric("이번달 총 사용량", f"{month_sum:.1f}kg")
 
-if df.empty:
+if base.empty:
     st.warning("아직 기록된 데이터가 없습니다.")
 else:
     # 1. 기간/장비별 필터
@@ -151,26 +210,26 @@ else:
         
         if is_additional_data_available():
             # 더미데이터에서 사용 가능한 모든 폴대 ID
-            additional_pole_ids = get_additional_pole_ids()
+            additional_pole_ids = list(get_additional_pole_ids())
             # 실제 데이터에서 가져온 폴대 ID와 병합
-            data_pole_ids = df['loadcel'].unique().tolist()
+            data_pole_ids = base['loadcel'].unique().tolist()
             all_pole_ids = list(set(data_pole_ids + additional_pole_ids))
             # 숫자 순서로 정렬
             all_pole_ids.sort(key=lambda x: int(x) if str(x).isdigit() else 0)
             loadcel_options = all_pole_ids
         else:
             # 더미데이터가 없는 경우 기존 방식 사용
-            loadcel_options = df['loadcel'].unique().tolist()
+            loadcel_options = base['loadcel'].unique().tolist()
     except ImportError:
         # 유틸리티가 없는 경우 기존 방식 사용
-        loadcel_options = df['loadcel'].unique().tolist()
+        loadcel_options = base['loadcel'].unique().tolist()
     except Exception:
         # 오류 발생 시 기존 방식 사용
-        loadcel_options = df['loadcel'].unique().tolist()
+        loadcel_options = base['loadcel'].unique().tolist()
     
     selected_loadcel = st.sidebar.multiselect("장비 선택", loadcel_options, default=loadcel_options)
-    start_date = st.sidebar.date_input("시작일", df['timestamp'].min().date())
-    end_date = st.sidebar.date_input("종료일", df['timestamp'].max().date())
+    start_date = st.sidebar.date_input("시작일", first_date)
+    end_date = st.sidebar.date_input("종료일", last_date)
     
     # === 상관관계 분석 파라미터 ===
     st.sidebar.markdown("---")
@@ -217,8 +276,7 @@ else:
     order_d = st.sidebar.slider("ARIMA d(예측)", 0, 2, 1, key="fc_d", help="차분 차수입니다. 데이터의 안정성을 확보하기 위해 사용됩니다. 높을수록 더 안정적인 데이터로 변환합니다.")
     order_q = st.sidebar.slider("ARIMA q(예측)", 0, 3, 1, key="fc_q", help="이동평균 차수입니다. 과거 예측 오차들이 현재에 미치는 영향을 설정합니다. 높을수록 정교한 오차 패턴을 모델링합니다.")
 
-    # 타임존 정보 추출 및 일치화
-    tz = df['timestamp'].dt.tz if df['timestamp'].dt.tz is not None else None
+    # 타임존 정보 일치화 (tz는 상단에서 데이터 기준으로 추출)
     start_dt = pd.Timestamp(start_date)
     end_dt = pd.Timestamp(end_date) + pd.Timedelta(days=1)
     if tz is not None:
@@ -230,6 +288,8 @@ else:
             end_dt = end_dt.tz_localize(tz)
         else:
             end_dt = end_dt.tz_convert(tz)
+    if df is None:
+        df = load_history_range(start_dt, end_dt, tuple(selected_loadcel))
 
     filtered = df[
         (df['loadcel'].isin(selected_loadcel)) &
@@ -260,6 +320,12 @@ else:
         filtered_clean['prev_weight'] = filtered_clean.groupby('loadcel')['current_weight_history'].shift(1)
         filtered_clean['usage'] = (filtered_clean['prev_weight'] - filtered_clean['current_weight_history']).clip(lower=0) / 1000
         
+        # 시간당 사용량(g): 수집 시점 롤업을 우선 사용하고, 없으면 원본 히스토리에서 계산
+        hourly_usage = load_hourly_rollup(start_dt, end_dt, tuple(str(p) for p in selected_loadcel),
+                                          str(tz) if tz is not None else None)
+        if hourly_usage.empty:
+            hourly_usage = hourly_usage_from_history(filtered_clean)
+        
         # 감소량(usage, g) 기준으로 라인차트 표시
         # 감소량이 0인 데이터는 제외하고, 단위를 g로 변환
         filtered_clean_nonzero = filtered_clean[filtered_clean['usage'] > 0].copy()
@@ -306,11 +372,10 @@ with col1:
         usage_sum=('usage', 'sum')
     )
     
-    # 시간대별 사용량 테이블 생성 (원본 데이터)
-    usage_by_hour = filtered_clean.groupby(['hour', 'loadcel'])['usage'].sum().reset_index()
-    
-    # kg을 g로 변환 (1000 곱하기)
-    usage_by_hour['usage_g'] = usage_by_hour['usage'] * 1000
+    # 시간대별 사용량 테이블 생성 (시간당 사용량 롤업 기준)
+    usage_by_hour = (hourly_usage.assign(hour=hourly_usage['timestamp'].dt.hour)
+                     .groupby(['hour', 'loadcel'])['usage'].sum().reset_index())
+    usage_by_hour['usage_g'] = usage_by_hour['usage']
     
     # 피벗 테이블로 변환 (g 단위)
     usage_pivot = usage_by_hour.pivot(index='hour', columns='loadcel', values='usage_g').fillna(0)
@@ -1527,16 +1592,13 @@ with st.expander("요일-시간대 히트맵 (평균 사용량)", expanded=False
     if filtered_clean.empty:
         st.info("데이터가 없어 히트맵을 만들 수 없습니다.")
     else:
-        tmp2 = filtered_clean.copy().sort_values('timestamp')
-        tmp2['prev_weight'] = tmp2.groupby('loadcel')['current_weight_history'].shift(1)
-        tmp2['usage'] = (tmp2['prev_weight'] - tmp2['current_weight_history']).clip(lower=0)  # kg 단위 유지
-        tmp2['hour'] = tmp2['timestamp'].dt.hour
-        tmp2['weekday'] = tmp2['timestamp'].dt.weekday
+        # 시간당 사용량 롤업을 요일 x 시간대로 평균 (원본 행을 다시 훑지 않음)
+        tmp2 = hourly_usage.assign(
+            hour=hourly_usage['timestamp'].dt.hour,
+            weekday=hourly_usage['timestamp'].dt.weekday,
+        )
         heat = tmp2.groupby(['weekday', 'hour'])['usage'].mean().reset_index()
-        heat_pivot = heat.pivot(index='weekday', columns='hour', values='usage').fillna(0)
-        
-        # kg을 g으로 변환 (1000 곱하기)
-        heat_pivot_g = heat_pivot * 1000
+        heat_pivot_g = heat.pivot(index='weekday', columns='hour', values='usage').fillna(0)
         
         figh = px.imshow(heat_pivot_g, text_auto=True, color_continuous_scale='Blues')
         figh.update_layout(title="요일-시간대 평균 사용량(g)")
@@ -1,7 +1,5 @@
 import streamlit as st
-import json
 import pandas as pd
-import boto3
 from fpdf import FPDF
 import tempfile
 import os
@@ -9,6 +7,10 @@ import io
 from utils.alert_utils import render_alert_sidebar, check_all_alerts
 from utils.logo_utils import show_logo
 from utils.auth_utils import require_auth, render_userbox, get_current_user
+from utils.live_feed import sync_live_state
+from utils.history_store import read_history_df, HISTORY_COLUMNS
+from utils.storage import get_resource
+from utils.rollups import read_rollup_df
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
@@ -16,41 +18,8 @@ from sklearn.cluster import KMeans
 from statsmodels.tsa.seasonal import STL
 import statsmodels.api as sm
 
-# WebSocket에서 받은 메시지 처리 (main.py와 동일하게)
-q = st.session_state.get("queue", None)
-if q is not None:
-    while not q.empty():
-        msg = q.get()
-        try:
-            data = json.loads(msg)
-            loadcel = data.get("loadcel")
-            timestamp = data.get("timestamp")
-            if loadcel:
-                try:
-                    current_weight = float(data.get("current_weight", 0))
-                except:
-                    current_weight = 0
-                try:
-                    remaining_sec = float(data.get("remaining_sec", -1))
-                except:
-                    remaining_sec = -1
-                # 배터리 레벨 처리
-                try:
-                    battery_level = int(data.get("battery_level", -1)) if data.get("battery_level") is not None else None
-                except:
-                    battery_level = None
-                st.session_state.loadcell_data[loadcel] = {
-                    "current_weight": current_weight,
-                    "remaining_sec": remaining_sec,
-                    "battery_level": battery_level  # 배터리 레벨 추가
-                }
-                if loadcel not in st.session_state.loadcell_history:
-                    st.session_state.loadcell_history[loadcel] = []
-                st.session_state.loadcell_history[loadcel].append((timestamp, current_weight))
-                if len(st.session_state.loadcell_history[loadcel]) > 30:
-                    st.session_state.loadcell_history[loadcel] = st.session_state.loadcell_history[loadcel][-30:]
-        except Exception as e:
-            print(f"메시지 파싱 오류: {msg} | 오류: {e}")
+# 공용 수신기(LiveFeed)의 최신값/히스토리를 세션 상태에 반영
+sync_live_state()
 
 user = get_current_user()
 if not user:
@@ -69,8 +38,6 @@ st.sidebar.markdown("---")
 # ====== 알림 리스트 초기화 ======
 if "alert_list" not in st.session_state:
     st.session_state.alert_list = []
-if "alert_flags" not in st.session_state:
-    st.session_state.alert_flags = set()
 
 # ====== 통합 알림 체크 ======
 check_all_alerts()
@@ -101,6 +68,18 @@ except Exception as e:
     st.sidebar.error(f"❌ 데이터 상태 확인 실패")
 
 # DynamoDB에서 데이터 불러오기 함수
+def convert_history_chunk(chunk):
+    """scan 청크의 문자열 값을 숫자/날짜로 변환 (청크 단위로 변환해 메모리 사용을 줄임)"""
+    chunk['current_weight_history'] = pd.to_numeric(chunk['current_weight_history'], errors='coerce')
+    chunk['remaining_sec_history'] = pd.to_numeric(chunk['remaining_sec_history'], errors='coerce')
+    chunk['timestamp'] = pd.to_datetime(chunk['timestamp'])
+    return chunk
+
+def load_db_history_df():
+    """히스토리 전체를 저장 형식(행 단위 / 시간 버킷)과 관계없이 행 단위 DataFrame으로 반환"""
+    dynamodb = get_resource()
+    return read_history_df(dynamodb, convert=convert_history_chunk)
+
 @st.cache_data
 def get_history_df():
     # 추가 데이터와 실제 DB 데이터를 병합하여 반환
@@ -114,54 +93,89 @@ def get_history_df():
             return df
         else:
             # 실제 DB 데이터 사용
-            dynamodb = boto3.resource('dynamodb', region_name='ap-northeast-2')
-            table = dynamodb.Table('loadcell_history')
-            response = table.scan()
-            items = response['Items']
-            df = pd.DataFrame(items)
-            if not df.empty:
-                df['current_weight_history'] = pd.to_numeric(df['current_weight_history'], errors='coerce')
-                df['remaining_sec_history'] = pd.to_numeric(df['remaining_sec_history'], errors='coerce')
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-            return df
+            return load_db_history_df()
             
     except ImportError:
         # 추가 데이터 유틸리티가 없는 경우 실제 DB만 사용
-        dynamodb = boto3.resource('dynamodb', region_name='ap-northeast-2')
-        table = dynamodb.Table('loadcell_history')
-        response = table.scan()
-        items = response['Items']
-        df = pd.DataFrame(items)
-        if not df.empty:
-            df['current_weight_history'] = pd.to_numeric(df['current_weight_history'], errors='coerce')
-            df['remaining_sec_history'] = pd.to_numeric(df['remaining_sec_history'], errors='coerce')
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-        return df
+        return load_db_history_df()
     except Exception as e:
         st.error(f"❌ 데이터 로드 실패: {e}")
         return pd.DataFrame()
 
+@st.cache_data(ttl=60)
+def load_daily_rollup():
+    """
+    브로드캐스터가 수집 시점에 유지하는 일별 롤업을 읽습니다. (1일 티어, 보관 기간을 넘으면 1시간 티어)
+    기간 목록과 장비별 통계 요약은 원본 히스토리 대신 이 값으로 만듭니다.
+
+    Returns:
+        pd.DataFrame: loadcel, timestamp(구간 시작), day(현지 날짜), count, mean, min, max, usage.
+        추가 데이터 사용 중이거나 롤업이 없으면 빈 DataFrame (원본 히스토리 사용)
+    """
+    try:
+        from utils.dummy_data_utils import is_additional_data_available
+        if is_additional_data_available():
+            return pd.DataFrame()
+    except ImportError:
+        pass
+    try:
+        rollup = read_rollup_df(get_resource(), 86400)
+    except Exception:
+        return pd.DataFrame()
+    if rollup.empty:
+        return pd.DataFrame()
+    # 일 구간은 샘플 시간대의 자정에서 시작하므로 현지 시각 기준 날짜로 묶음
+    rollup['day'] = pd.to_datetime([t.replace(tzinfo=None) for t in rollup['timestamp']]).normalize()
+    return rollup
+
+@st.cache_data(ttl=60)
+def load_period_history(start, end):
+    """
+    보고서 기간의 원본 히스토리 (이상치/무게 기록/고급 분석처럼 샘플 단위가 필요한 항목에서만 읽음)
+
+    Args:
+        start / end: 기간 시작 / 끝 (시간대 포함, end는 포함하지 않음)
+    """
+    frame = read_history_df(get_resource(), start, end, convert=convert_history_chunk)
+    if frame.empty:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    tz = frame['timestamp'].dt.tz
+    start, end = (start.tz_convert(tz), end.tz_convert(tz)) if tz is not None else (start.tz_localize(None), end.tz_localize(None))
+    return frame[(frame['timestamp'] >= start) & (frame['timestamp'] < end)].sort_values(['loadcel', 'timestamp'])
+
+def summarize_rollup(rollup):
+    """일별 롤업을 장비별 측정수/평균/최소/최대로 합칩니다. (원본 샘플의 count/mean/min과 같은 값)"""
+    totals = rollup.assign(total=rollup['mean'] * rollup['count'])
+    stats = totals.groupby('loadcel').agg(count=('count', 'sum'), total=('total', 'sum'),
+                                          min=('min', 'min'), max=('max', 'max'))
+    stats['mean'] = stats['total'] / stats['count']
+    return stats[['count', 'mean', 'min', 'max']]
+
 st.title("보고서 생성")
 
-df = get_history_df()
+# 일별 롤업이 있으면 기간/통계는 롤업으로 만들고, 원본 히스토리는 샘플 단위 항목에서만 기간만큼 읽음
+daily = load_daily_rollup()
+df = get_history_df() if daily.empty else pd.DataFrame(columns=HISTORY_COLUMNS)
 
 st.write("---")
 st.subheader("보고서 생성")
 
-if not df.empty:
+if not daily.empty or not df.empty:
     # === 보고서 유형 선택 ===
     report_type = st.radio("보고서 유형 선택", ["월간", "주간", "일간"], horizontal=True)
+    # 기간 키는 행마다 만들지 않고 데이터가 있는 날짜에 대해서만 계산합니다.
+    days = pd.Series(daily['day'].unique() if not daily.empty else df['timestamp'].dt.normalize().unique())
     if report_type == "월간":
-        df['period'] = df['timestamp'].dt.strftime('%Y-%m')
-        period_options = sorted(df['period'].unique(), reverse=True)
+        day_periods = days.dt.strftime('%Y-%m')
+        period_options = sorted(day_periods.unique(), reverse=True)
         period_labels = [f"{m[:4]}년 {int(m[5:]):02d}월" for m in period_options]
     elif report_type == "주간":
-        df['period'] = df['timestamp'].dt.strftime('%Y-%U')
-        period_options = sorted(df['period'].unique(), reverse=True)
+        day_periods = days.dt.strftime('%Y-%U')
+        period_options = sorted(day_periods.unique(), reverse=True)
         period_labels = [f"{m[:4]}년 {int(m[5:]):02d}주" for m in period_options]
     else:
-        df['period'] = df['timestamp'].dt.strftime('%Y-%m-%d')
-        period_options = sorted(df['period'].unique(), reverse=True)
+        day_periods = days.dt.strftime('%Y-%m-%d')
+        period_options = sorted(day_periods.unique(), reverse=True)
         period_labels = [f"{m[:4]}년 {int(m[5:7])}월 {int(m[8:]):02d}일" for m in period_options]
     period_map = dict(zip(period_labels, period_options))
     selected_label = st.selectbox("보고서 생성 기간 선택:", period_labels)
@@ -171,9 +185,7 @@ if not df.empty:
     include_stats = st.checkbox("장비별 통계 요약", value=True)
     include_outlier = st.checkbox("이상치(급격한 변화) 기록", value=True)
     include_graph = st.checkbox("그래프 포함", value=True)
-    # === 데이터 필터링 ===
-    period_df = df[df['period'] == selected_period]
-    # === 고급 통계 옵션 (period_df 생성 이후) ===
+    # === 고급 통계 옵션 ===
     st.markdown("---")
     st.subheader("고급 통계 옵션")
     include_corr = st.checkbox("상관관계 분석 포함", value=False)
@@ -185,11 +197,28 @@ if not df.empty:
     corr_freq_label = st.selectbox("고급 분석 집계 간격(상관/회귀)", ["15분", "30분", "1시간"], index=2)
     freq_map = {"15분": "15T", "30분": "30T", "1시간": "1H"}
     agg_freq = freq_map[corr_freq_label]
+    # === 데이터 필터링 ===
+    # 기간은 연속된 날짜이므로 첫날 0시 ~ 마지막 날 다음 날 0시 구간으로 자릅니다.
+    period_days = days[day_periods == selected_period]
+    period_start, period_end = period_days.min(), period_days.max() + pd.Timedelta(days=1)
+    if daily.empty:
+        period_rollup = None
+        period_df = df[(df['timestamp'] >= period_start) & (df['timestamp'] < period_end)]
+        period_poles = period_df['loadcel'].unique().tolist()
+    else:
+        period_rollup = daily[(daily['day'] >= period_start) & (daily['day'] < period_end)]
+        period_poles = period_rollup['loadcel'].unique().tolist()
+        # 샘플 단위가 필요한 항목을 고른 경우에만 이 기간의 원본 히스토리를 읽음
+        needs_samples = (include_outlier or include_graph or include_corr or include_trend_adv or
+                         include_kmeans or include_reg or include_pca or include_stl)
+        tz = daily['timestamp'].iloc[0].tzinfo
+        period_df = (load_period_history(period_start.tz_localize(tz), period_end.tz_localize(tz))
+                     if needs_samples and not period_rollup.empty else pd.DataFrame(columns=HISTORY_COLUMNS))
     stl_device = None
     if include_stl:
-        choices = sorted(period_df['loadcel'].unique().tolist()) if not period_df.empty else []
+        choices = sorted(period_poles)
         stl_device = st.selectbox("STL 대상 장비", choices) if choices else None
-    if period_df.empty:
+    if not period_poles:
         st.info("해당 기간에 데이터가 없습니다.")
     else:
         # === 미리보기 ===
@@ -197,17 +226,23 @@ if not df.empty:
         st.subheader("보고서 미리보기")
         if include_stats:
             st.write("#### 장비별 통계 요약")
-            stats = period_df.groupby('loadcel')['current_weight_history'].agg(['count', 'mean', 'min'])
-            
-            # 상위 1% 중간값 계산
-            top_1_percent_values = []
-            for loadcel in stats.index:
-                loadcel_data = period_df[period_df['loadcel'] == loadcel]['current_weight_history']
-                if len(loadcel_data) > 0:
-                    top_1_percent = loadcel_data.quantile(0.99)
-                    top_1_percent_values.append(top_1_percent)
-                else:
-                    top_1_percent_values.append(0)
+            if period_rollup is not None:
+                # 롤업에는 분위수가 없으므로 최대는 구간 최댓값 사용
+                rollup_stats = summarize_rollup(period_rollup)
+                stats = rollup_stats[['count', 'mean', 'min']].copy()
+                top_1_percent_values = rollup_stats['max'].tolist()
+            else:
+                stats = period_df.groupby('loadcel')['current_weight_history'].agg(['count', 'mean', 'min'])
+                
+                # 상위 1% 중간값 계산
+                top_1_percent_values = []
+                for loadcel in stats.index:
+                    loadcel_data = period_df[period_df['loadcel'] == loadcel]['current_weight_history']
+                    if len(loadcel_data) > 0:
+                        top_1_percent = loadcel_data.quantile(0.99)
+                        top_1_percent_values.append(top_1_percent)
+                    else:
+                        top_1_percent_values.append(0)
             
             stats['top_1_percent'] = top_1_percent_values
             stats_renamed = stats.rename(columns={'count': '측정수', 'mean': '평균(g)', 'min': '최소(g)', 'top_1_percent': '최대(g)'})
@@ -277,7 +312,9 @@ if not df.empty:
         # === PDF/CSV 다운로드 ===
         st.write("---")
         st.subheader("보고서 다운로드")
-        csv = period_df.to_csv(index=False).encode('utf-8-sig')
+        # 원본 히스토리를 읽지 않은 경우 일별 롤업을 내려받음
+        csv_df = period_df if period_rollup is None or not period_df.empty else period_rollup.drop(columns=['day'])
+        csv = csv_df.to_csv(index=False).encode('utf-8-sig')
         st.download_button(
             label="CSV로 다운로드",
             data=csv,
@@ -750,19 +787,8 @@ if not df.empty:
             return tmpfile
         # 3. PDF 다운로드 버튼 (옵션별 포함)
         if include_stats:
-            # stats, outlier, fig 등 준비
-            # 상위 1% 중간값 계산
-            top_1_percent_values = []
-            for loadcel in stats.index:
-                loadcel_data = period_df[period_df['loadcel'] == loadcel]['current_weight_history']
-                if len(loadcel_data) > 0:
-                    top_1_percent = loadcel_data.quantile(0.99)
-                    top_1_percent_values.append(top_1_percent)
-                else:
-                    top_1_percent_values.append(0)
-            
+            # stats, outlier, fig 등 준비 (최대값은 미리보기에서 계산한 값 사용)
             stats_with_top1 = stats.copy()
-            stats_with_top1['top_1_percent'] = top_1_percent_values
             stats_df = stats_with_top1.rename(columns={'count': '측정수', 'mean': '평균', 'min': '최소', 'top_1_percent': '최대'}) if include_stats else None
             outlier_df = outlier[['loadcel', 'timestamp', 'current_weight_history', 'diff']] if include_outlier and 'outlier' in locals() and not outlier.empty else None
             
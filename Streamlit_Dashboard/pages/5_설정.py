@@ -25,8 +25,6 @@ st.sidebar.markdown("---")
 # ====== 알림 리스트 초기화 ======
 if "alert_list" not in st.session_state:
     st.session_state.alert_list = []
-if "alert_flags" not in st.session_state:
-    st.session_state.alert_flags = set()
 
 # ====== 통합 알림 체크 ======
 check_all_alerts()
@@ -44,7 +42,9 @@ if 'alert_enabled_nursecall' not in st.session_state:
     st.session_state['alert_enabled_nursecall'] = True
 if 'alert_enabled_battery' not in st.session_state:
     st.session_state['alert_enabled_battery'] = True
-col1, col2, col3, col4 = st.columns(4)
+if 'alert_enabled_pole_lost' not in st.session_state:
+    st.session_state['alert_enabled_pole_lost'] = True
+col1, col2, col3, col4, col5 = st.columns(5)
 with col1:
     st.session_state['alert_enabled_almost'] = st.checkbox("거의 다 됨 알림", value=st.session_state['alert_enabled_almost'])
 with col2:
@@ -53,6 +53,8 @@ with col3:
     st.session_state['alert_enabled_nursecall'] = st.checkbox("너스콜 알림", value=st.session_state['alert_enabled_nursecall'])
 with col4:
     st.session_state['alert_enabled_battery'] = st.checkbox("배터리 알림", value=st.session_state['alert_enabled_battery'])
+with col5:
+    st.session_state['alert_enabled_pole_lost'] = st.checkbox("연결 끊김 알림", value=st.session_state['alert_enabled_pole_lost'])
 
 # === 알림 임계값 설정 (비율 기반) ===
 st.subheader("알림 임계값 설정")
@@ -1,21 +1,22 @@
 # 테스트용 AWS로 랜덤 데이터 쏴주는 파일
 
-import boto3
 import random
 import time
 import os
 from decimal import Decimal
 
+from utils.storage import get_resource, STORAGE_BACKEND
+
 # --- 설정 (dynamodb_to_websocket.py와 동일하게 유지) ---
 TABLE_NAME = os.environ.get("DYNAMODB_TABLE", "loadcell")
 AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-2")
 # --- 설정 끝 ---
 
-# Boto3 리소스 초기화
+# 저장소 초기화 (STORAGE_BACKEND=sqlite이면 로컬 파일에 기록)
 try:
-    dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+    dynamodb = get_resource()
     table = dynamodb.Table(TABLE_NAME)
-    print(f"DynamoDB 테이블 '{TABLE_NAME}' (리전: {AWS_REGION})에 성공적으로 연결되었습니다.")
+    print(f"{STORAGE_BACKEND} 테이블 '{TABLE_NAME}' (리전: {AWS_REGION})에 성공적으로 연결되었습니다.")
 except Exception as e:
     print(f"Boto3 초기화 실패: {e}")
     print("AWS 자격증명이 올바르게 설정되었는지 확인하세요. (예: aws configure)")
@@ -1,6 +1,5 @@
 import streamlit as st
-import boto3
-from boto3.dynamodb.conditions import Key
+from .live_feed import get_live_feed, REFRESH_SECONDS
 
 def render_alert_sidebar():
     # 알림 헤더와 모두 지우기 버튼
@@ -11,7 +10,6 @@ def render_alert_sidebar():
         if st.session_state.get('alert_list') and len(st.session_state['alert_list']) > 3:
             if st.button("모두 지우기", key="clear_all_alerts"):
                 st.session_state['alert_list'] = []
-                st.session_state['alert_flags'] = set()
                 st.rerun()
     
     if st.session_state.get('alert_list'):
@@ -26,7 +24,7 @@ def render_alert_sidebar():
                     st.warning(alert["msg"])
                 elif alert["id"] == 3:
                     st.error(alert["msg"])
-                elif alert["id"] == 4:
+                elif alert["id"] in (4, 5):
                     st.error(alert["msg"])
                 else:
                     st.info(alert["msg"])
@@ -42,102 +40,103 @@ def render_alert_sidebar():
 # ====== 알림 템플릿 딕셔너리 ======
 ALERT_TEMPLATES = {
     1: "{pole}번 폴대의 {bottle} 수액이 다 투여되었습니다.",
-    2: "{pole}번 폴대의 {bottle} 수액이 거의 다 되었습니다. (남은 시간: {remaining_sec:.0f}분, 무게: {current_weight:.1f}g)",
+    2: "{pole}번 폴대의 {bottle} 수액이 거의 다 되었습니다. (남은 시간: {remaining_min:.0f}분, 무게: {current_weight:.1f}g)",
     3: "{pole}번 폴대의 배터리가 부족합니다.",
-    4: "{pole}번 폴대에서 너스콜이 발생했습니다."
+    4: "{pole}번 폴대에서 너스콜이 발생했습니다.",
+    5: "{pole}번 폴대와 연결이 끊겼습니다. ({silent_sec:.0f}초 동안 수신 없음)"
 }
 
+# 알림 종류별 표시 여부 설정 키 (설정 페이지)
+ALERT_ENABLED_KEYS = {
+    1: 'alert_enabled_done',
+    2: 'alert_enabled_almost',
+    3: 'alert_enabled_battery',
+    4: 'alert_enabled_nursecall',
+    5: 'alert_enabled_pole_lost',
+}
+MAX_ALERT_LIST = 50  # 사이드바에 보관할 최대 알림 수
+
 # ====== 알림 추가 함수 ======
-def add_alert(alert_id, **params):
-    """알림을 추가하는 함수"""
+def add_alert(alert_id, event_id=None, **params):
+    """알림을 추가하는 함수 (같은 event_id의 알림이 이미 있으면 추가하지 않음)"""
     template = ALERT_TEMPLATES.get(alert_id)
     if template is None:
         return
     
-    msg = template.format(**params)
+    if "remaining_sec" in params:
+        remaining_sec = params.get("remaining_sec")
+        params["remaining_min"] = remaining_sec / 60 if isinstance(remaining_sec, (int, float)) and remaining_sec > 0 else 0
+    try:
+        msg = template.format(**params)
+    except (KeyError, ValueError, TypeError) as e:
+        print(f"알림 메시지 생성 실패: {alert_id} {params} | 오류: {e}")
+        return
     
-    # 중복 방지: 같은 알림이 이미 있으면 추가하지 않음
-    key = (alert_id, tuple(sorted(params.items())))
-    if "alert_flags" not in st.session_state:
-        st.session_state.alert_flags = set()
-    if key in st.session_state.alert_flags:
+    if "alert_list" not in st.session_state:
+        st.session_state.alert_list = []
+    # 중복 방지: 서버가 부여한 event_id 기준 (재접속 시 발생 중인 알림이 다시 와도 한 번만 표시)
+    if event_id is not None and any(alert.get("event_id") == event_id for alert in st.session_state.alert_list):
         return
     
-    st.session_state.alert_flags.add(key)
     st.session_state.alert_list.append({
         "id": alert_id,
+        "event_id": event_id,
         "msg": msg,
         "params": params
     })
+    if len(st.session_state.alert_list) > MAX_ALERT_LIST:
+        st.session_state.alert_list = st.session_state.alert_list[-MAX_ALERT_LIST:]
 
-# ====== 배터리 상태 체크 및 알림 함수 ======
-def check_battery_alerts():
-    """모든 폴대의 배터리 상태를 체크하고 알림을 생성하는 함수"""
-    # 설정에서 배터리 알림이 꺼져 있으면 아무것도 하지 않음
-    if not st.session_state.get('alert_enabled_battery', True):
+# ====== 서버 알림 이벤트 처리 함수 ======
+def handle_alert_event(event):
+    """브로드캐스터 알림 엔진이 보낸 이벤트를 알림 리스트에 반영하는 함수"""
+    # 발생(raised) 이벤트만 표시하고, 해제(cleared)된 알림은 사용자가 직접 지울 때까지 유지
+    if event.get("state") != "raised":
         return
-    try:
-        dynamodb = boto3.resource('dynamodb', region_name='ap-northeast-2')
-        table_polestat = dynamodb.Table('pole_stat')
-        
-        # 현재 활성화된 폴대들 확인 (loadcell_data에서)
-        loadcell_data = st.session_state.get('loadcell_data', {})
-        
-        for loadcel_id in loadcell_data.keys():
-            try:
-                response = table_polestat.query(
-                    KeyConditionExpression=Key('pole_id').eq(int(loadcel_id)),
-                    ScanIndexForward=False,
-                    Limit=1
-                )
-                
-                if response.get('Items'):
-                    battery_level = response['Items'][0].get('battery_level', None)
-                    if battery_level is not None and battery_level <= 1:
-                        # 배터리 부족 알림 (레벨 1 이하)
-                        add_alert(3, pole=loadcel_id, battery=battery_level)
-                        
-            except Exception as e:
-                print(f"폴대 {loadcel_id} 배터리 정보 조회 실패: {e}")
-                continue
-                
-    except Exception as e:
-        print(f"배터리 알림 체크 실패: {e}")
-
-# ====== 수액 관련 알림 체크 함수 ======
-def check_infusion_alerts():
-    """수액 상태를 체크하고 알림을 생성하는 함수"""
-    loadcell_data = st.session_state.get('loadcell_data', {})
-    
-    for loadcel, data in loadcell_data.items():
-        pole = loadcel
-        bottle = "오른쪽"
-        
-        # 각 장비별 임계값 불러오기
-        almost_key = f'alert_almost_weight_{loadcel}'
-        done_key = f'alert_done_weight_{loadcel}'
-        almost_weight = st.session_state.get(almost_key, 300)
-        done_weight = st.session_state.get(done_key, 150)
-        
-        # 거의 다 됨 알림 (설정값이 True일 때만)
-        if st.session_state.get('alert_enabled_almost', True):
-            if (0 < data.get("current_weight", 99999) <= almost_weight):
-                add_alert(2, pole=pole, bottle=bottle, 
-                         remaining_sec=data.get("remaining_sec", -1), 
-                         current_weight=data.get("current_weight", 0))
-        
-        # 투여 완료 알림 (설정값이 True일 때만)
-        if st.session_state.get('alert_enabled_done', True):
-            if (0 < data.get("current_weight", 99999) <= done_weight):
-                add_alert(1, pole=pole, bottle=bottle)
-        
-        # 너스콜 알림 (설정값이 True일 때만)
-        if st.session_state.get('alert_enabled_nursecall', True):
-            if data.get("nurse_call", False):
-                add_alert(4, pole=pole)
+    alert_id = event.get("alert_id")
+    # 설정에서 해당 종류의 알림이 꺼져 있으면 표시하지 않음
+    if not st.session_state.get(ALERT_ENABLED_KEYS.get(alert_id, ''), True):
+        return
+    add_alert(alert_id, event_id=event.get("event_id"), **(event.get("params") or {}))
 
 # ====== 통합 알림 체크 함수 ======
 def check_all_alerts():
-    """모든 알림을 체크하는 통합 함수"""
-    check_infusion_alerts()  # 수액 관련 알림
-    check_battery_alerts()   # 배터리 관련 알림
\ No newline at end of file
+    """
+    공용 수신기(LiveFeed)가 브로드캐스터 알림 채널로 받은 알림 이벤트를 반영하는 통합 함수
+    (임계값 평가는 브로드캐스터 알림 엔진이 샘플마다 한 번만 수행합니다)
+    세션마다 마지막으로 읽은 알림 시퀀스(alert_cursor)를 두고 그 이후 이벤트만 가져옵니다.
+    """
+    events, cursor = get_live_feed().alerts_since(
+        st.session_state.get("alert_cursor"), st.session_state.get("subscribed_poles")
+    )
+    st.session_state.alert_cursor = cursor
+    for event in events:
+        try:
+            handle_alert_event(event)
+        except Exception as e:
+            print(f"알림 이벤트 처리 오류: {event} | 오류: {e}")
+
+# ====== 실시간 알림 리스트 (조각 단위 새로고침) ======
+@st.fragment(run_every=REFRESH_SECONDS)
+def render_live_alert_list():
+    """
+    알림 이벤트를 반영하고 알림 리스트를 출력합니다.
+    페이지 전체 대신 이 조각(fragment)만 주기적으로 다시 실행되므로,
+    사이드바에 그리려면 `with st.sidebar:` 안에서 호출합니다.
+    """
+    check_all_alerts()
+    st.markdown("### 📋 알림")
+    if st.session_state.get('alert_list'):
+        for alert in st.session_state['alert_list']:
+            if alert["id"] == 1:
+                st.success(alert["msg"])
+            elif alert["id"] == 2:
+                st.warning(alert["msg"])
+            elif alert["id"] == 3:
+                st.error(alert["msg"])
+            elif alert["id"] in (4, 5):
+                st.error(alert["msg"])
+            else:
+                st.info(alert["msg"])
+    else:
+        st.info("새로운 알림이 없습니다.")
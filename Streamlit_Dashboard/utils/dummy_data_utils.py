@@ -5,11 +5,20 @@
 
 이 모듈은 로컬 JSON 파일에서 추가 데이터를 로드하고,
 실제 DB 데이터와 병합하여 사용할 수 있게 해줍니다.
+
+JSON 파일은 (수정 시각, 크기)가 바뀔 때만 다시 파싱하고, 파싱 결과는 읽기 전용
+뷰(MappingProxyType / tuple)로 공유합니다. 대시보드용 변환 결과도 같은 키로 메모이즈해
+읽기 전용 뷰를 그대로 돌려주므로(값을 바꾸려면 dict()/list()로 복사), 캐시 적중 시 복사 비용이 없습니다.
+분석용 DataFrame은 얕은 복사본을 돌려주므로 열을 추가/교체해도 캐시는 그대로입니다.
 """
 
+import functools
 import json
 import os
-from typing import Dict, List, Any, Optional
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple
 import pandas as pd
 from datetime import datetime, timezone, timedelta
 
@@ -21,29 +30,90 @@ ADDITIONAL_FILES = {
     'loadcell_history': 'dummy_loadcell_history.json'
 }
 
-def load_additional_data_from_json() -> Dict[str, Any]:
+# 파일 경로 -> ((수정 시각 ns, 크기), 읽기 전용 파싱 결과)
+_file_cache: Dict[str, Tuple[Optional[Tuple[int, int]], Any]] = {}
+# 변환 함수 이름 -> (추가 데이터 파일 시그니처, 결과)
+_derived_cache: Dict[str, Tuple[Tuple, Any]] = {}
+_cache_lock = threading.Lock()
+
+def _file_signature(file_path: str) -> Optional[Tuple[int, int]]:
+    """파일의 (수정 시각 ns, 크기), 파일이 없으면 None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def _freeze(value):
+    """JSON 값을 읽기 전용 뷰로 변환합니다. (dict -> MappingProxyType, list -> tuple)"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value):
+    """읽기 전용 뷰를 수정 가능한 dict / list로 되돌립니다. (파일 저장용)"""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+def _load_json_file(file_path: str):
+    """JSON 파일 하나를 (수정 시각, 크기)가 바뀐 경우에만 다시 파싱합니다."""
+    signature = _file_signature(file_path)
+    with _cache_lock:
+        cached = _file_cache.get(file_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    data = MappingProxyType({})
+    if signature is not None:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = _freeze(json.load(f))
+        except Exception as e:
+            print(f"⚠️ {os.path.basename(file_path)} 로드 실패: {e}")
+    with _cache_lock:
+        _file_cache[file_path] = (signature, data)
+    return data
+
+def additional_data_signature() -> Tuple:
+    """추가 데이터 파일 전체의 (수정 시각, 크기) 시그니처 (변환 결과 메모이즈 키)"""
+    return tuple(_file_signature(os.path.join(ADDITIONAL_DATA_DIR, filename)) for filename in ADDITIONAL_FILES.values())
+
+def _memoize_on_files(func):
+    """
+    추가 데이터 파일 시그니처가 같으면 이전 변환 결과를 재사용합니다.
+    dict / list 결과는 _freeze로 읽기 전용 뷰를 만들어 그대로 공유하고,
+    DataFrame은 데이터를 복사하지 않는 얕은 복사본을 돌려줍니다.
+    """
+    @functools.wraps(func)
+    def wrapper():
+        signature = additional_data_signature()
+        with _cache_lock:
+            cached = _derived_cache.get(func.__name__)
+        if cached is None or cached[0] != signature:
+            result = func()
+            cached = (signature, result if isinstance(result, pd.DataFrame) else _freeze(result))
+            with _cache_lock:
+                _derived_cache[func.__name__] = cached
+        result = cached[1]
+        return result.copy(deep=False) if isinstance(result, pd.DataFrame) else result
+    return wrapper
+
+def load_additional_data_from_json() -> Mapping:
     """
     JSON 파일에서 추가 데이터를 로드합니다.
+    (파일이 바뀌지 않았으면 다시 파싱하지 않고 캐시된 읽기 전용 뷰를 반환)
     
     Returns:
-        Dict[str, Any]: 로드된 추가 데이터
+        Mapping: 데이터 타입 -> 로드된 추가 데이터 (읽기 전용, 수정하려면 _thaw로 복사)
     """
-    loaded_data = {}
-    
-    for data_type, filename in ADDITIONAL_FILES.items():
-        file_path = os.path.join(ADDITIONAL_DATA_DIR, filename)
-        
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    loaded_data[data_type] = json.load(f)
-            except Exception as e:
-                print(f"⚠️ {filename} 로드 실패: {e}")
-                loaded_data[data_type] = {}
-        else:
-            loaded_data[data_type] = {}
-    
-    return loaded_data
+    return MappingProxyType({
+        data_type: _load_json_file(os.path.join(ADDITIONAL_DATA_DIR, filename))
+        for data_type, filename in ADDITIONAL_FILES.items()
+    })
 
 def merge_db_and_additional_data(db_data: Dict[str, Any], additional_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -72,20 +142,21 @@ def merge_db_and_additional_data(db_data: Dict[str, Any], additional_data: Dict[
     
     # loadcell_history 데이터 병합
     if 'loadcell_history' in additional_data:
-        merged_data['loadcell_history'] = db_data.get('loadcell_history', []) + additional_data['loadcell_history']
+        merged_data['loadcell_history'] = list(db_data.get('loadcell_history', [])) + list(additional_data['loadcell_history'])
     else:
         merged_data['loadcell_history'] = db_data.get('loadcell_history', [])
     
     return merged_data
 
-def get_combined_loadcell_data() -> Dict[str, Any]:
+@_memoize_on_files
+def get_combined_loadcell_data() -> Mapping:
     """
     실제 DB 데이터와 추가 데이터를 병합하여 반환합니다.
     
     Returns:
-        Dict[str, Any]: 병합된 loadcell 데이터
+        Mapping: 병합된 loadcell 데이터 (읽기 전용)
     """
-    # 추가 데이터 로드
+    # 추가 데이터 로드 (병합 결과는 메모이즈 시 읽기 전용 뷰로 고정되므로 복사하지 않음)
     additional_data = load_additional_data_from_json()
     
     # 실제 DB 데이터는 빈 딕셔너리로 시작 (실제로는 DB에서 가져와야 함)
@@ -117,8 +188,8 @@ def update_additional_data_item(data_type: str, pole_id: str, updates: Dict[str,
         return False
     
     try:
-        # 기존 데이터 로드
-        additional_data = load_additional_data_from_json()
+        # 기존 데이터 로드 (캐시는 읽기 전용이므로 수정 가능한 복사본으로)
+        additional_data = _thaw(load_additional_data_from_json())
         
         if data_type == 'loadcell_history':
             # 히스토리는 리스트 형태이므로 특정 폴대의 최신 항목만 업데이트
@@ -136,6 +207,10 @@ def update_additional_data_item(data_type: str, pole_id: str, updates: Dict[str,
         file_path = os.path.join(ADDITIONAL_DATA_DIR, ADDITIONAL_FILES[data_type])
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(additional_data[data_type], f, ensure_ascii=False, indent=2)
+        # 같은 시각/크기로 덮어쓴 경우에도 다음 로드에서 다시 읽도록 캐시 무효화
+        with _cache_lock:
+            _file_cache.pop(file_path, None)
+            _derived_cache.clear()
         
         print(f"✅ {data_type} 테이블의 폴대 {pole_id}번 데이터 업데이트 완료")
         return True
@@ -144,12 +219,13 @@ def update_additional_data_item(data_type: str, pole_id: str, updates: Dict[str,
         print(f"❌ 추가 데이터 업데이트 실패: {e}")
         return False
 
-def get_additional_data_summary() -> Dict[str, Any]:
+@_memoize_on_files
+def get_additional_data_summary() -> Mapping:
     """
     추가 데이터의 요약 정보를 반환합니다.
     
     Returns:
-        Dict[str, Any]: 추가 데이터 요약 정보
+        Mapping: 추가 데이터 요약 정보 (읽기 전용)
     """
     try:
         additional_data = load_additional_data_from_json()
@@ -194,6 +270,7 @@ def get_additional_data_summary() -> Dict[str, Any]:
         print(f"❌ 추가 데이터 요약 생성 실패: {e}")
         return {}
 
+@_memoize_on_files
 def is_additional_data_available() -> bool:
     """
     추가 데이터가 사용 가능한지 확인합니다.
@@ -207,12 +284,13 @@ def is_additional_data_available() -> bool:
     except:
         return False
 
-def get_additional_pole_ids() -> List[str]:
+@_memoize_on_files
+def get_additional_pole_ids() -> Tuple[str, ...]:
     """
     추가 데이터에 포함된 폴대 ID 목록을 반환합니다.
     
     Returns:
-        List[str]: 폴대 ID 목록
+        Tuple[str, ...]: 폴대 ID 목록
     """
     try:
         additional_data = load_additional_data_from_json()
@@ -229,12 +307,13 @@ def get_additional_pole_ids() -> List[str]:
         print(f"❌ 폴대 ID 목록 가져오기 실패: {e}")
         return []
 
-def get_additional_data_for_dashboard() -> Dict[str, Any]:
+@_memoize_on_files
+def get_additional_data_for_dashboard() -> Mapping:
     """
     대시보드에서 사용할 수 있는 형태로 추가 데이터를 변환합니다.
     
     Returns:
-        Dict[str, Any]: 대시보드용 데이터
+        Mapping: 대시보드용 데이터 (읽기 전용)
     """
     try:
         additional_data = load_additional_data_from_json()
@@ -265,6 +344,7 @@ def get_additional_data_for_dashboard() -> Dict[str, Any]:
         print(f"❌ 대시보드용 데이터 변환 실패: {e}")
         return {}
 
+@_memoize_on_files
 def get_additional_data_for_analysis() -> pd.DataFrame:
     """
     분석 페이지에서 사용할 수 있는 형태로 추가 데이터를 변환합니다.
@@ -312,6 +392,7 @@ def get_additional_data_for_analysis() -> pd.DataFrame:
         print(f"❌ 분석용 데이터 변환 실패: {e}")
         return pd.DataFrame()
 
+@_memoize_on_files
 def get_additional_data_for_analysis_exclude_last() -> pd.DataFrame:
     """
     분석 페이지에서 사용할 수 있는 형태로 추가 데이터를 변환합니다.
@@ -392,13 +473,14 @@ def get_additional_data_for_analysis_exclude_last() -> pd.DataFrame:
         traceback.print_exc()
         return pd.DataFrame()
 
-def get_additional_data_for_dashboard_exclude_last() -> Dict[str, Any]:
+@_memoize_on_files
+def get_additional_data_for_dashboard_exclude_last() -> Mapping:
     """
     대시보드에서 사용할 수 있는 형태로 추가 데이터를 변환합니다.
     마지막 1개 데이터(수액 완료 상태)는 제외합니다.
     
     Returns:
-        Dict[str, Any]: 마지막 데이터가 제외된 대시보드용 데이터
+        Mapping: 마지막 데이터가 제외된 대시보드용 데이터 (읽기 전용)
     """
     try:
         additional_data = load_additional_data_from_json()
@@ -432,13 +514,14 @@ def get_additional_data_for_dashboard_exclude_last() -> Dict[str, Any]:
         print(f"❌ 대시보드용 데이터 변환 실패 (마지막 데이터 제외): {e}")
         return {}
 
-def get_additional_history_data_for_dashboard() -> Dict[str, List]:
+@_memoize_on_files
+def get_additional_history_data_for_dashboard() -> Mapping:
     """
     대시보드에서 사용할 수 있는 형태로 추가 히스토리 데이터를 변환합니다.
     각 폴대별로 (timestamp, weight) 튜플 리스트를 반환합니다.
     
     Returns:
-        Dict[str, List]: 폴대별 히스토리 데이터
+        Mapping: 폴대별 히스토리 데이터 (읽기 전용, 폴대ID -> ((timestamp, 무게), ...))
     """
     try:
         additional_data = load_additional_data_from_json()
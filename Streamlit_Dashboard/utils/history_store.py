@@ -0,0 +1,221 @@
+"""
+loadcell 히스토리 저장 형식 (행 단위 / 시간 버킷) 공용 모듈
+
+브로드캐스터의 히스토리 기록기와 통계/보고서 페이지가 함께 사용합니다.
+
+- row (기존): 샘플 하나당 아이템 하나 (loadcell_history, 값은 문자열)
+- bucket: 폴대 x 시간 버킷(HISTORY_BUCKET_SECONDS)당 아이템 하나 (loadcell_history_bucket)
+  버킷 안의 샘플은 리틀 엔디언 숫자 배열(Binary)로 묶어 저장합니다.
+      loadcel (S, 파티션 키) | bucket (N, 버킷 시작 epoch 초, 정렬 키)
+      offsets_ms (B, u32: 버킷 시작부터의 ms) | weights (B, f32: 무게 g) | remaining_sec (B, i32: -1=없음)
+      count (N) | utc_offset (N, 표시용 시간대 초) | expire_at (N, TTL)
+  1Hz 샘플 기준 1시간 버킷이면 아이템 수가 행 단위의 1/3600로 줄어듭니다.
+
+read_history_df()는 HISTORY_LAYOUT에 맞는 테이블을 읽어 두 형식 모두 같은 열
+(loadcel, current_weight_history, remaining_sec_history, timestamp)의 DataFrame으로 돌려줍니다.
+"""
+
+import math
+import os
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .table_reader import dataframe_chunks, iter_pages_parallel, iter_query_pages, read_dataframe, DEFAULT_SEGMENTS
+
+ROW = "row"
+BUCKET = "bucket"
+
+HISTORY_LAYOUT = os.environ.get("HISTORY_LAYOUT", ROW)  # row / bucket
+HISTORY_TABLE = os.environ.get("HISTORY_TABLE", "loadcell_history")
+HISTORY_BUCKET_TABLE = os.environ.get("HISTORY_BUCKET_TABLE", "loadcell_history_bucket")
+HISTORY_BUCKET_SECONDS = int(os.environ.get("HISTORY_BUCKET_SECONDS", "3600"))  # 버킷 길이 (초)
+HISTORY_COLUMNS = ['loadcel', 'current_weight_history', 'remaining_sec_history', 'timestamp']
+
+
+def parse_sample_time(value) -> Tuple[Optional[float], int]:
+    """
+    샘플 timestamp를 (epoch 초, UTC 오프셋 초)로 변환합니다.
+    ISO 문자열의 시간대는 오프셋으로 보존하고, 숫자/시간대 없는 값은 오프셋 0으로 봅니다.
+    """
+    if value is None:
+        return None, 0
+    try:
+        number = float(value)
+        return (number / 1000 if number > 1e11 else number), 0
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None, 0
+    offset = parsed.utcoffset()
+    return parsed.timestamp(), int(offset.total_seconds()) if offset is not None else 0
+
+
+def bucket_start(epoch_seconds: float, bucket_seconds: int = HISTORY_BUCKET_SECONDS) -> int:
+    """샘플 시각이 속한 버킷의 시작 epoch 초"""
+    return int(epoch_seconds // bucket_seconds * bucket_seconds)
+
+
+def _to_bytes(column: array) -> bytes:
+    if sys.byteorder != "little":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _from_bytes(typecode: str, value) -> array:
+    column = array(typecode)
+    column.frombytes(bytes(getattr(value, "value", value) or b""))  # boto3 resource는 Binary로 감쌈
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column
+
+
+class Bucket:
+    """폴대 하나의 버킷 하나에 쌓이는 샘플 (기록기 메모리 버퍼)"""
+
+    __slots__ = ("pole_id", "start", "utc_offset", "offsets_ms", "weights", "remaining")
+
+    def __init__(self, pole_id: str, start: int, utc_offset: int = 0):
+        self.pole_id = pole_id
+        self.start = start
+        self.utc_offset = utc_offset
+        self.offsets_ms = array("I")
+        self.weights = array("f")
+        self.remaining = array("i")
+
+    def __len__(self) -> int:
+        return len(self.offsets_ms)
+
+    def add(self, epoch_seconds: float, weight: float, remaining_sec) -> None:
+        self.offsets_ms.append(max(0, int(round((epoch_seconds - self.start) * 1000))))
+        self.weights.append(weight)
+        try:
+            self.remaining.append(max(-1, min(2 ** 31 - 1, int(float(remaining_sec)))))
+        except (TypeError, ValueError):
+            self.remaining.append(-1)
+
+    def merge_earlier(self, item: Dict[str, Any]) -> None:
+        """
+        같은 버킷의 이전 기록(client 형식 아이템)을 앞에 합칩니다. (재시작 전에 쌓인 샘플을 덮어쓰지 않도록)
+        이 버킷의 첫 샘플보다 이전 샘플만 가져오므로 같은 아이템을 두 번 합쳐도 중복되지 않습니다.
+        """
+        def column(typecode, name):
+            return _from_bytes(typecode, (item.get(name) or {}).get('B'))
+
+        offsets, weights, remaining = column("I", 'offsets_ms'), column("f", 'weights'), column("i", 'remaining_sec')
+        if not len(offsets) == len(weights) == len(remaining):
+            raise ValueError(f"손상된 히스토리 버킷: {self.pole_id} {self.start}")
+        first = self.offsets_ms[0] if len(self) else None
+        earlier = [i for i, offset in enumerate(offsets) if first is None or offset < first]
+        self.offsets_ms = array("I", [offsets[i] for i in earlier]) + self.offsets_ms
+        self.weights = array("f", [weights[i] for i in earlier]) + self.weights
+        self.remaining = array("i", [remaining[i] for i in earlier]) + self.remaining
+
+    def to_item(self, bucket_seconds: int, expire_at: int) -> Dict[str, Any]:
+        """DynamoDB client 형식 아이템"""
+        return {
+            'loadcel': {'S': self.pole_id},
+            'bucket': {'N': str(self.start)},
+            'bucket_seconds': {'N': str(bucket_seconds)},
+            'count': {'N': str(len(self))},
+            'utc_offset': {'N': str(self.utc_offset)},
+            'offsets_ms': {'B': _to_bytes(self.offsets_ms)},
+            'weights': {'B': _to_bytes(self.weights)},
+            'remaining_sec': {'B': _to_bytes(self.remaining)},
+            'expire_at': {'N': str(expire_at)},  # TTL 필드
+        }
+
+
+def decode_bucket(item: Dict[str, Any], start: Optional[float] = None, end: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    버킷 아이템(boto3 resource 형식)을 행 단위 히스토리 레코드 리스트로 풉니다.
+
+    Args:
+        item: 버킷 아이템
+        start / end: 이 구간(epoch 초, 양 끝 포함) 밖의 샘플은 제외
+
+    Returns:
+        [{'loadcel', 'current_weight_history', 'remaining_sec_history', 'timestamp'(datetime)}, ...]
+    """
+    pole_id = str(item['loadcel'])
+    base = float(item['bucket'])
+    tz = timezone(timedelta(seconds=int(item.get('utc_offset', 0) or 0)))
+    offsets = _from_bytes("I", item.get('offsets_ms'))
+    weights = _from_bytes("f", item.get('weights'))
+    remaining = _from_bytes("i", item.get('remaining_sec'))
+    if not len(offsets) == len(weights) == len(remaining):
+        raise ValueError(f"손상된 히스토리 버킷: {pole_id} {base}")
+    rows = []
+    for offset_ms, weight, remaining_sec in zip(offsets, weights, remaining):
+        epoch = base + offset_ms / 1000
+        if (start is not None and epoch < start) or (end is not None and epoch > end):
+            continue
+        rows.append({
+            'loadcel': pole_id,
+            'current_weight_history': None if math.isnan(weight) else round(weight, 1),
+            'remaining_sec_history': remaining_sec,
+            'timestamp': datetime.fromtimestamp(epoch, tz),
+        })
+    return rows
+
+
+def _bucket_pages(table, start: Optional[float], end: Optional[float], poles: Optional[Iterable[str]],
+                  bucket_seconds: int, segments: int) -> Iterator[List[Dict[str, Any]]]:
+    """구간에 걸치는 버킷 아이템만 읽어 행 페이지로 풉니다."""
+    low = bucket_start(start, bucket_seconds) if start is not None else 0
+    high = int(end) if end is not None else 2 ** 53
+    names = {'#b': 'bucket'}
+    values = {':low': low, ':high': high}
+    if poles:
+        # 폴대를 알면 파티션 키 + 정렬 키 범위 query로 구간 버킷만 읽습니다.
+        for pole_id in poles:
+            for page in iter_query_pages(
+                table, KeyConditionExpression='loadcel = :pole AND #b BETWEEN :low AND :high',
+                ExpressionAttributeNames=names, ExpressionAttributeValues={**values, ':pole': str(pole_id)}
+            ):
+                yield [row for item in page for row in decode_bucket(item, start, end)]
+        return
+    scan_kwargs = {}
+    if start is not None or end is not None:
+        scan_kwargs = {
+            'FilterExpression': '#b BETWEEN :low AND :high',
+            'ExpressionAttributeNames': names, 'ExpressionAttributeValues': values,
+        }
+    for page in iter_pages_parallel(table, segments=segments, **scan_kwargs):
+        yield [row for item in page for row in decode_bucket(item, start, end)]
+
+
+def read_history_df(dynamodb, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    poles: Optional[Sequence[str]] = None, convert: Optional[Callable] = None,
+                    layout: Optional[str] = None, segments: int = DEFAULT_SEGMENTS):
+    """
+    저장 형식과 관계없이 히스토리를 행 단위 DataFrame으로 읽습니다.
+
+    Args:
+        dynamodb: boto3 DynamoDB resource
+        start / end: 읽을 구간 (bucket 형식에서 읽는 버킷 수를 줄이는 데 사용)
+        poles: 읽을 폴대 ID 목록 (bucket 형식이면 scan 대신 폴대별 query)
+        convert: 청크마다 적용할 변환 함수 (숫자/날짜 변환 등)
+        layout: row / bucket (기본값 HISTORY_LAYOUT)
+
+    Returns:
+        pd.DataFrame: HISTORY_COLUMNS 열
+    """
+    import pandas as pd
+
+    layout = layout or HISTORY_LAYOUT
+    if layout != BUCKET:
+        return read_dataframe(dynamodb.Table(HISTORY_TABLE), attributes=HISTORY_COLUMNS,
+                              segments=segments, convert=convert)
+    start_epoch = start.timestamp() if start is not None else None
+    end_epoch = end.timestamp() if end is not None else None
+    pages = _bucket_pages(dynamodb.Table(HISTORY_BUCKET_TABLE), start_epoch, end_epoch, poles,
+                          HISTORY_BUCKET_SECONDS, segments)
+    chunks = list(dataframe_chunks(pages, HISTORY_COLUMNS, convert=convert))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,271 @@
+"""
+프로세스 공용 실시간 수신기 (브로드캐스터 웹소켓 → 최신 상태 테이블)
+
+Streamlit 서버 프로세스마다 웹소켓 연결과 수신 스레드를 하나만 두고,
+모든 브라우저 세션은 여기서 최신값/히스토리/알림을 읽기만 합니다.
+(세션이 늘어나도 연결 수, 스레드 수, 메모리 사용량이 그대로 유지됩니다)
+
+- 최신 상태: 폴대ID -> {"current_weight", "remaining_sec", ..., "battery_level"}
+- 히스토리: 폴대별 고정 용량 링 버퍼 (HISTORY_CAPACITY개, 세션에는 최근 HISTORY_WINDOW개만 복사)
+- 버전: 폴대별 수신 횟수. 페이지는 버전이 바뀐 폴대만 다시 읽고 그립니다.
+- 알림: 시퀀스 번호를 붙인 이벤트 로그 + 발생 중인 알림 목록
+  세션은 마지막으로 읽은 시퀀스를 session_state에 두고 그 이후 이벤트만 가져갑니다.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import streamlit as st
+
+from . import wire_format
+from .ring_buffer import RingBuffer
+from .ws_frames import FrameCursor, estimate_fields, is_alert_frame, iter_alert_events, iter_pole_updates
+
+BROADCASTER_URL = os.environ.get("BROADCASTER_URL", "ws://localhost:6789")
+HISTORY_CAPACITY = int(os.environ.get("LIVE_HISTORY_CAPACITY", "300"))  # 폴대별 보관 샘플 수 (미리 할당)
+HISTORY_WINDOW = int(os.environ.get("LIVE_HISTORY_WINDOW", "30"))  # 그래프에 표시할 최근 샘플 수
+ALERT_LOG_LENGTH = int(os.environ.get("LIVE_ALERT_LOG_LENGTH", "1000"))
+REFRESH_SECONDS = float(os.environ.get("LIVE_REFRESH_SECONDS", "1"))  # 실시간 조각(fragment) 새로고침 주기
+RECONNECT_DELAY = 3
+
+
+def _battery_level(data: Dict[str, Any]) -> Optional[int]:
+    try:
+        return int(data.get("battery_level", -1)) if data.get("battery_level") is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LiveFeed:
+    """
+    브로드캐스터 프레임을 한 곳에서 받아 최신 상태/히스토리/알림 로그를 유지합니다.
+
+    apply_message()는 수신 스레드에서만 호출되고, 읽기 메서드는 여러 세션 스레드에서
+    동시에 호출되므로 공유 상태는 모두 lock 안에서만 다룹니다. 읽기 메서드는 사본을 돌려주므로
+    페이지에서 값을 바꿔도 다른 세션에 영향을 주지 않습니다.
+
+    Args:
+        url: 브로드캐스터 웹소켓 주소
+        history_capacity: 폴대별 링 버퍼 용량
+        alert_log_length: 보관할 알림 이벤트 수 (이보다 오래 읽지 않은 세션은 발생 중인 알림만 다시 받음)
+    """
+
+    def __init__(self, url: str = BROADCASTER_URL, history_capacity: int = HISTORY_CAPACITY,
+                 alert_log_length: int = ALERT_LOG_LENGTH):
+        self.url = url
+        self.history_capacity = history_capacity
+        self._lock = threading.Lock()
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._history: Dict[str, RingBuffer] = {}
+        self._versions: Dict[str, int] = {}
+        self._alerts: deque = deque(maxlen=alert_log_length)
+        self._alert_seq = 0
+        self._active_alerts: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+        self.messages = 0
+
+    # ====== 수신 ======
+    def start(self) -> "LiveFeed":
+        """수신 스레드를 시작합니다. (이미 실행 중이면 아무것도 하지 않음)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+            self._thread.start()
+        print(f"[LiveFeed] 공용 수신 스레드 시작됨: {self.url}")
+        return self
+
+    def _run(self):
+        import websocket
+
+        # 마지막 수신 (epoch, seq) 추적, 숫자 필드는 바이너리(struct) 프레임으로 수신
+        cursor = FrameCursor(frame_format=wire_format.STRUCT)
+
+        def on_message(ws, message):
+            if is_alert_frame(message):
+                # 알림 채널: 시퀀스와 무관하게 바로 반영
+                self.apply_alert_message(message)
+                return
+            apply, resume = cursor.observe(message)
+            if resume:
+                # 시퀀스 누락: 놓친 delta 재전송 요청
+                ws.send(resume)
+            if apply:
+                self.apply_message(message)
+
+        def on_error(ws, error):
+            print(f"[LiveFeed] 오류 발생: {error}")
+
+        def on_close(ws, close_status_code, close_msg):
+            self.connected = False
+            print(f"[LiveFeed] 연결 종료됨: {close_status_code} {close_msg}")
+
+        def on_open(ws):
+            self.connected = True
+            print("[LiveFeed] 연결 성공")
+
+        # 연결이 끊기면 마지막 수신 위치를 알려 재접속하여 놓친 데이터만 다시 받습니다.
+        while True:
+            ws = websocket.WebSocketApp(cursor.url(self.url),
+                                        on_message=on_message,
+                                        on_error=on_error,
+                                        on_close=on_close,
+                                        on_open=on_open)
+            ws.run_forever()
+            time.sleep(RECONNECT_DELAY)
+
+    def apply_message(self, message) -> None:
+        """delta/스냅샷 프레임 하나를 최신 상태와 히스토리에 반영합니다."""
+        try:
+            updates = list(iter_pole_updates(message))
+        except Exception as e:
+            print(f"[LiveFeed] 메시지 파싱 오류: {message} | 오류: {e}")
+            return
+        received_at = time.time()
+        with self._lock:
+            self.messages += 1
+            for data in updates:
+                loadcel = str(data["loadcel"])
+                try:
+                    current_weight = float(data.get("current_weight", 0))
+                except (TypeError, ValueError):
+                    current_weight = 0
+                # 남은 시간/투여 속도는 브로드캐스터 추정값을 그대로 사용
+                self._latest[loadcel] = {
+                    "current_weight": current_weight,
+                    **estimate_fields(data),
+                    "battery_level": _battery_level(data),
+                }
+                history = self._history.get(loadcel)
+                if history is None:
+                    history = self._history[loadcel] = RingBuffer(self.history_capacity)
+                history.append(data.get("timestamp"), current_weight, received_at)
+                self._versions[loadcel] = self._versions.get(loadcel, 0) + 1
+
+    def apply_alert_message(self, message) -> None:
+        """알림 채널 프레임을 알림 로그에 추가합니다."""
+        try:
+            events = list(iter_alert_events(message))
+        except Exception as e:
+            print(f"[LiveFeed] 알림 메시지 파싱 오류: {message} | 오류: {e}")
+            return
+        with self._lock:
+            for event in events:
+                self._alert_seq += 1
+                self._alerts.append((self._alert_seq, event))
+                if event.get("state") == "raised":
+                    self._active_alerts[event["event_id"]] = event
+                else:
+                    self._active_alerts.pop(event["event_id"], None)
+
+    # ====== 읽기 (세션) ======
+    def latest(self, poles: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """폴대별 최신 상태 사본 (poles를 지정하면 해당 폴대만)"""
+        wanted = None if poles is None else set(map(str, poles))
+        with self._lock:
+            return {pole: dict(values) for pole, values in self._latest.items()
+                    if wanted is None or pole in wanted}
+
+    def versions(self, poles: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """폴대별 수신 버전 (새 값이 들어올 때마다 1씩 증가, poles를 지정하면 해당 폴대만)"""
+        wanted = None if poles is None else set(map(str, poles))
+        with self._lock:
+            return {pole: version for pole, version in self._versions.items()
+                    if wanted is None or pole in wanted}
+
+    def pole_ids(self, poles: Optional[Iterable[str]] = None) -> List[str]:
+        """데이터를 받은 폴대 ID 목록 (정렬, poles를 지정하면 해당 폴대만)"""
+        wanted = None if poles is None else set(map(str, poles))
+        with self._lock:
+            return sorted(pole for pole in self._latest if wanted is None or pole in wanted)
+
+    def history(self, poles: Optional[Iterable[str]] = None, since: Optional[Dict[str, float]] = None,
+                window: Optional[int] = HISTORY_WINDOW) -> Dict[str, RingBuffer]:
+        """
+        폴대별 최근 무게 히스토리 사본.
+
+        Args:
+            poles: 읽을 폴대 ID 목록 (None이면 전체)
+            since: 폴대ID -> epoch 초. 이 시각 이전에 수신한 값은 제외합니다. (영점 설정 후 그래프 초기화용)
+            window: 폴대별 최근 몇 개까지 (None이면 보관 중인 전체)
+
+        Returns:
+            dict: 폴대ID -> RingBuffer (최근 구간만 복사한 독립 버퍼, window()로 그래프용 배열을 꺼냄)
+        """
+        wanted = None if poles is None else set(map(str, poles))
+        since = since or {}
+        with self._lock:
+            return {
+                pole: history.snapshot(window, since.get(pole))
+                for pole, history in self._history.items()
+                if wanted is None or pole in wanted
+            }
+
+    def alerts_since(self, cursor: Optional[int], poles: Optional[Iterable[str]] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        cursor 이후에 들어온 알림 이벤트를 돌려줍니다.
+
+        Args:
+            cursor: 세션이 마지막으로 읽은 알림 시퀀스 (처음이면 None)
+            poles: 읽을 폴대 ID 목록 (None이면 전체)
+
+        Returns:
+            (이벤트 목록, 다음 cursor). 처음 읽거나 로그가 이미 밀려난 경우에는
+            발생 중인 알림만 돌려줍니다. (브로드캐스터가 재접속 시 보내는 동기화와 같은 동작)
+        """
+        wanted = None if poles is None else set(map(str, poles))
+        with self._lock:
+            oldest = self._alerts[0][0] if self._alerts else self._alert_seq + 1
+            if cursor is None or cursor + 1 < oldest:
+                events = list(self._active_alerts.values())
+            else:
+                events = [event for seq, event in self._alerts if seq > cursor]
+            next_cursor = self._alert_seq
+        if wanted is not None:
+            events = [event for event in events if str(event.get("pole")) in wanted]
+        return events, next_cursor
+
+
+@st.cache_resource(show_spinner=False)
+def get_live_feed() -> LiveFeed:
+    """서버 프로세스 공용 LiveFeed (처음 호출될 때 한 번만 만들고 수신 스레드를 시작)"""
+    return LiveFeed().start()
+
+
+def sync_live_state(since: Optional[Dict[str, float]] = None) -> None:
+    """
+    공용 LiveFeed의 최신 상태/히스토리를 이 세션의 session_state에 반영합니다.
+    (매 실행마다 사본으로 교체하므로 세션별로 쌓이는 데이터는 없습니다)
+
+    session_state.subscribed_poles가 있으면 (의료진 담당 폴대) 해당 폴대만 보여줍니다.
+
+    Args:
+        since: 폴대ID -> epoch 초, 이 시각 이전 히스토리는 제외 (LiveFeed.history 참고)
+    """
+    feed = get_live_feed()
+    poles = st.session_state.get("subscribed_poles")
+    st.session_state.loadcell_data = feed.latest(poles)
+    st.session_state.loadcell_history = feed.history(poles, since=since)
+
+
+def merge_additional_history(additional_history: Dict[str, List[Tuple[Any, float]]],
+                             window: int = HISTORY_WINDOW) -> None:
+    """
+    추가(저장된) 히스토리를 세션 히스토리의 실시간 구간 앞에 이어 붙입니다.
+    (실시간 첫 샘플보다 이전 값만 붙이므로 중복 확인용 timestamp 집합이 필요 없습니다)
+
+    Args:
+        additional_history: 폴대ID -> [(timestamp, 무게), ...] (get_additional_history_data_for_dashboard 형식)
+        window: 폴대별로 남길 최근 샘플 수
+    """
+    if 'loadcell_history' not in st.session_state:
+        st.session_state.loadcell_history = {}
+    history = st.session_state.loadcell_history
+    for pole_id, history_list in additional_history.items():
+        stored = RingBuffer.from_items(history_list, window)
+        live = history.get(pole_id)
+        history[pole_id] = stored if live is None else live.with_earlier(stored, window)
@@ -0,0 +1,64 @@
+"""
+실시간 폴대 그리드 커스텀 컴포넌트
+
+브라우저가 브로드캐스터 웹소켓에 직접 접속해 폴대별 게이지, 4칸 잔량 인디케이터,
+무게 스파크라인을 그립니다. 값이 바뀔 때 Python 재실행이 일어나지 않고,
+영점 설정 같은 사용자 동작이 있을 때만 컴포넌트 값으로 Python에 알려줍니다.
+
+프론트엔드는 빌드 과정 없는 정적 파일(frontend/index.html)이며,
+Streamlit 컴포넌트 메시지(componentReady / render / setComponentValue / setFrameHeight)를 직접 주고받습니다.
+
+컴포넌트 값 (사용자 동작, 같은 동작이 재실행마다 다시 처리되지 않도록 nonce 포함):
+    {"action": "tare", "pole": "1", "weight": 영점 시점 무게(g), "nonce": ...}
+    {"action": "full_weight", "pole": "1", "value": 수액팩 기준 무게(g), "nonce": ...}
+
+배포 조건 (그래서 기본값은 꺼짐, POLE_GRID_ENABLED=1로 켬):
+- 브라우저마다 브로드캐스터 웹소켓(기본 6789 포트)에 직접 접속할 수 있어야 합니다.
+- 대시보드를 HTTPS로 제공하면 ws:// 접속은 mixed content로 차단되므로, 브로드캐스터 앞에
+  TLS를 종료하는 리버스 프록시를 두고 POLE_GRID_WS_URL에 wss:// 주소를 지정해야 합니다.
+  (비워두면 페이지와 같은 스킴(ws/wss)으로 대시보드 호스트의 6789 포트에 접속)
+- poles 인자는 브라우저가 만드는 구독 쿼리 파라미터일 뿐 접근 제어가 아닙니다. 브로드캐스터에는
+  인증이 없으므로 누구나 파라미터를 빼고 전체 폴대를 받을 수 있습니다. 의료진 담당 폴대 제한이
+  보안 요구사항인 배포에서는 켜지 말고 서버 쪽 조각(fragment) 갱신 경로를 사용하세요.
+"""
+
+import os
+from typing import Any, Dict, Iterable, Optional
+
+import streamlit.components.v1 as components
+
+# 비워두면 브라우저가 접속한 대시보드 호스트의 6789 포트로 페이지와 같은 스킴(ws/wss)으로 접속합니다.
+POLE_GRID_WS_URL = os.environ.get("POLE_GRID_WS_URL", "")
+POLE_GRID_ENABLED = os.environ.get("POLE_GRID_ENABLED", "0") == "1"  # 배포 조건은 위 모듈 설명 참고
+TARE_SETTLE_SECONDS = 30  # 영점 설정 후 수액팩 무게를 기준으로 잡기까지 기다리는 시간
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+_component = components.declare_component("pole_grid", path=_FRONTEND_DIR)
+
+
+def pole_grid(poles: Optional[Iterable[str]] = None, initial: Optional[Dict[str, Dict[str, Any]]] = None,
+              tare: Optional[Dict[str, Dict[str, Any]]] = None, history_window: int = 30,
+              ws_url: str = POLE_GRID_WS_URL, key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    실시간 폴대 그리드를 그립니다.
+
+    Args:
+        poles: 구독할 폴대 ID 목록 (None이면 전체, 표시 필터일 뿐 접근 제어는 아님)
+        initial: 폴대ID -> 최신값 (첫 프레임이 오기 전에 보여줄 값, LiveFeed.latest 형식)
+        tare: 폴대ID -> {"offset": g, "tare_time": epoch 초, "full_weight": g 또는 None} (세션의 영점 상태)
+        history_window: 스파크라인에 그릴 최근 샘플 수
+        ws_url: 브로드캐스터 웹소켓 주소 (비우면 대시보드 호스트의 6789 포트, HTTPS 배포에서는 wss:// 주소)
+
+    Returns:
+        dict: 마지막 사용자 동작 (위 모듈 설명 참고), 아직 없으면 None
+    """
+    return _component(
+        ws_url=ws_url,
+        poles=None if poles is None else sorted(map(str, poles)),
+        initial=initial or {},
+        tare=tare or {},
+        history_window=int(history_window),
+        settle_seconds=TARE_SETTLE_SECONDS,
+        key=key,
+        default=None,
+    )
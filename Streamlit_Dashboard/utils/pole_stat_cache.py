@@ -0,0 +1,185 @@
+"""
+pole_stat(배터리/분실 상태) 캐시 공용 모듈
+
+폴대별로 pole_stat을 query하던 N+1 패턴을 조회 경로에서 없애기 위해,
+별도의 느린 주기로 알려진 폴대들의 최신 pole_stat을 한 번에 읽어 메모리에 보관합니다.
+조회 경로에서는 get()으로 메모리 조회만 하며, TTL이 지난 항목은 제거됩니다.
+
+pole_stat은 (pole_id, timestamp) 키의 시계열이므로 테이블 전체를 scan하면 쌓인 기록 전체를
+매번 읽게 됩니다. 대신 폴대마다 최신순 Limit=1 query를 스레드 풀에서 동시에 실행하므로
+갱신 비용은 테이블 크기가 아니라 폴대 수에 비례합니다.
+(알려진 폴대: pole_ids로 넘긴 목록, 없으면 폴대당 아이템 하나인 loadcell 테이블의 키)
+
+- 브로드캐스터: websockets/pole_stat_cache.py가 asyncio 갱신 루프를 붙여 사용
+- 대시보드: get_pole_stat_cache()로 프로세스 공용 캐시를 받아 사용 (갱신 스레드 하나,
+  세션/페이지 재실행에서는 DynamoDB 호출 없음)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from . import storage
+from .table_reader import iter_pages, projection
+
+LOADCELL_TABLE = os.environ.get("DYNAMODB_TABLE", "loadcell")
+POLE_STAT_TABLE = os.environ.get("POLE_STAT_TABLE", "pole_stat")
+POLE_STAT_QUERY_WORKERS = int(os.environ.get("POLE_STAT_QUERY_WORKERS", "8"))  # 폴대별 query 동시 실행 수
+POLE_STAT_REFRESH_SECONDS = int(os.environ.get("POLE_STAT_REFRESH_SECONDS", "30"))  # 일괄 갱신 주기
+POLE_STAT_TTL_SECONDS = int(os.environ.get("POLE_STAT_TTL_SECONDS", "120"))  # 항목 유효 시간
+
+
+def _attr_value(attr: Optional[Dict[str, Any]]):
+    """DynamoDB client 형식의 속성값({'S': ...} / {'N': ...} / {'BOOL': ...})을 꺼냅니다."""
+    if not attr:
+        return None
+    for type_key in ('S', 'N', 'BOOL'):
+        if type_key in attr:
+            return attr[type_key]
+    return None
+
+
+class PoleStatCache:
+    """
+    pole_stat 테이블의 폴대별 최신 상태를 메모리에 보관하는 TTL 캐시
+
+    Args:
+        client: boto3 DynamoDB client (또는 storage.get_client() 호환 객체)
+        table_name: pole_stat 테이블 이름
+        ttl_seconds: 항목 유효 시간 (이 시간 동안 갱신되지 않으면 제거)
+        pole_ids: 갱신할 폴대 ID 목록을 돌려주는 함수 (None이거나 빈 목록이면 loadcell 테이블의 키)
+        workers: 폴대별 query를 동시에 실행할 스레드 수
+    """
+
+    ATTRIBUTES = ('pole_id', 'timestamp', 'battery_level', 'is_lost')
+
+    def __init__(self, client, table_name: str, ttl_seconds: float = 120,
+                 pole_ids: Optional[Callable[[], Iterable[str]]] = None, workers: int = POLE_STAT_QUERY_WORKERS):
+        self.client = client
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.pole_ids = pole_ids
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pole-stat")
+        self._entries: Dict[str, Dict[str, Any]] = {}  # pole_id -> {'fetched_at', 'timestamp', ...}
+        self._changed = set()  # 마지막 drain 이후 배터리/분실 상태가 바뀐 폴대
+        self._lock = threading.Lock()
+
+    def _known_poles(self) -> set:
+        """갱신할 폴대 ID 집합 (pole_ids 결과 + 이미 캐시에 있는 폴대)"""
+        poles = set(map(str, self.pole_ids())) if self.pole_ids is not None else set()
+        if not poles:
+            # 폴대당 아이템 하나인 loadcell 테이블의 키만 읽음 (폴대 수만큼만 읽기 비용 발생)
+            for page in iter_pages(self.client, LOADCELL_TABLE, ['loadcel']):
+                poles.update(str(_attr_value(item.get('loadcel'))) for item in page if item.get('loadcel'))
+        with self._lock:
+            poles.update(self._entries)
+        return poles
+
+    def _query_latest(self, pole_id: str) -> Optional[Dict[str, Any]]:
+        """폴대 하나의 최신 pole_stat 레코드 (최신순 Limit=1 query, 실패하면 None)"""
+        try:
+            response = self.client.query(
+                TableName=self.table_name,
+                KeyConditionExpression='pole_id = :pole_id',
+                ExpressionAttributeValues={':pole_id': {'S': pole_id}},
+                ScanIndexForward=False,  # 최신순 정렬
+                Limit=1,
+                **projection(self.ATTRIBUTES),
+            )
+        except Exception as e:
+            print(f"pole_stat 조회 실패 ({pole_id}번 폴대): {e}")
+            return None
+        items = response.get('Items', [])
+        if not items:
+            return None
+        return {
+            'timestamp': _attr_value(items[0].get('timestamp')) or '',
+            'battery_level': _attr_value(items[0].get('battery_level')),
+            'is_lost': _attr_value(items[0].get('is_lost')),
+        }
+
+    def refresh(self) -> int:
+        """
+        알려진 폴대마다 최신 pole_stat 한 건을 동시에 query하여 캐시를 갱신합니다.
+        (블로킹 호출이므로 브로드캐스터 이벤트 루프에서는 스레드에서, 대시보드에서는 start()의 갱신 스레드에서 실행됩니다.)
+
+        Returns:
+            int: 갱신된 폴대 수
+        """
+        poles = sorted(self._known_poles())
+        latest: Dict[str, Dict[str, Any]] = {
+            pole_id: record
+            for pole_id, record in zip(poles, self._executor.map(self._query_latest, poles))
+            if record is not None
+        }
+
+        fetched_at = time.time()
+        with self._lock:
+            for pole_id, record in latest.items():
+                record['fetched_at'] = fetched_at
+                previous = self._entries.get(pole_id)
+                if previous is None or (previous['battery_level'], previous['is_lost']) != (record['battery_level'], record['is_lost']):
+                    self._changed.add(pole_id)
+                self._entries[pole_id] = record
+        return len(latest)
+
+    def drain_changed(self) -> set:
+        """마지막 호출 이후 상태가 바뀐 폴대 ID 집합을 반환하고 비웁니다."""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def get(self, pole_id) -> Optional[Dict[str, Any]]:
+        """메모리에서 폴대 상태를 조회합니다. TTL이 지난 항목은 제거하고 None을 반환합니다."""
+        pole_id = str(pole_id)
+        with self._lock:
+            record = self._entries.get(pole_id)
+            if record is None:
+                return None
+            if time.time() - record['fetched_at'] > self.ttl_seconds:
+                del self._entries[pole_id]
+                return None
+            return record
+
+    def battery_level(self, pole_id):
+        record = self.get(pole_id)
+        return record['battery_level'] if record else None
+
+    def evict_expired(self) -> int:
+        """TTL이 지난 항목을 일괄 제거하고 제거된 개수를 반환합니다."""
+        now = time.time()
+        with self._lock:
+            expired = [p for p, r in self._entries.items() if now - r['fetched_at'] > self.ttl_seconds]
+            for pole_id in expired:
+                del self._entries[pole_id]
+        return len(expired)
+
+    def start(self, interval_seconds: float = POLE_STAT_REFRESH_SECONDS) -> "PoleStatCache":
+        """interval_seconds 주기로 캐시를 일괄 갱신하는 데몬 스레드를 시작합니다. (대시보드용)"""
+        def loop():
+            while True:
+                try:
+                    count = self.refresh()
+                    evicted = self.evict_expired()
+                    print(f"[pole_stat 캐시] 갱신 {count}개, 만료 제거 {evicted}개")
+                except Exception as e:
+                    print(f"pole_stat 캐시 갱신 실패: {e}")
+                time.sleep(interval_seconds)
+
+        threading.Thread(target=loop, name="pole-stat-cache", daemon=True).start()
+        return self
+
+
+_shared: Optional[PoleStatCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_pole_stat_cache() -> PoleStatCache:
+    """프로세스 공용 pole_stat 캐시 (처음 호출될 때 만들고 갱신 스레드를 시작)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PoleStatCache(storage.get_client(), POLE_STAT_TABLE, ttl_seconds=POLE_STAT_TTL_SECONDS).start()
+        return _shared
@@ -0,0 +1,157 @@
+"""
+폴대별 실시간 무게 히스토리 링 버퍼 (NumPy 배열 기반)
+
+용량을 고정해 한 번만 할당하고, 값을 두 번(i, i + capacity) 기록하는 미러 방식이라
+append는 O(1)이고 최근 n개 구간은 항상 연속된 배열 조각(복사 없는 view)으로 꺼낼 수 있습니다.
+
+    timestamps: int64 (센서 시각의 현지 벽시계 ms, datetime64[ms] view로 제공, 파싱 실패 시 NaT)
+    weights: float64 (무게 g)
+    received: float64 (수신 epoch 초, 영점 설정 이후 구간만 고를 때 사용)
+"""
+
+import time
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from .history_store import parse_sample_time
+
+NAT = np.iinfo(np.int64).min  # datetime64 view에서 NaT
+NAIVE_EPOCH = datetime(1970, 1, 1)
+
+
+def wall_clock_ms(timestamp) -> int:
+    """
+    샘플 timestamp를 현지 벽시계 기준 ms로 변환합니다.
+    (그래프 x축이 예전처럼 센서 시간대의 시각으로 보이도록 시간대 오프셋을 더함)
+    """
+    if isinstance(timestamp, str):
+        try:
+            parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        except ValueError:
+            parsed = None
+        if parsed is not None and parsed.tzinfo is None:
+            # 시간대 없는 값은 이미 벽시계 시각
+            return int(round((parsed - NAIVE_EPOCH).total_seconds() * 1000))
+    epoch, utc_offset = parse_sample_time(timestamp)
+    if epoch is None:
+        return NAT
+    return int(round((epoch + utc_offset) * 1000))
+
+
+class RingBuffer:
+    """
+    고정 용량 (timestamp, 무게) 링 버퍼.
+
+    window()가 돌려주는 배열은 내부 버퍼의 읽기 전용 view이므로, 다른 스레드가 계속 기록하는
+    버퍼라면 lock 안에서 snapshot()으로 복사해서 넘겨야 합니다.
+
+    Args:
+        capacity: 보관할 최대 샘플 수 (넘치면 가장 오래된 값부터 덮어씀)
+    """
+
+    __slots__ = ("capacity", "_timestamps", "_weights", "_received", "_head", "_size")
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._timestamps = np.full(2 * self.capacity, NAT, dtype=np.int64)
+        self._weights = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._received = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._head = 0  # 다음에 기록할 위치 [0, capacity)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp, weight: float, received_at: Optional[float] = None) -> None:
+        """샘플 하나를 추가합니다. (timestamp는 ISO 문자열/epoch 값)"""
+        self._put(wall_clock_ms(timestamp), weight, time.time() if received_at is None else received_at)
+
+    def _put(self, timestamp_ms: int, weight: float, received_at: float) -> None:
+        for index in (self._head, self._head + self.capacity):
+            self._timestamps[index] = timestamp_ms
+            self._weights[index] = weight
+            self._received[index] = received_at
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def clear(self) -> None:
+        self._head = 0
+        self._size = 0
+
+    def _bounds(self, n: Optional[int] = None, since: Optional[float] = None) -> Tuple[int, int]:
+        end = self._head + self.capacity
+        start = end - (self._size if n is None else min(max(int(n), 0), self._size))
+        if since is not None:
+            # 수신 시각은 기록 순서대로 증가하므로 이진 탐색으로 시작 위치를 찾음
+            start += int(np.searchsorted(self._received[start:end], since, side='left'))
+        return start, end
+
+    def window(self, n: Optional[int] = None, since: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        최근 구간의 (timestamps, weights) view (오래된 것부터).
+
+        Args:
+            n: 최근 몇 개까지 (None이면 보관 중인 전체)
+            since: 이 수신 epoch 초 이전 값은 제외
+
+        Returns:
+            (datetime64[ms] 배열, float64 무게 배열) - 복사 없는 읽기 전용 view
+        """
+        start, end = self._bounds(n, since)
+        timestamps = self._timestamps[start:end].view('datetime64[ms]')
+        weights = self._weights[start:end]
+        timestamps.flags.writeable = False
+        weights.flags.writeable = False
+        return timestamps, weights
+
+    def snapshot(self, n: Optional[int] = None, since: Optional[float] = None) -> "RingBuffer":
+        """최근 구간만 담은 독립 사본 (세션에 넘기는 용도, 배열 복사 한 번)"""
+        start, end = self._bounds(n, since)
+        return RingBuffer.from_arrays(self._timestamps[start:end], self._weights[start:end],
+                                      self._received[start:end], capacity=end - start)
+
+    @classmethod
+    def from_arrays(cls, timestamps_ms: np.ndarray, weights: np.ndarray, received: Optional[np.ndarray] = None,
+                    capacity: Optional[int] = None) -> "RingBuffer":
+        """배열에서 버퍼를 만듭니다. (capacity보다 길면 최근 값만 보관)"""
+        size = len(weights)
+        buffer = cls(size if capacity is None else capacity)
+        size = min(size, buffer.capacity)
+        if size:
+            for offset in (0, buffer.capacity):
+                buffer._timestamps[offset:offset + size] = timestamps_ms[-size:]
+                buffer._weights[offset:offset + size] = weights[-size:]
+                if received is not None:
+                    buffer._received[offset:offset + size] = received[-size:]
+        buffer._head = size % buffer.capacity
+        buffer._size = size
+        return buffer
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[object, float]], capacity: int) -> "RingBuffer":
+        """(timestamp, 무게) 튜플 목록에서 버퍼를 만듭니다. (추가/더미 히스토리용)"""
+        items = list(items)
+        timestamps = np.array([wall_clock_ms(timestamp) for timestamp, _ in items], dtype=np.int64)
+        weights = np.array([weight for _, weight in items], dtype=np.float64)
+        return cls.from_arrays(timestamps, weights, capacity=capacity)
+
+    def with_earlier(self, other: "RingBuffer", capacity: Optional[int] = None) -> "RingBuffer":
+        """
+        other에서 이 버퍼의 첫 샘플보다 이전 샘플만 앞에 붙인 새 버퍼를 돌려줍니다.
+        (실시간 히스토리 앞에 저장된 추가 히스토리를 이어 붙일 때 사용)
+
+        Args:
+            capacity: 새 버퍼 용량 (None이면 이 버퍼 용량, 넘치면 오래된 추가 히스토리부터 버림)
+        """
+        other_timestamps, other_weights = other.window()
+        timestamps, weights = self.window()
+        if len(timestamps):
+            earlier = other_timestamps.view(np.int64) < timestamps.view(np.int64)[0]
+            other_timestamps, other_weights = other_timestamps[earlier], other_weights[earlier]
+        return RingBuffer.from_arrays(
+            np.concatenate([other_timestamps.view(np.int64), timestamps.view(np.int64)]),
+            np.concatenate([other_weights, weights]),
+            capacity=self.capacity if capacity is None else capacity,
+        )
@@ -0,0 +1,208 @@
+"""
+loadcell 다중 해상도 롤업(1분 / 1시간 / 1일) 공용 모듈
+
+브로드캐스터의 RollupWriter가 수집 시점에 레코드마다 증분 집계하고,
+통계/보고서 페이지는 원본 히스토리 대신 필요한 해상도의 롤업을 읽습니다.
+
+테이블 형식 (ROLLUP_TABLE):
+    series (S, 파티션 키: "폴대ID#티어") | bucket (N, 구간 시작 epoch 초, 정렬 키)
+    loadcel (S) | tier (S) | count (N) | sum (N) | min (N) | max (N) | last (N) | usage (N)
+    utc_offset (N, 표시용 시간대 초) | expire_at (N, TTL)
+
+- usage: 구간 안에서 직전 샘플 대비 무게 감소분(g)의 합 (리필 등 증가분은 제외)
+- mean은 sum / count로 계산합니다.
+- 티어별 보관 기간이 다르므로 read_rollup_df()는 요청 구간과 해상도를 만족하는 가장 거친 티어를 고릅니다.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .table_reader import dataframe_chunks, iter_pages_parallel, iter_query_pages, DEFAULT_SEGMENTS
+
+ROLLUP_TABLE = os.environ.get("ROLLUP_TABLE", "loadcell_rollup")
+# 티어 이름 -> 구간 길이 (초), 가는 해상도부터
+TIERS = {"1m": 60, "1h": 3600, "1d": 86400}
+# 티어별 보관 일수 (expire_at 계산, 티어 선택 시 구간 시작이 보관 범위 안인지 확인)
+TIER_RETENTION_DAYS = {
+    "1m": int(os.environ.get("ROLLUP_RETENTION_1M_DAYS", "2")),
+    "1h": int(os.environ.get("ROLLUP_RETENTION_1H_DAYS", "90")),
+    "1d": int(os.environ.get("ROLLUP_RETENTION_1D_DAYS", "730")),
+}
+ROLLUP_COLUMNS = ['loadcel', 'timestamp', 'count', 'mean', 'min', 'max', 'last', 'usage']
+
+
+def series_key(pole_id: str, tier: str) -> str:
+    return f"{pole_id}#{tier}"
+
+
+def cell_start(epoch_seconds: float, seconds: int, utc_offset: int = 0) -> int:
+    """
+    샘플 시각이 속한 구간의 시작 epoch 초.
+    일 단위 구간이 UTC 자정이 아니라 샘플 시간대의 자정에서 시작하도록 오프셋을 반영합니다.
+    """
+    return int((epoch_seconds + utc_offset) // seconds * seconds - utc_offset)
+
+
+class RollupCell:
+    """폴대 하나 x 티어 하나 x 구간 하나의 증분 집계값"""
+
+    __slots__ = ("pole_id", "tier", "start", "utc_offset", "count", "total", "min", "max", "last", "usage")
+
+    def __init__(self, pole_id: str, tier: str, start: int, utc_offset: int = 0):
+        self.pole_id = pole_id
+        self.tier = tier
+        self.start = start
+        self.utc_offset = utc_offset
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+        self.usage = 0.0
+
+    def add(self, weight: float, drop: float) -> None:
+        """
+        샘플 하나를 반영합니다.
+
+        Args:
+            weight: 무게 (g)
+            drop: 직전 샘플 대비 감소량 (g, 증가했으면 0)
+        """
+        self.count += 1
+        self.total += weight
+        self.min = weight if self.min is None else min(self.min, weight)
+        self.max = weight if self.max is None else max(self.max, weight)
+        self.last = weight
+        self.usage += drop
+
+    def merge_earlier(self, item: Dict[str, Any]) -> None:
+        """
+        같은 구간의 이전 기록(client 형식 아이템)을 합칩니다. (재시작 전에 쌓인 집계를 덮어쓰지 않도록)
+        last는 이 셀이 더 최근이므로 셀에 샘플이 없을 때만 가져옵니다.
+        """
+        def number(name):
+            attr = item.get(name)
+            return float(attr['N']) if attr and 'N' in attr else None
+
+        count = int(number('count') or 0)
+        if not count:
+            return
+        earlier_min, earlier_max = number('min'), number('max')
+        self.total += number('sum') or 0.0
+        self.usage += number('usage') or 0.0
+        self.min = earlier_min if self.min is None else min(self.min, earlier_min)
+        self.max = earlier_max if self.max is None else max(self.max, earlier_max)
+        if not self.count:
+            self.last = number('last')
+        self.count += count
+
+    def to_item(self, expire_at: int) -> Dict[str, Any]:
+        """DynamoDB client 형식 아이템"""
+        return {
+            'series': {'S': series_key(self.pole_id, self.tier)},
+            'bucket': {'N': str(self.start)},
+            'loadcel': {'S': self.pole_id},
+            'tier': {'S': self.tier},
+            'count': {'N': str(self.count)},
+            'sum': {'N': repr(round(self.total, 3))},
+            'min': {'N': repr(round(self.min, 3))},
+            'max': {'N': repr(round(self.max, 3))},
+            'last': {'N': repr(round(self.last, 3))},
+            'usage': {'N': repr(round(self.usage, 3))},
+            'utc_offset': {'N': str(self.utc_offset)},
+            'expire_at': {'N': str(expire_at)},  # TTL 필드
+        }
+
+
+def pick_tier(resolution_seconds: float, start: Optional[datetime] = None, now: Optional[float] = None) -> Optional[str]:
+    """
+    요청 해상도와 구간을 만족하는 가장 거친 티어를 고릅니다.
+
+    Args:
+        resolution_seconds: 필요한 집계 간격 (초). 티어 구간 길이의 배수여야 다시 묶을 수 있습니다.
+        start: 읽을 구간 시작 (티어 보관 범위 확인용, None이면 확인하지 않음)
+
+    Returns:
+        str: 티어 이름 ("1d" / "1h" / "1m"), 만족하는 티어가 없으면 None (원본 히스토리 사용)
+    """
+    now = time.time() if now is None else now
+    for tier, seconds in sorted(TIERS.items(), key=lambda entry: entry[1], reverse=True):
+        if seconds > resolution_seconds or resolution_seconds % seconds:
+            continue
+        if start is not None and start.timestamp() < now - TIER_RETENTION_DAYS[tier] * 86400:
+            continue
+        return tier
+    return None
+
+
+def decode_rollup(item: Dict[str, Any]) -> Dict[str, Any]:
+    """롤업 아이템(boto3 resource 형식)을 ROLLUP_COLUMNS 행으로 변환합니다."""
+    count = int(item.get('count', 0) or 0)
+    tz = timezone(timedelta(seconds=int(item.get('utc_offset', 0) or 0)))
+    return {
+        'loadcel': str(item['loadcel']),
+        'timestamp': datetime.fromtimestamp(float(item['bucket']), tz),
+        'count': count,
+        'mean': float(item['sum']) / count if count else None,
+        'min': float(item['min']),
+        'max': float(item['max']),
+        'last': float(item['last']),
+        'usage': float(item['usage']),
+    }
+
+
+def _rollup_pages(table, tier: str, low: int, high: int, poles: Optional[Iterable[str]],
+                  segments: int) -> Iterator[List[Dict[str, Any]]]:
+    values = {':low': low, ':high': high}
+    if poles:
+        for pole_id in poles:
+            for page in iter_query_pages(
+                table, KeyConditionExpression='#s = :series AND #b BETWEEN :low AND :high',
+                ExpressionAttributeNames={'#s': 'series', '#b': 'bucket'},
+                ExpressionAttributeValues={**values, ':series': series_key(str(pole_id), tier)}
+            ):
+                yield [decode_rollup(item) for item in page]
+        return
+    for page in iter_pages_parallel(
+        table, segments=segments, FilterExpression='#t = :tier AND #b BETWEEN :low AND :high',
+        ExpressionAttributeNames={'#t': 'tier', '#b': 'bucket'}, ExpressionAttributeValues={**values, ':tier': tier}
+    ):
+        yield [decode_rollup(item) for item in page]
+
+
+def read_rollup_df(dynamodb, resolution_seconds: float, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None, poles: Optional[Sequence[str]] = None,
+                   tier: Optional[str] = None, segments: int = DEFAULT_SEGMENTS):
+    """
+    요청 해상도에 맞는 롤업 티어를 읽어 DataFrame으로 반환합니다.
+
+    Args:
+        dynamodb: boto3 DynamoDB resource
+        resolution_seconds: 필요한 집계 간격 (초, 예: 시간대별 3600 / 일별 86400)
+        start / end: 읽을 구간 (end는 포함하지 않음)
+        poles: 읽을 폴대 ID 목록 (지정하면 scan 대신 폴대별 query)
+        tier: 티어를 직접 지정 (None이면 pick_tier로 선택)
+
+    Returns:
+        pd.DataFrame: ROLLUP_COLUMNS 열 (usage/min/max 등은 g 단위, tier 속성에 사용한 티어 기록).
+        만족하는 티어가 없거나 구간에 롤업이 없으면 빈 DataFrame
+    """
+    import pandas as pd
+
+    tier = tier or pick_tier(resolution_seconds, start)
+    if tier is None:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    seconds = TIERS[tier]
+    if start is not None:
+        offset = start.utcoffset()
+        low = cell_start(start.timestamp(), seconds, int(offset.total_seconds()) if offset is not None else 0)
+    else:
+        low = 0
+    high = int(end.timestamp()) - 1 if end is not None else 2 ** 53
+    pages = _rollup_pages(dynamodb.Table(ROLLUP_TABLE), tier, low, high, poles, segments)
+    chunks = list(dataframe_chunks(pages, ROLLUP_COLUMNS))
+    frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=ROLLUP_COLUMNS)
+    frame.attrs['tier'] = tier
+    return frame
@@ -0,0 +1,567 @@
+"""
+저장소 백엔드 선택 모듈 (DynamoDB / 내장 SQLite)
+
+브로드캐스터와 대시보드 페이지는 boto3를 직접 만들지 않고 이 모듈의
+get_client() / get_resource()로 저장소 객체를 받아 씁니다.
+
+- dynamodb (기본값): boto3 DynamoDB client / resource를 반환합니다.
+  프로세스당 boto3 Session 하나에서 만들고(자격 증명/엔드포인트 해석 한 번), 연결 풀 크기,
+  TCP keep-alive, 타임아웃, 재시도 방식을 AWS_* 환경 변수의 botocore Config로 맞춥니다.
+  테이블 핸들도 get_table(이름)으로 프로세스 전체에서 공유합니다.
+- sqlite: 같은 호출 형식(scan / query / get_item / put_item / batch_write_item, resource.Table)을
+  지원하는 로컬 SQLite(WAL 모드) 구현을 반환합니다. 온프레미스 저지연 배포나
+  AWS 없이 전체 스택/벤치마크를 돌릴 때 사용합니다.
+
+    STORAGE_BACKEND=sqlite LOCAL_DB_PATH=/data/smart_pole.db python streamlit_websocket.py
+
+SQLite 테이블은 DynamoDB 테이블 하나당 하나씩 처음 사용할 때 만들어지며,
+(파티션 키, 정렬 키) 기본 키 인덱스(예: pole_id, timestamp)와 변경 순번(seq) 인덱스를 가집니다.
+아이템은 DynamoDB client 형식 JSON으로 저장하므로 두 백엔드의 값 표현이 같습니다.
+
+지원하는 표현식은 이 저장소가 쓰는 범위입니다:
+    이름 = :값, <>, <, <=, >, >=, 이름 BETWEEN :a AND :b, begins_with(이름, :값),
+    attribute_exists(이름), attribute_not_exists(이름)을 AND로 연결한 조건
+"""
+
+import base64
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+DYNAMODB = "dynamodb"
+SQLITE = "sqlite"
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", DYNAMODB)  # dynamodb / sqlite
+AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-2")
+LOCAL_DB_PATH = os.environ.get(
+    "LOCAL_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "local_data", "smart_pole.db"),
+)
+LOCAL_PAGE_ITEMS = int(os.environ.get("LOCAL_PAGE_ITEMS", "1000"))  # scan/query 페이지당 최대 아이템 수
+
+# boto3 연결 설정 (세션/페이지가 동시에 읽어도 연결을 기다리지 않도록 풀 크기를 넉넉히)
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", "3"))
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", "10"))
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "5"))
+AWS_RETRY_MODE = os.environ.get("AWS_RETRY_MODE", "adaptive")  # legacy / standard / adaptive
+AWS_TCP_KEEPALIVE = os.environ.get("AWS_TCP_KEEPALIVE", "1") == "1"
+
+# 테이블 이름 -> (파티션 키, 정렬 키). 테이블 이름은 각 모듈과 같은 환경 변수를 따릅니다.
+KEY_SCHEMAS: Dict[str, Tuple[str, Optional[str]]] = {
+    os.environ.get("DYNAMODB_TABLE", "loadcell"): ("loadcel", None),
+    os.environ.get("POLE_STAT_TABLE", "pole_stat"): ("pole_id", "timestamp"),
+    os.environ.get("TARE_TABLE", "tare"): ("loadcel", None),
+    os.environ.get("HISTORY_TABLE", "loadcell_history"): ("loadcel", "timestamp"),
+    os.environ.get("HISTORY_BUCKET_TABLE", "loadcell_history_bucket"): ("loadcel", "bucket"),
+    os.environ.get("ROLLUP_TABLE", "loadcell_rollup"): ("series", "bucket"),
+}
+
+_instances: Dict[str, Any] = {}
+_instances_lock = threading.RLock()  # 팩토리 안에서 다른 공용 객체를 만들 수 있도록 재진입 허용
+
+
+def _cached(name: str, factory):
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = factory()
+        return _instances[name]
+
+
+def _boto_config():
+    from botocore.config import Config
+
+    return Config(
+        region_name=AWS_REGION,
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+        retries={"max_attempts": AWS_MAX_ATTEMPTS, "mode": AWS_RETRY_MODE},
+        tcp_keepalive=AWS_TCP_KEEPALIVE,
+    )
+
+
+def _boto_session():
+    """프로세스 공용 boto3 Session (자격 증명 탐색을 한 번만 수행)"""
+    import boto3
+    return _cached("session", lambda: boto3.session.Session(region_name=AWS_REGION))
+
+
+def get_client():
+    """DynamoDB client 호환 객체 (프로세스당 하나)"""
+    if STORAGE_BACKEND == SQLITE:
+        return _cached("client", lambda: LocalClient(LOCAL_DB_PATH))
+    return _cached("client", lambda: _boto_session().client('dynamodb', config=_boto_config()))
+
+
+def get_resource():
+    """DynamoDB resource 호환 객체 (프로세스당 하나, .Table(이름) 지원)"""
+    if STORAGE_BACKEND == SQLITE:
+        return _cached("resource", lambda: LocalResource(get_client()))
+    return _cached("resource", lambda: _boto_session().resource('dynamodb', config=_boto_config()))
+
+
+def get_table(name: str):
+    """테이블 핸들 (이름별로 프로세스당 하나, 페이지 재실행마다 새로 만들지 않음)"""
+    return _cached(f"table:{name}", lambda: get_resource().Table(name))
+
+
+def get_streams_client():
+    """DynamoDB Streams client (dynamodb 백엔드에서만 사용)"""
+    if STORAGE_BACKEND == SQLITE:
+        raise ValueError("sqlite 백엔드에는 DynamoDB Streams가 없습니다. (LocalClient.changes_since 사용)")
+    return _cached("streams", lambda: _boto_session().client('dynamodbstreams', config=_boto_config()))
+
+
+# ====== 값 변환 (파이썬 값 <-> DynamoDB 타입 표기) ======
+
+def serialize(value) -> Dict[str, Any]:
+    """파이썬 값을 {'S': ...} / {'N': ...} 형식으로 변환합니다. (boto3 TypeSerializer의 부분 집합)"""
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, float):
+        return {'N': repr(value)}
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, dict):
+        return {'M': {key: serialize(item) for key, item in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize(item) for item in value]}
+    raise TypeError(f"저장할 수 없는 값 형식입니다: {type(value).__name__}")
+
+
+def deserialize(attr: Dict[str, Any]):
+    """{'S': ...} 형식을 파이썬 값으로 변환합니다. (숫자는 boto3 resource와 같이 Decimal)"""
+    (type_key, value), = attr.items()
+    if type_key == 'N':
+        return Decimal(value)
+    if type_key == 'M':
+        return {key: deserialize(item) for key, item in value.items()}
+    if type_key == 'L':
+        return [deserialize(item) for item in value]
+    if type_key == 'NULL':
+        return None
+    return value  # S / BOOL / B
+
+
+def _comparable(attr: Optional[Dict[str, Any]]):
+    """비교/정렬용 값 (N은 숫자, 나머지는 원래 값)"""
+    if attr is None:
+        return None
+    (type_key, value), = attr.items()
+    return Decimal(value) if type_key == 'N' else value
+
+
+def _key_value(attr: Dict[str, Any]):
+    """SQLite 키 열에 넣을 값 (정수 / 실수 / 문자열 / 바이트)"""
+    value = _comparable(attr)
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'__b64__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(type(value).__name__)
+
+
+def _json_hook(value):
+    if '__b64__' in value and len(value) == 1:
+        return base64.b64decode(value['__b64__'])
+    return value
+
+
+def _dump_item(item: Dict[str, Any]) -> str:
+    return json.dumps(item, default=_json_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def _load_item(text: str) -> Dict[str, Any]:
+    return json.loads(text, object_hook=_json_hook)
+
+
+# ====== 조건 표현식 (AND로 연결한 단순 조건) ======
+
+_TOKEN = re.compile(r"\s*(<=|>=|<>|=|<|>|\(|\)|,|[#:]?[A-Za-z_][A-Za-z0-9_.\-]*)")
+
+
+def _tokenize(expression: str) -> List[str]:
+    tokens, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match:
+            raise ValueError(f"지원하지 않는 표현식입니다: {expression!r}")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+def parse_conditions(expression: Optional[str], names: Optional[Dict[str, str]] = None,
+                     values: Optional[Dict[str, Any]] = None) -> List[Tuple]:
+    """
+    조건 표현식을 (속성 이름, 연산자, 비교값...) 튜플 리스트로 바꿉니다.
+
+    Args:
+        expression: KeyConditionExpression / FilterExpression 문자열
+        names: ExpressionAttributeNames
+        values: ExpressionAttributeValues (client 형식)
+
+    Returns:
+        [(이름, '=', 값), (이름, 'BETWEEN', 하한, 상한), (이름, 'begins_with', 값), (이름, 'exists', bool), ...]
+    """
+    if not expression:
+        return []
+    names = names or {}
+    values = values or {}
+    tokens = _tokenize(expression)
+    conditions = []
+    index = 0
+
+    def name(token):
+        return names[token] if token.startswith('#') else token
+
+    def value(token):
+        if not token.startswith(':') or token not in values:
+            raise ValueError(f"표현식 값이 없습니다: {token}")
+        return _comparable(values[token])
+
+    while index < len(tokens):
+        token = tokens[index]
+        lowered = token.lower()
+        if lowered in ('begins_with', 'attribute_exists', 'attribute_not_exists'):
+            if tokens[index + 1] != '(':
+                raise ValueError(f"함수 인자가 없습니다: {expression!r}")
+            if lowered == 'begins_with':
+                conditions.append((name(tokens[index + 2]), 'begins_with', value(tokens[index + 4])))
+                index += 6
+            else:
+                conditions.append((name(tokens[index + 2]), 'exists', lowered == 'attribute_exists'))
+                index += 4
+        elif index + 1 < len(tokens) and tokens[index + 1].upper() == 'BETWEEN':
+            if tokens[index + 3].upper() != 'AND':
+                raise ValueError(f"BETWEEN 형식이 올바르지 않습니다: {expression!r}")
+            conditions.append((name(token), 'BETWEEN', value(tokens[index + 2]), value(tokens[index + 4])))
+            index += 5
+        else:
+            conditions.append((name(token), tokens[index + 1], value(tokens[index + 2])))
+            index += 3
+        if index < len(tokens):
+            if tokens[index].upper() != 'AND':
+                raise ValueError(f"AND로 연결한 조건만 지원합니다: {expression!r}")
+            index += 1
+    return conditions
+
+
+def _matches(actual, condition: Tuple) -> bool:
+    operator = condition[1]
+    if operator == 'exists':
+        return (actual is not None) == condition[2]
+    if actual is None:
+        return False
+    try:
+        if operator == '=':
+            return actual == condition[2]
+        if operator == '<>':
+            return actual != condition[2]
+        if operator == '<':
+            return actual < condition[2]
+        if operator == '<=':
+            return actual <= condition[2]
+        if operator == '>':
+            return actual > condition[2]
+        if operator == '>=':
+            return actual >= condition[2]
+        if operator == 'BETWEEN':
+            return condition[2] <= actual <= condition[3]
+        if operator == 'begins_with':
+            return isinstance(actual, (str, bytes)) and actual.startswith(condition[2])
+    except TypeError:
+        return False  # 형식이 다른 값끼리는 DynamoDB처럼 일치하지 않는 것으로 처리
+    raise ValueError(f"지원하지 않는 연산자입니다: {operator}")
+
+
+def _filter(item: Dict[str, Any], conditions: List[Tuple]) -> bool:
+    return all(_matches(_comparable(item.get(condition[0])), condition) for condition in conditions)
+
+
+def _sql_value(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+_SQL_OPERATORS = {'=': '=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+
+# ====== SQLite 백엔드 ======
+
+class LocalClient:
+    """
+    DynamoDB client 호출 형식을 따르는 SQLite(WAL) 저장소
+
+    Args:
+        path: 데이터베이스 파일 경로 (":memory:"는 스레드마다 다른 DB가 되므로 파일 경로 권장)
+        key_schemas: 테이블 이름 -> (파티션 키, 정렬 키)
+        page_items: scan/query 페이지당 최대 아이템 수 (넘으면 LastEvaluatedKey 반환)
+    """
+
+    def __init__(self, path: str, key_schemas: Optional[Dict[str, Tuple[str, Optional[str]]]] = None,
+                 page_items: int = LOCAL_PAGE_ITEMS):
+        self.path = path
+        self.key_schemas = dict(KEY_SCHEMAS if key_schemas is None else key_schemas)
+        self.page_items = page_items
+        self._local = threading.local()  # sqlite3 연결은 스레드마다 따로 둡니다
+        self._created = set()
+        self._create_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")  # 쓰는 중에도 다른 프로세스가 읽을 수 있음
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=30000")
+            self._local.connection = connection
+        return connection
+
+    def _schema(self, table_name: str) -> Tuple[str, Optional[str]]:
+        schema = self.key_schemas.get(table_name)
+        if schema is None:
+            raise ValueError(f"키 구성이 등록되지 않은 테이블입니다: {table_name} (storage.KEY_SCHEMAS)")
+        return schema
+
+    def _table(self, table_name: str) -> str:
+        """테이블이 없으면 만들고 SQL에 쓸 이름을 반환합니다."""
+        if not re.fullmatch(r"[A-Za-z0-9_.\-]+", table_name):
+            raise ValueError(f"테이블 이름이 올바르지 않습니다: {table_name}")
+        quoted = f'"{table_name}"'
+        if table_name not in self._created:
+            self._schema(table_name)
+            with self._create_lock:
+                connection = self._connection()
+                # pk/sk는 형식 지정 없이 두어 숫자 키는 숫자로, 문자열 키는 문자열로 정렬됩니다.
+                connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {quoted} ("
+                    "pk NOT NULL, sk NOT NULL, part INTEGER NOT NULL, seq INTEGER NOT NULL, item TEXT NOT NULL, "
+                    "PRIMARY KEY (pk, sk)) WITHOUT ROWID"
+                )
+                connection.execute(f'CREATE INDEX IF NOT EXISTS "{table_name}__seq" ON {quoted} (seq)')
+                self._created.add(table_name)
+        return quoted
+
+    def _key_columns(self, table_name: str, item: Dict[str, Any]) -> Tuple[Any, Any]:
+        hash_key, sort_key = self._schema(table_name)
+        if hash_key not in item or (sort_key is not None and sort_key not in item):
+            raise ValueError(f"{table_name}: 키 속성({hash_key}, {sort_key})이 없는 아이템입니다.")
+        return _key_value(item[hash_key]), _key_value(item[sort_key]) if sort_key else ''
+
+    def _key_of(self, table_name: str, pk, sk) -> Dict[str, Any]:
+        hash_key, sort_key = self._schema(table_name)
+        key = {hash_key: serialize(pk)}
+        if sort_key:
+            key[sort_key] = serialize(sk)
+        return key
+
+    def _write(self, connection, table_name: str, quoted: str, item: Dict[str, Any]) -> None:
+        pk, sk = self._key_columns(table_name, item)
+        connection.execute(
+            f"INSERT OR REPLACE INTO {quoted} (pk, sk, part, seq, item) "
+            f"VALUES (?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM {quoted}), ?)",
+            (pk, sk, zlib.crc32(str(pk).encode()), _dump_item(item)),
+        )
+
+    def put_item(self, TableName: str, Item: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        quoted = self._table(TableName)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._write(connection, TableName, quoted, Item)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return {}
+
+    def get_item(self, TableName: str, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        quoted = self._table(TableName)
+        pk, sk = self._key_columns(TableName, Key)
+        row = self._connection().execute(f"SELECT item FROM {quoted} WHERE pk = ? AND sk = ?", (pk, sk)).fetchone()
+        return {'Item': _load_item(row[0])} if row else {}
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict[str, Any]]], **kwargs) -> Dict[str, Any]:
+        """PutRequest / DeleteRequest를 한 트랜잭션으로 적용합니다. (처리 못 한 아이템 없음)"""
+        connection = self._connection()
+        tables = {name: self._table(name) for name in RequestItems}
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for table_name, requests in RequestItems.items():
+                for request in requests:
+                    if 'PutRequest' in request:
+                        self._write(connection, table_name, tables[table_name], request['PutRequest']['Item'])
+                    else:
+                        pk, sk = self._key_columns(table_name, request['DeleteRequest']['Key'])
+                        connection.execute(f"DELETE FROM {tables[table_name]} WHERE pk = ? AND sk = ?", (pk, sk))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return {'UnprocessedItems': {}}
+
+    def _page(self, table_name: str, sql: str, params: List[Any], limit: Optional[int],
+              filters: List[Tuple], projection: Optional[str], names: Optional[Dict[str, str]]) -> Dict[str, Any]:
+        """행을 최대 limit개 읽어 필터/프로젝션을 적용하고 DynamoDB 응답 형식으로 만듭니다."""
+        page_size = min(limit or self.page_items, self.page_items)
+        rows = self._connection().execute(f"{sql} LIMIT ?", (*params, page_size + 1)).fetchall()
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        attributes = None
+        if projection:
+            attributes = [(names or {}).get(part.strip(), part.strip()) for part in projection.split(',')]
+        items = []
+        for pk, sk, text in rows:
+            item = _load_item(text)
+            if filters and not _filter(item, filters):
+                continue
+            if attributes is not None:
+                item = {name: item[name] for name in attributes if name in item}
+            items.append(item)
+        response = {'Items': items, 'Count': len(items), 'ScannedCount': len(rows)}
+        if more and rows:
+            response['LastEvaluatedKey'] = self._key_of(table_name, rows[-1][0], rows[-1][1])
+        return response
+
+    def scan(self, TableName: str, FilterExpression: Optional[str] = None, ProjectionExpression: Optional[str] = None,
+             ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+             ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+             Segment: Optional[int] = None, TotalSegments: Optional[int] = None,
+             ExclusiveStartKey: Optional[Dict[str, Any]] = None, Limit: Optional[int] = None,
+             **kwargs) -> Dict[str, Any]:
+        quoted = self._table(TableName)
+        where, params = [], []
+        if TotalSegments and TotalSegments > 1:
+            # 파티션 키 해시로 구간을 나눕니다 (DynamoDB 병렬 scan과 같은 방식)
+            where.append("part % ? = ?")
+            params += [TotalSegments, Segment]
+        if ExclusiveStartKey:
+            where.append("(pk, sk) > (?, ?)")
+            params += list(self._key_columns(TableName, ExclusiveStartKey))
+        sql = f"SELECT pk, sk, item FROM {quoted}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY pk, sk"
+        filters = parse_conditions(FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+        return self._page(TableName, sql, params, Limit, filters, ProjectionExpression, ExpressionAttributeNames)
+
+    def query(self, TableName: str, KeyConditionExpression: str, FilterExpression: Optional[str] = None,
+              ProjectionExpression: Optional[str] = None, ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+              ExpressionAttributeValues: Optional[Dict[str, Any]] = None, ScanIndexForward: bool = True,
+              ExclusiveStartKey: Optional[Dict[str, Any]] = None, Limit: Optional[int] = None,
+              **kwargs) -> Dict[str, Any]:
+        quoted = self._table(TableName)
+        hash_key, sort_key = self._schema(TableName)
+        where, params = [], []
+        for condition in parse_conditions(KeyConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues):
+            column = 'pk' if condition[0] == hash_key else 'sk' if condition[0] == sort_key else None
+            if column is None or (column == 'pk' and condition[1] != '='):
+                raise ValueError(f"키 조건은 파티션 키 = 값과 정렬 키 조건만 쓸 수 있습니다: {KeyConditionExpression!r}")
+            if condition[1] == 'BETWEEN':
+                where.append(f"{column} BETWEEN ? AND ?")
+                params += [_sql_value(condition[2]), _sql_value(condition[3])]
+            elif condition[1] == 'begins_with':
+                where.append(f"substr({column}, 1, ?) = ?")
+                params += [len(condition[2]), condition[2]]
+            elif condition[1] in _SQL_OPERATORS:
+                where.append(f"{column} {_SQL_OPERATORS[condition[1]]} ?")
+                params.append(_sql_value(condition[2]))
+            else:
+                raise ValueError(f"키 조건에 쓸 수 없는 연산자입니다: {condition[1]}")
+        if ExclusiveStartKey:
+            where.append("sk > ?" if ScanIndexForward else "sk < ?")
+            params.append(self._key_columns(TableName, ExclusiveStartKey)[1])
+        sql = f"SELECT pk, sk, item FROM {quoted} WHERE " + " AND ".join(where)
+        sql += " ORDER BY sk" + ("" if ScanIndexForward else " DESC")
+        filters = parse_conditions(FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+        return self._page(TableName, sql, params, Limit, filters, ProjectionExpression, ExpressionAttributeNames)
+
+    def changes_since(self, TableName: str, cursor: int, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        cursor(변경 순번) 이후 쓰인 아이템과 새 커서를 반환합니다. (DynamoDB Streams 대신 쓰는 로컬 변경 로그)
+        같은 키를 여러 번 쓰면 마지막 값 하나만 남습니다.
+        """
+        quoted = self._table(TableName)
+        rows = self._connection().execute(
+            f"SELECT seq, item FROM {quoted} WHERE seq > ? ORDER BY seq LIMIT ?",
+            (cursor, limit or self.page_items),
+        ).fetchall()
+        if not rows:
+            return [], cursor
+        return [_load_item(text) for _, text in rows], rows[-1][0]
+
+
+class LocalTable:
+    """DynamoDB resource Table 호출 형식을 따르는 LocalClient 래퍼 (값은 파이썬 값, 숫자는 Decimal)"""
+
+    def __init__(self, client: LocalClient, name: str):
+        self.client = client
+        self.name = name
+        self.table_name = name
+
+    @staticmethod
+    def _typed(values: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return {key: serialize(value) for key, value in values.items()} if values else values
+
+    @staticmethod
+    def _plain(item: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return {key: deserialize(value) for key, value in item.items()} if item else item
+
+    def _call(self, method, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        for name in ('ExpressionAttributeValues', 'ExclusiveStartKey', 'Key', 'Item'):
+            if name in kwargs:
+                kwargs[name] = self._typed(kwargs[name])
+        for name in ('KeyConditionExpression', 'FilterExpression'):
+            if name in kwargs and not isinstance(kwargs[name], str):
+                raise TypeError("로컬 저장소는 문자열 조건 표현식만 지원합니다. (boto3 conditions 객체 대신 문자열 사용)")
+        response = method(TableName=self.name, **kwargs)
+        if 'Items' in response:
+            response['Items'] = [self._plain(item) for item in response['Items']]
+        if 'Item' in response:
+            response['Item'] = self._plain(response['Item'])
+        if 'LastEvaluatedKey' in response:
+            response['LastEvaluatedKey'] = self._plain(response['LastEvaluatedKey'])
+        return response
+
+    def put_item(self, **kwargs) -> Dict[str, Any]:
+        return self._call(self.client.put_item, kwargs)
+
+    def get_item(self, **kwargs) -> Dict[str, Any]:
+        return self._call(self.client.get_item, kwargs)
+
+    def query(self, **kwargs) -> Dict[str, Any]:
+        return self._call(self.client.query, kwargs)
+
+    def scan(self, **kwargs) -> Dict[str, Any]:
+        return self._call(self.client.scan, kwargs)
+
+
+class LocalResource:
+    """DynamoDB resource 호환 객체 (.Table(이름)만 지원)"""
+
+    def __init__(self, client: LocalClient):
+        self.client = client
+
+    def Table(self, name: str) -> LocalTable:
+        return LocalTable(self.client, name)
@@ -0,0 +1,215 @@
+"""
+DynamoDB 테이블 읽기 공용 유틸리티
+
+브로드캐스터(loadcell)와 통계/보고서 페이지(loadcell_history)가 함께 사용하는 scan 헬퍼입니다.
+- 페이지네이션: LastEvaluatedKey를 끝까지 따라가므로 1MB를 넘는 테이블도 잘리지 않습니다.
+- 병렬 세그먼트 scan: Segment/TotalSegments로 나눈 구간을 스레드 풀에서 동시에 읽습니다.
+- 프로젝션: 필요한 속성만 읽어 전송량과 읽기 비용을 줄입니다. (예약어는 #이름으로 자동 치환)
+- DataFrame 청크: 행을 chunk_rows개씩 DataFrame으로 만들어 스트리밍합니다. (pandas는 이 기능에서만 필요)
+- query 페이지네이션: 파티션 키 + 정렬 키 범위 조회도 같은 방식으로 끝까지 읽습니다.
+
+source로는 boto3 client(table_name 지정, 원시 {'S': ...} 아이템)와
+boto3 resource Table(table_name 생략, 역직렬화된 아이템)을 모두 받을 수 있습니다.
+
+    from utils.table_reader import scan_items, read_dataframe
+    items = scan_items(dynamodb_client, 'loadcell', segments=4)
+    df = read_dataframe(dynamodb.Table('loadcell_history'), attributes=['loadcel', 'timestamp'])
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+DEFAULT_SEGMENTS = int(os.environ.get("TABLE_SCAN_SEGMENTS", "4"))  # 병렬 scan 세그먼트 수
+DEFAULT_CHUNK_ROWS = int(os.environ.get("TABLE_CHUNK_ROWS", "5000"))  # DataFrame 청크당 행 수
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_DONE = object()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """세그먼트 scan용 공용 스레드 풀 (프로세스당 하나, 필요할 때 생성)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("TABLE_SCAN_WORKERS", "16")), thread_name_prefix="table-scan"
+            )
+        return _executor
+
+
+def projection(attributes: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """
+    속성 이름 목록으로 ProjectionExpression / ExpressionAttributeNames 인자를 만듭니다.
+    모든 이름을 #p0, #p1 ...로 치환하므로 timestamp 같은 예약어도 그대로 쓸 수 있습니다.
+    """
+    if not attributes:
+        return {}
+    names = {f"#p{index}": name for index, name in enumerate(attributes)}
+    return {'ProjectionExpression': ", ".join(names), 'ExpressionAttributeNames': names}
+
+
+def _scan_function(source, table_name: Optional[str], operation: str = 'scan') -> Callable[..., Dict[str, Any]]:
+    method = getattr(source, operation)
+    if table_name is None:
+        return method  # boto3 resource Table
+    return lambda **kwargs: method(TableName=table_name, **kwargs)  # boto3 client
+
+
+def _follow_pages(call: Callable[..., Dict[str, Any]], kwargs: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+    while True:
+        response = call(**kwargs)
+        yield response.get('Items', [])
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+def iter_query_pages(source, table_name: Optional[str] = None, attributes: Optional[Sequence[str]] = None,
+                     **query_kwargs) -> Iterator[List[Dict[str, Any]]]:
+    """
+    query 결과를 LastEvaluatedKey가 없을 때까지 페이지 단위로 돌려줍니다.
+    (KeyConditionExpression 등은 query_kwargs로 넘깁니다. attributes의 #p 이름과 겹치지 않게 주의)
+    """
+    kwargs = dict(query_kwargs)
+    names = dict(kwargs.pop('ExpressionAttributeNames', {}))
+    extra = projection(attributes)
+    names.update(extra.pop('ExpressionAttributeNames', {}))
+    kwargs.update(extra)
+    if names:
+        kwargs['ExpressionAttributeNames'] = names
+    yield from _follow_pages(_scan_function(source, table_name, 'query'), kwargs)
+
+
+def iter_pages(source, table_name: Optional[str] = None, attributes: Optional[Sequence[str]] = None,
+               segment: Optional[int] = None, total_segments: Optional[int] = None,
+               **scan_kwargs) -> Iterator[List[Dict[str, Any]]]:
+    """
+    scan 결과를 LastEvaluatedKey가 없을 때까지 페이지(아이템 리스트) 단위로 돌려줍니다.
+
+    Args:
+        source: boto3 client 또는 resource Table
+        table_name: client를 쓸 때의 테이블 이름 (Table이면 None)
+        attributes: 읽을 속성 이름 목록 (None이면 전체)
+        segment / total_segments: 병렬 scan 중 이 호출이 맡을 구간
+        scan_kwargs: FilterExpression 등 scan에 그대로 넘길 인자
+    """
+    kwargs = dict(scan_kwargs)
+    names = dict(kwargs.pop('ExpressionAttributeNames', {}))
+    extra = projection(attributes)
+    names.update(extra.pop('ExpressionAttributeNames', {}))
+    kwargs.update(extra)
+    if names:
+        kwargs['ExpressionAttributeNames'] = names
+    if total_segments is not None and total_segments > 1:
+        kwargs['Segment'] = segment
+        kwargs['TotalSegments'] = total_segments
+    yield from _follow_pages(_scan_function(source, table_name), kwargs)
+
+
+def iter_pages_parallel(source, table_name: Optional[str] = None, attributes: Optional[Sequence[str]] = None,
+                        segments: int = DEFAULT_SEGMENTS, **scan_kwargs) -> Iterator[List[Dict[str, Any]]]:
+    """
+    테이블을 segments개 구간으로 나눠 스레드 풀에서 동시에 scan하고, 도착하는 순서대로 페이지를 돌려줍니다.
+    (페이지 순서는 보장되지 않습니다. 어느 구간이든 오류가 나면 그 예외를 다시 발생시킵니다.)
+    """
+    if segments <= 1:
+        yield from iter_pages(source, table_name, attributes, **scan_kwargs)
+        return
+    pages: "queue.Queue" = queue.Queue()
+
+    def scan_segment(segment: int) -> None:
+        try:
+            for page in iter_pages(source, table_name, attributes, segment, segments, **scan_kwargs):
+                pages.put(page)
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(_DONE)
+
+    executor = _get_executor()
+    for segment in range(segments):
+        executor.submit(scan_segment, segment)
+    remaining = segments
+    while remaining:
+        page = pages.get()
+        if page is _DONE:
+            remaining -= 1
+        elif isinstance(page, Exception):
+            raise page
+        else:
+            yield page
+
+
+def scan_items(source, table_name: Optional[str] = None, attributes: Optional[Sequence[str]] = None,
+               segments: int = 1, **scan_kwargs) -> List[Dict[str, Any]]:
+    """
+    테이블 전체 아이템을 리스트로 읽습니다. (segments > 1이면 병렬 세그먼트 scan)
+
+    Returns:
+        List[Dict]: 아이템 리스트 (병렬 scan이면 순서 보장 안 됨)
+    """
+    items: List[Dict[str, Any]] = []
+    for page in iter_pages_parallel(source, table_name, attributes, segments, **scan_kwargs):
+        items.extend(page)
+    return items
+
+
+def iter_dataframe_chunks(source, table_name: Optional[str] = None, attributes: Optional[Sequence[str]] = None,
+                          segments: int = DEFAULT_SEGMENTS, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                          convert: Optional[Callable] = None, **scan_kwargs):
+    """
+    scan 결과를 chunk_rows행 단위 pandas DataFrame으로 스트리밍합니다.
+
+    Args:
+        convert: 청크마다 적용할 변환 함수 (DataFrame -> DataFrame, 예: 숫자/날짜 변환)
+
+    Yields:
+        pd.DataFrame
+    """
+    # 프로젝션한 속성이 없는 아이템만 모인 청크에서도 열 구성이 같도록 열 이름을 고정합니다.
+    columns = list(attributes) if attributes else None
+    pages = iter_pages_parallel(source, table_name, attributes, segments, **scan_kwargs)
+    yield from dataframe_chunks(pages, columns, chunk_rows, convert)
+
+
+def dataframe_chunks(pages: Iterable[List[Dict[str, Any]]], columns: Optional[Sequence[str]] = None,
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS, convert: Optional[Callable] = None):
+    """
+    행(dict) 페이지 이터레이터를 chunk_rows행 단위 DataFrame으로 묶습니다.
+    (scan/query 결과를 가공한 행에도 쓸 수 있도록 분리한 헬퍼)
+    """
+    import pandas as pd
+
+    columns = list(columns) if columns else None
+    rows: List[Dict[str, Any]] = []
+    for page in pages:
+        rows.extend(page)
+        while len(rows) >= chunk_rows:
+            chunk = pd.DataFrame(rows[:chunk_rows], columns=columns)
+            del rows[:chunk_rows]
+            yield convert(chunk) if convert else chunk
+    if rows:
+        chunk = pd.DataFrame(rows, columns=columns)
+        yield convert(chunk) if convert else chunk
+
+
+def read_dataframe(source, table_name: Optional[str] = None, attributes: Optional[Sequence[str]] = None,
+                   segments: int = DEFAULT_SEGMENTS, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                   convert: Optional[Callable] = None, **scan_kwargs):
+    """
+    테이블 전체를 청크 단위로 읽고 변환한 뒤 하나의 DataFrame으로 합칩니다.
+
+    Returns:
+        pd.DataFrame: 아이템이 없으면 빈 DataFrame
+    """
+    import pandas as pd
+
+    chunks = list(iter_dataframe_chunks(source, table_name, attributes, segments, chunk_rows, convert, **scan_kwargs))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
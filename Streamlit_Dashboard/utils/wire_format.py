@@ -0,0 +1,244 @@
+"""
+브로드캐스터 프레임 와이어 포맷 (인코딩/디코딩)
+
+브로드캐스터와 대시보드가 함께 사용하는 프레임 직렬화 모듈입니다.
+클라이언트는 접속 URL의 ?format= 으로 포맷을 고르고, 서버가 지원하지 않으면 JSON을 사용합니다.
+
+- json: 기존 텍스트 프레임 (기본값, 숫자는 DynamoDB 문자열 그대로)
+- struct: 고정 레이아웃 바이너리 프레임 (추가 의존성 없음)
+- msgpack: MessagePack 바이너리 프레임 (msgpack 패키지가 설치된 경우만)
+
+바이너리 포맷에서는 current_weight / remaining_sec를 숫자로 보내므로
+클라이언트에서 문자열을 다시 float()으로 파싱할 필요가 없습니다.
+
+struct 레이아웃 (리틀 엔디언, 폴대 필드를 열 단위로 모아 한 번에 풀 수 있도록 배치):
+    헤더: magic "IV"(2) | version u8 | type u8 | epoch u64 | seq u32 | from_seq u32 | count u16
+    pole_id 블록: u32 길이 + UTF-8 ("\x1f"로 구분)
+    current_weight: f64 x count (NaN=없음) | remaining_sec: f64 x count (NaN=없음)
+    battery_level: i8 x count (-1=없음) | nurse_call: i8 x count (-1=없음)
+    flow_rate: f32 x count (NaN=없음)
+    remaining_sec_est / remaining_sec_low / remaining_sec_high: i32 x count (-1=없음)
+    timestamp 블록: u32 길이 + UTF-8 ("\x1f"로 구분)
+    레이아웃에 없는 필드는 struct 포맷에서 전송되지 않습니다.
+"""
+
+import json
+import math
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:  # 선택 의존성
+    msgpack = None
+
+JSON = "json"
+STRUCT = "struct"
+MSGPACK = "msgpack"
+
+STRUCT_MAGIC = b"IV"
+STRUCT_VERSION = 2
+_HEADER = struct.Struct("<2sBBQIIH")
+_BLOCK_LENGTH = struct.Struct("<I")
+_SEPARATOR = "\x1f"
+_NURSE_CALL = {-1: None, 0: False, 1: True}
+_FRAME_TYPES = ["delta", "snapshot"]
+NUMERIC_FIELDS = ("current_weight", "remaining_sec")
+ESTIMATE_FIELDS = ("remaining_sec_est", "remaining_sec_low", "remaining_sec_high")  # 정수 초, -1=없음
+
+
+def available_formats() -> List[str]:
+    """현재 환경에서 사용할 수 있는 포맷 목록"""
+    formats = [JSON, STRUCT]
+    if msgpack is not None:
+        formats.append(MSGPACK)
+    return formats
+
+
+def negotiate(requested: Optional[str]) -> str:
+    """클라이언트가 요청한 포맷을 지원하면 그대로, 아니면 JSON을 반환합니다."""
+    requested = (requested or JSON).lower()
+    return requested if requested in available_formats() else JSON
+
+
+def _to_number(value) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _number_or_nan(value) -> float:
+    number = _to_number(value)
+    return math.nan if number is None else number
+
+
+def numeric_pole(pole: Dict[str, Any]) -> Dict[str, Any]:
+    """current_weight / remaining_sec 문자열을 숫자로 바꾼 사본을 반환합니다."""
+    converted = dict(pole)
+    for field in NUMERIC_FIELDS:
+        if field in converted:
+            converted[field] = _to_number(converted[field])
+    return converted
+
+
+def _pack_strings(values) -> bytes:
+    data = _SEPARATOR.join("" if value is None else str(value) for value in values).encode("utf-8")
+    return _BLOCK_LENGTH.pack(len(data)) + data
+
+
+def _unpack_strings(payload: bytes, offset: int, count: int):
+    (length,) = _BLOCK_LENGTH.unpack_from(payload, offset)
+    start = offset + _BLOCK_LENGTH.size
+    values = payload[start:start + length].decode("utf-8").split(_SEPARATOR) if count else []
+    if len(values) != count:
+        raise ValueError("struct 프레임 문자열 블록 개수 불일치")
+    return values, start + length
+
+
+def _small_int(value) -> int:
+    if value is None:
+        return -1
+    try:
+        return max(-1, min(127, int(float(value))))
+    except (TypeError, ValueError):
+        return -1
+
+
+def _int_or_missing(value) -> int:
+    if value is None:
+        return -1
+    try:
+        return max(-1, min(2 ** 31 - 1, int(value)))
+    except (TypeError, ValueError):
+        return -1
+
+
+def _column(typecode: str, payload: bytes, offset: int, count: int):
+    column = array(typecode)
+    column.frombytes(payload[offset:offset + count * column.itemsize])
+    if len(column) != count:
+        raise ValueError("struct 프레임 길이 부족")
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column, offset + count * column.itemsize
+
+
+def _encode_struct(frame: Dict[str, Any]) -> bytes:
+    poles = frame.get("poles") or []
+    seq = frame.get("seq", 0)
+    weights = array("d", (_number_or_nan(pole.get("current_weight")) for pole in poles))
+    remaining = array("d", (_number_or_nan(pole.get("remaining_sec")) for pole in poles))
+    battery = array("b", (_small_int(pole.get("battery_level")) for pole in poles))
+    nurse_call = array("b", (-1 if pole.get("nurse_call") is None else int(bool(pole.get("nurse_call"))) for pole in poles))
+    flow_rate = array("f", (_number_or_nan(pole.get("flow_rate")) for pole in poles))
+    estimates = [
+        array("i", (_int_or_missing(pole.get(field)) for pole in poles)) for field in ESTIMATE_FIELDS
+    ]
+    if sys.byteorder != "little":
+        for column in [weights, remaining, flow_rate] + estimates:
+            column.byteswap()
+    return b"".join([
+        _HEADER.pack(
+            STRUCT_MAGIC, STRUCT_VERSION, _FRAME_TYPES.index(frame.get("type", "delta")),
+            frame.get("epoch", 0), seq, frame.get("from_seq", seq), len(poles)
+        ),
+        _pack_strings(pole.get("loadcel") for pole in poles),
+        weights.tobytes(), remaining.tobytes(), battery.tobytes(), nurse_call.tobytes(),
+        flow_rate.tobytes(), *(column.tobytes() for column in estimates),
+        _pack_strings(pole.get("timestamp") for pole in poles),
+    ])
+
+
+def _decode_struct_header(payload: bytes) -> Dict[str, Any]:
+    magic, version, frame_type, epoch, seq, from_seq, count = _HEADER.unpack_from(payload, 0)
+    if magic != STRUCT_MAGIC or version != STRUCT_VERSION:
+        raise ValueError(f"지원하지 않는 struct 프레임: {magic!r} v{version}")
+    frame = {"type": _FRAME_TYPES[frame_type], "epoch": epoch, "seq": seq, "count": count}
+    if from_seq != seq:
+        frame["from_seq"] = from_seq
+    return frame
+
+
+def _decode_struct(payload: bytes) -> Dict[str, Any]:
+    frame = _decode_struct_header(payload)
+    count = frame.pop("count")
+    ids, offset = _unpack_strings(payload, _HEADER.size, count)
+    weights, offset = _column("d", payload, offset, count)
+    remaining, offset = _column("d", payload, offset, count)
+    battery, offset = _column("b", payload, offset, count)
+    nurse_call, offset = _column("b", payload, offset, count)
+    flow_rate, offset = _column("f", payload, offset, count)
+    est, offset = _column("i", payload, offset, count)
+    low, offset = _column("i", payload, offset, count)
+    high, offset = _column("i", payload, offset, count)
+    timestamps, offset = _unpack_strings(payload, offset, count)
+    frame["poles"] = [
+        {
+            "loadcel": loadcel,
+            "current_weight": None if w != w else w,  # NaN 검사
+            "battery_level": None if b < 0 else b,
+            "nurse_call": _NURSE_CALL[n],
+            "remaining_sec": None if r != r else r,
+            "timestamp": ts,
+            "flow_rate": None if f != f else round(f, 1),
+            "remaining_sec_est": e,
+            "remaining_sec_low": None if lo < 0 else lo,
+            "remaining_sec_high": None if hi < 0 else hi,
+        }
+        for loadcel, w, r, b, n, f, e, lo, hi, ts
+        in zip(ids, weights, remaining, battery, nurse_call, flow_rate, est, low, high, timestamps)
+    ]
+    return frame
+
+
+def encode(frame: Dict[str, Any], fmt: str = JSON):
+    """
+    프레임 딕셔너리를 지정한 포맷으로 직렬화합니다.
+
+    Returns:
+        json이면 str, struct/msgpack이면 bytes
+    """
+    if fmt == STRUCT:
+        return _encode_struct(frame)
+    if fmt == MSGPACK and msgpack is not None:
+        binary_frame = dict(frame)
+        binary_frame["poles"] = [numeric_pole(pole) for pole in frame.get("poles") or []]
+        return msgpack.packb(binary_frame, use_bin_type=True)
+    return json.dumps(frame, ensure_ascii=False, separators=(',', ':'))
+
+
+def decode_header(message) -> Any:
+    """
+    시퀀스 추적에 필요한 프레임 헤더(type, epoch, seq, from_seq)만 복원합니다.
+    struct 프레임은 폴대 데이터를 풀지 않으므로 수신 스레드에서 가볍게 쓸 수 있습니다.
+    """
+    if isinstance(message, (bytes, bytearray, memoryview)) and bytes(message[:2]) == STRUCT_MAGIC:
+        try:
+            frame = _decode_struct_header(bytes(message))
+        except (struct.error, IndexError) as e:
+            raise ValueError(f"손상된 struct 프레임: {e}") from e
+        frame.pop("count")
+        return frame
+    return decode(message)
+
+
+def decode(message) -> Any:
+    """
+    수신한 웹소켓 메시지를 프레임으로 복원합니다. (텍스트는 JSON, 바이너리는 struct/msgpack)
+    """
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        payload = bytes(message)
+        if payload[:2] == STRUCT_MAGIC:
+            try:
+                return _decode_struct(payload)
+            except (struct.error, IndexError) as e:
+                raise ValueError(f"손상된 struct 프레임: {e}") from e
+        if msgpack is None:
+            raise ValueError("msgpack 프레임을 디코딩하려면 msgpack 패키지가 필요합니다.")
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(message)
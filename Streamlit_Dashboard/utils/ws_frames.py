@@ -0,0 +1,142 @@
+import json
+from urllib.parse import urlencode
+from typing import Any, Dict, Iterator
+
+from . import wire_format
+
+
+def iter_pole_updates(message) -> Iterator[Dict[str, Any]]:
+    """
+    브로드캐스터 웹소켓 메시지에서 폴대 단위 업데이트를 하나씩 꺼냅니다.
+
+    - delta 프레임: {"type": "delta", "poles": [{...}, ...]}
+    - 구버전 단일 객체: {"loadcel": "1", "current_weight": ..., ...}
+    - 바이너리(struct/msgpack) 프레임도 같은 형태로 복원해 꺼냅니다.
+    """
+    data = wire_format.decode(message)
+    if not isinstance(data, dict):
+        return
+    if 'poles' in data:
+        for pole in data.get('poles') or []:
+            if isinstance(pole, dict) and pole.get('loadcel'):
+                yield pole
+    elif data.get('loadcel'):
+        yield data
+
+
+def is_alert_frame(message) -> bool:
+    """알림 채널 프레임인지 확인합니다. (알림 프레임은 항상 '{"type":"alert"'로 시작하는 JSON 텍스트)"""
+    return isinstance(message, str) and message.startswith('{"type":"alert"')
+
+
+def iter_alert_events(message) -> Iterator[Dict[str, Any]]:
+    """
+    알림 채널 프레임에서 알림 이벤트를 하나씩 꺼냅니다.
+
+    - {"type": "alert", "events": [{"event_id": ..., "alert_id": ..., "state": "raised", ...}, ...]}
+    """
+    data = json.loads(message)
+    if not isinstance(data, dict) or data.get('type') != 'alert':
+        return
+    for event in data.get('events') or []:
+        if isinstance(event, dict) and event.get('event_id'):
+            yield event
+
+
+def estimate_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    브로드캐스터 추정기가 계산한 남은 시간/투여 속도 필드를 꺼냅니다.
+    (대시보드는 다시 계산하지 않고 이 값을 표시만 합니다.)
+
+    Returns:
+        remaining_sec(초, 정보 없음 -1), remaining_sec_low/high(신뢰 구간, 없으면 None), flow_rate(g/h)
+    """
+    def _seconds(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    remaining = _seconds(data.get('remaining_sec_est'))
+    return {
+        'remaining_sec': remaining if remaining is not None else -1,
+        'remaining_sec_low': _seconds(data.get('remaining_sec_low')),
+        'remaining_sec_high': _seconds(data.get('remaining_sec_high')),
+        'flow_rate': data.get('flow_rate'),
+    }
+
+
+class FrameCursor:
+    """
+    브로드캐스터 프레임의 (epoch, seq) 위치를 추적합니다.
+
+    - 재접속 시 url()로 마지막 수신 위치를 서버에 알려 놓친 delta만 다시 받습니다.
+    - 수신 중 시퀀스 누락이 보이면 resume 요청을 만들고, 재전송이 도착할 때까지
+      그 이후 프레임은 건너뜁니다 (오래된 재전송 값이 새 값을 덮어쓰지 않도록).
+    - poles / ward를 지정하면 접속 URL에 구독 정보를 실어 해당 폴대만 받습니다.
+
+    Args:
+        poles: 구독할 폴대 ID 목록 (None이면 전체)
+        ward: 구독할 병동 이름
+        frame_format: 요청할 프레임 포맷 (json / struct / msgpack, None이면 서버 기본값 json)
+    """
+
+    def __init__(self, poles=None, ward=None, frame_format=None):
+        self.epoch = None
+        self.last_seq = None
+        self.poles = None if poles is None else sorted(map(str, poles))
+        self.ward = ward
+        self.frame_format = frame_format
+        self._resume_pending = False
+
+    def url(self, base_url: str) -> str:
+        params = {}
+        if self.poles is not None:
+            params['poles'] = ','.join(self.poles)
+        if self.ward:
+            params['ward'] = self.ward
+        if self.frame_format:
+            params['format'] = self.frame_format
+        if self.epoch is not None and self.last_seq is not None:
+            params['epoch'] = self.epoch
+            params['last_seq'] = self.last_seq
+        if not params:
+            return base_url
+        return f"{base_url.rstrip('/')}/?{urlencode(params)}"
+
+    def _resume_message(self, epoch, last_seq) -> str:
+        self._resume_pending = True
+        return json.dumps({"type": "resume", "epoch": epoch, "last_seq": last_seq})
+
+    def observe(self, message):
+        """
+        수신한 프레임으로 위치를 갱신합니다.
+
+        Returns:
+            (적용 여부, 서버로 보낼 resume 메시지 또는 None)
+        """
+        try:
+            data = wire_format.decode_header(message)
+        except (TypeError, ValueError):
+            return True, None
+        if not isinstance(data, dict) or data.get('seq') is None:
+            return True, None
+        epoch, seq = data.get('epoch'), data['seq']
+        from_seq = data.get('from_seq', seq)
+
+        if data.get('type') == 'snapshot':
+            self.epoch, self.last_seq, self._resume_pending = epoch, seq, False
+            return True, None
+        if self.last_seq is None or epoch != self.epoch:
+            # 스냅샷 없이 delta부터 받은 경우(또는 서버 재시작): 적용하고 전체 스냅샷을 요청
+            self.epoch, self.last_seq = epoch, seq
+            return True, None if self._resume_pending else self._resume_message(None, None)
+        if seq <= self.last_seq:
+            # 재전송과 겹친 중복 프레임
+            return False, None
+        if from_seq > self.last_seq + 1:
+            # 누락 발생: 재전송을 요청하고 도착할 때까지 이후 프레임은 건너뜀
+            return False, None if self._resume_pending else self._resume_message(self.epoch, self.last_seq)
+        self.last_seq = seq
+        self._resume_pending = False
+        return True, None
@@ -0,0 +1,239 @@
+"""
+브로드캐스터 알림 평가 엔진
+
+들어오는 폴대 레코드마다 한 번만 임계값을 평가하고, 상태가 바뀐 순간(전이)에만
+알림 이벤트를 만듭니다. 이벤트는 delta 프레임과 별도의 알림 채널(type: "alert")로 전송되므로
+브라우저 세션 수와 관계없이 알림 평가 비용은 서버에서 한 번만 듭니다.
+
+알림 종류 (alert_id는 대시보드 ALERT_TEMPLATES 번호와 같습니다):
+    1 done: 투여 완료 (0 < 무게 <= done_weight)
+    2 almost_empty: 거의 다 됨 (0 < 무게 <= almost_weight)
+    3 battery_low: 배터리 부족 (battery_level <= battery_level_threshold)
+    4 nurse_call: 너스콜 (nurse_call == True)
+    5 pole_lost: 폴대 연결 끊김 (lost_seconds 동안 레코드 수신 없음, check_lost()로 평가)
+
+이 중 done / nurse_call / pole_lost는 긴급 알림(CRITICAL_KINDS)으로, 브로드캐스터가
+일반 무게 갱신과 별도의 우선 경로(priority lane)에서 수집 즉시 평가합니다.
+
+각 상태는 raised(발생) / cleared(해제) 전이를 이벤트로 내보냅니다.
+무게 알림은 임계값 + hysteresis_weight를 넘거나 수액팩이 제거(무게 0)되어야 해제되어
+센서 잡음으로 발생/해제가 반복되지 않습니다. 그래도 경계에서 흔들리는 값은 무게/배터리 알림
+(FLAP_KINDS)에 한해 해제를 flap_seconds 동안 보류했다가, 그 사이 다시 발생 조건이 되면
+해제/재발생 이벤트 없이 기존 알림을 유지합니다. 해제가 확정(cleared 전송)된 뒤의 재발생은
+시간 간격과 관계없이 항상 새 알림으로 보내며, 너스콜과 연결 끊김은 보류 없이 바로 해제합니다.
+
+폐기/번호 변경된 폴대의 상태가 계속 쌓이지 않도록 forget_seconds 동안 레코드가 없는 폴대는
+상태를 버리고(남아 있던 알림은 cleared 전송) iv_alert_poles_evicted_total로 셉니다.
+
+이벤트 형식:
+    {"event_id": "1:nurse_call:1723...", "alert_id": 4, "kind": "nurse_call", "pole": "1",
+     "state": "raised" | "cleared", "ts": epoch 초, "params": {...}}
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+
+DONE = "done"
+ALMOST_EMPTY = "almost_empty"
+BATTERY_LOW = "battery_low"
+NURSE_CALL = "nurse_call"
+POLE_LOST = "pole_lost"
+
+ALERT_IDS = {DONE: 1, ALMOST_EMPTY: 2, BATTERY_LOW: 3, NURSE_CALL: 4, POLE_LOST: 5}
+CRITICAL_KINDS = (DONE, NURSE_CALL, POLE_LOST)
+FLAP_KINDS = (DONE, ALMOST_EMPTY, BATTERY_LOW)  # 해제를 잠시 보류해 경계 흔들림을 흡수하는 알림
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class AlertEngine:
+    """
+    폴대별 알림 상태 머신
+
+    Args:
+        almost_weight: 거의 다 됨 임계 무게 (g)
+        done_weight: 투여 완료 임계 무게 (g)
+        battery_level_threshold: 이 레벨 이하이면 배터리 부족
+        hysteresis_weight: 무게 알림 해제에 필요한 추가 여유 (g)
+        flap_seconds: FLAP_KINDS 알림의 해제 확정 대기 시간 (0이면 바로 해제)
+        lost_seconds: 이 시간 동안 레코드가 없으면 폴대 연결 끊김 (0이면 사용 안 함)
+        forget_seconds: 이 시간 동안 레코드가 없으면 폴대 상태를 버림 (0이면 버리지 않음)
+    """
+
+    def __init__(self, almost_weight: float = 300, done_weight: float = 150, battery_level_threshold: int = 1,
+                 hysteresis_weight: float = 20, flap_seconds: float = 5, lost_seconds: float = 60,
+                 forget_seconds: float = 600):
+        self.almost_weight = almost_weight
+        self.done_weight = done_weight
+        self.battery_level_threshold = battery_level_threshold
+        self.hysteresis_weight = hysteresis_weight
+        self.lost_seconds = lost_seconds
+        self.flap_seconds = flap_seconds
+        self.forget_seconds = forget_seconds
+        self._active: Dict[str, Dict[str, Dict[str, Any]]] = {}  # pole_id -> kind -> raised 이벤트
+        self._pending_clear: Dict[Tuple[str, str], float] = {}  # (pole_id, kind) -> 해제 조건이 된 시각
+        self._last_seen: Dict[str, float] = {}  # pole_id -> 마지막 레코드 수신 시각
+        self.events_raised = 0
+        self.events_suppressed = 0
+        self.poles_evicted = 0
+
+    def _weight_state(self, active: bool, weight: Optional[float], threshold: float) -> bool:
+        if weight is None:
+            return active
+        if 0 < weight <= threshold:
+            return True
+        if active and 0 < weight <= threshold + self.hysteresis_weight:
+            return True  # 해제 여유 구간: 이전 상태 유지
+        return False
+
+    def _levels(self, record: Dict[str, Any], active: Dict[str, Any]) -> Dict[str, bool]:
+        weight = _to_float(record.get("current_weight"))
+        battery = _to_float(record.get("battery_level"))
+        return {
+            DONE: self._weight_state(DONE in active, weight, self.done_weight),
+            ALMOST_EMPTY: self._weight_state(ALMOST_EMPTY in active, weight, self.almost_weight),
+            BATTERY_LOW: battery is not None and battery <= self.battery_level_threshold,
+            NURSE_CALL: bool(record.get("nurse_call")),
+            POLE_LOST: False,  # 레코드가 들어왔으므로 연결 끊김 해제
+        }
+
+    def is_critical(self, record: Dict[str, Any]) -> bool:
+        """
+        우선 경로로 보낼 레코드인지 빠르게 확인합니다. (너스콜, 투여 완료 무게, 연결 끊김 중이던 폴대)
+        """
+        if record.get("nurse_call"):
+            return True
+        weight = _to_float(record.get("current_weight"))
+        if weight is not None and 0 < weight <= self.done_weight:
+            return True
+        return POLE_LOST in self._active.get(record.get("loadcel"), ())
+
+    def _params(self, kind: str, pole_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"pole": pole_id}
+        if kind in (DONE, ALMOST_EMPTY):
+            params["bottle"] = "오른쪽"
+        if kind == ALMOST_EMPTY:
+            params["current_weight"] = _to_float(record.get("current_weight")) or 0
+            params["remaining_sec"] = record.get("remaining_sec_est", -1)
+        if kind == BATTERY_LOW:
+            params["battery"] = record.get("battery_level")
+        return params
+
+    def _raise(self, pole_id: str, kind: str, active: Dict[str, Any], params: Dict[str, Any], now: float):
+        """kind 알림을 발생시키고 이벤트를 반환합니다."""
+        event = {
+            "event_id": f"{pole_id}:{kind}:{int(now * 1000)}", "alert_id": ALERT_IDS[kind],
+            "kind": kind, "pole": pole_id, "state": "raised", "ts": now, "params": params,
+        }
+        active[kind] = event
+        self.events_raised += 1
+        return event
+
+    def _clear(self, pole_id: str, kind: str, now: float) -> Dict[str, Any]:
+        """
+        kind 알림을 해제하고 cleared 이벤트를 반환합니다.
+        (빈 폴대 항목은 호출한 쪽에서 정리합니다. evaluate()가 같은 dict에 이어서 발생시킬 수 있음)
+        """
+        self._pending_clear.pop((pole_id, kind), None)
+        raised = self._active[pole_id].pop(kind)
+        return {**raised, "state": "cleared", "ts": now}
+
+    def evaluate(self, record: Dict[str, Any], now: Optional[float] = None, kinds=None) -> List[Dict[str, Any]]:
+        """
+        레코드 하나를 평가해 상태가 바뀐 알림 이벤트 목록을 반환합니다.
+
+        Args:
+            record: 폴대 레코드
+            now: 평가 시각 (epoch 초)
+            kinds: 평가할 알림 종류 (None이면 전체, 우선 경로는 CRITICAL_KINDS만 평가)
+        """
+        pole_id = record.get("loadcel")
+        if not pole_id:
+            return []
+        now = time.time() if now is None else now
+        self._last_seen[pole_id] = now
+        active = self._active.setdefault(pole_id, {})
+        events = []
+        for kind, level in self._levels(record, active).items():
+            if kinds is not None and kind not in kinds:
+                continue
+            key = (pole_id, kind)
+            if level and kind in active:
+                if self._pending_clear.pop(key, None) is not None:
+                    # 해제 보류 중에 다시 발생 조건: 경계 흔들림으로 보고 기존 알림 유지
+                    self.events_suppressed += 1
+            elif level:
+                events.append(self._raise(pole_id, kind, active, self._params(kind, pole_id, record), now))
+            elif kind in active:
+                if kind in FLAP_KINDS and self.flap_seconds > 0:
+                    cleared_at = self._pending_clear.setdefault(key, now)
+                    if now - cleared_at < self.flap_seconds:
+                        continue
+                events.append(self._clear(pole_id, kind, now))
+        if pole_id in self._active and not self._active[pole_id]:
+            del self._active[pole_id]
+        return events
+
+    def confirm_clears(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        해제 보류 시간이 지난 알림의 cleared 이벤트를 내보냅니다.
+        (해제 조건이 된 뒤 레코드가 더 들어오지 않는 폴대도 제때 해제되도록 주기적으로 호출)
+        """
+        now = time.time() if now is None else now
+        expired = [key for key, cleared_at in self._pending_clear.items() if now - cleared_at >= self.flap_seconds]
+        events = [self._clear(pole_id, kind, now) for pole_id, kind in expired]
+        for pole_id, _ in expired:
+            if pole_id in self._active and not self._active[pole_id]:
+                del self._active[pole_id]
+        return events
+
+    def _forget(self, now: float) -> List[Dict[str, Any]]:
+        """forget_seconds 이상 레코드가 없는 폴대의 상태를 버리고, 남아 있던 알림의 cleared 이벤트를 반환합니다."""
+        if not self.forget_seconds:
+            return []
+        stale = [pole_id for pole_id, last_seen in self._last_seen.items() if now - last_seen >= self.forget_seconds]
+        events = []
+        for pole_id in stale:
+            del self._last_seen[pole_id]
+            for kind in list(self._active.get(pole_id, ())):
+                events.append(self._clear(pole_id, kind, now))
+            self._active.pop(pole_id, None)
+        if stale:
+            self.poles_evicted += len(stale)
+            metrics.ALERT_POLES_EVICTED.inc(len(stale))
+            print(f"[알림 엔진] {len(stale)}개 폴대 상태 정리 ({self.forget_seconds:.0f}초 이상 수신 없음)")
+        return events
+
+    def check_lost(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        lost_seconds 이상 레코드가 없는 폴대에 연결 끊김 알림을 발생시킵니다.
+        (해제는 다음 레코드를 evaluate()할 때 이루어집니다)
+        forget_seconds 이상 레코드가 없는 폴대는 상태를 버리고 남은 알림을 해제합니다.
+        """
+        now = time.time() if now is None else now
+        events = self._forget(now)
+        if not self.lost_seconds:
+            return events
+        for pole_id, last_seen in self._last_seen.items():
+            silent = now - last_seen
+            if silent < self.lost_seconds or POLE_LOST in self._active.get(pole_id, ()):
+                continue
+            active = self._active.setdefault(pole_id, {})
+            events.append(self._raise(pole_id, POLE_LOST, active, {"pole": pole_id, "silent_sec": silent}, now))
+        return events
+
+    def active_events(self, poles=None) -> List[Dict[str, Any]]:
+        """현재 발생 중인 알림(raised) 목록. poles가 주어지면 해당 폴대만 반환합니다."""
+        events = []
+        for pole_id, kinds in self._active.items():
+            if poles is not None and pole_id not in poles:
+                continue
+            events.extend(kinds.values())
+        return events
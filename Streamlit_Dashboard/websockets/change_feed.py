@@ -0,0 +1,412 @@
+"""
+loadcell 테이블 변경분(change-feed) 수집 모듈
+
+브로드캐스터가 매 틱마다 테이블 전체를 scan하지 않고,
+새로 들어오거나 바뀐 loadcell 아이템만 소비할 수 있게 해줍니다.
+
+- ScanChangeFeed: 기존 방식(전체 scan) + 폴대별 timestamp 워터마크로 변경분만 통과
+- StreamChangeFeed: DynamoDB Streams 샤드 커서로 변경분만 읽기 (읽기 비용이 업데이트 수에 비례)
+- InMemoryLoadcellTable / InMemoryChangeFeed: 오프라인 실행/벤치마크용 로컬 스탠드인
+- LocalChangeFeed: 내장 SQLite 저장소(utils/storage.py)의 변경 순번 커서로 변경분만 읽기
+
+모든 피드는 DynamoDB client 형식({'loadcel': {'S': '1'}, ...})의 아이템 리스트를 반환합니다.
+전체 scan은 utils/table_reader.py를 사용하므로 1MB를 넘는 테이블도 페이지를 끝까지 읽고,
+segments > 1이면 병렬 세그먼트 scan으로 읽습니다.
+"""
+
+import itertools
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+# 대시보드와 같은 테이블 읽기 유틸리티(utils/table_reader.py)를 사용하기 위해 상위 디렉터리를 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.table_reader import scan_items
+
+
+def _pole_id(item: Dict[str, Any]) -> Optional[str]:
+    return item.get('loadcel', {}).get('S')
+
+
+def _item_timestamp(item: Dict[str, Any]) -> Optional[str]:
+    return item.get('timestamp', {}).get('S')
+
+
+class ChangeFeed:
+    """변경분 피드 공통 인터페이스"""
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """마지막 poll 이후 새로 들어오거나 바뀐 아이템을 반환합니다 (폴대당 최신 1개)."""
+        raise NotImplementedError
+
+
+class ScanChangeFeed(ChangeFeed):
+    """
+    전체 scan 후 폴대별 timestamp 워터마크와 비교하여 바뀐 아이템만 통과시킵니다.
+
+    DynamoDB 읽기 비용은 그대로지만, 이후 단계(배터리 조회, 전송, 히스토리)는
+    변경된 폴대 수에만 비례하게 됩니다. Streams를 켤 수 없는 환경의 기본값입니다.
+
+    Args:
+        client: boto3 DynamoDB client
+        table_name: loadcell 테이블 이름
+        segments: 병렬 scan 세그먼트 수 (1이면 순차 scan)
+        attributes: 읽을 속성 이름 목록 (None이면 전체)
+    """
+
+    def __init__(self, client, table_name: str, segments: int = 1, attributes: Optional[Sequence[str]] = None):
+        self.client = client
+        self.table_name = table_name
+        self.segments = segments
+        self.attributes = attributes
+        self._watermarks: Dict[str, Optional[str]] = {}
+
+    def poll(self) -> List[Dict[str, Any]]:
+        changed = []
+        for item in scan_items(self.client, self.table_name, self.attributes, self.segments):
+            pole_id = _pole_id(item)
+            if not pole_id:
+                continue
+            timestamp = _item_timestamp(item)
+            if pole_id in self._watermarks and self._watermarks[pole_id] == timestamp:
+                continue
+            self._watermarks[pole_id] = timestamp
+            changed.append(item)
+        return changed
+
+
+class StreamChangeFeed(ChangeFeed):
+    """
+    DynamoDB Streams 커서 기반 피드
+
+    loadcell 테이블에 스트림(NEW_IMAGE 또는 NEW_AND_OLD_IMAGES)이 켜져 있어야 합니다.
+    첫 poll에서 한 번만 전체 scan으로 현재 상태를 부트스트랩하고,
+    이후에는 샤드 이터레이터를 따라 INSERT/MODIFY 레코드만 읽습니다.
+
+    get_records 오류는 샤드별로 처리하여 다른 샤드는 계속 읽습니다.
+    - 이터레이터 만료(ExpiredIterator): 마지막으로 읽은 시퀀스 다음부터 새 이터레이터
+      (읽은 레코드가 없으면 LATEST + 전체 scan으로 재동기화)
+    - 보존 기간 초과(TrimmedDataAccess): LATEST + 전체 scan으로 재동기화
+    - 스트림/샤드 없음(ResourceNotFound): 스트림을 다시 찾아 부트스트랩부터 다시 시작
+    그 외 오류(스로틀링 등)는 같은 이터레이터로 다음 poll에서 다시 시도하며,
+    모든 샤드가 실패한 경우에만 예외를 다시 발생시킵니다.
+    """
+
+    SHARD_REFRESH_SECONDS = 30  # 샤드 목록 갱신 주기 (샤드 분할/종료 대응)
+    RECORDS_LIMIT = 1000        # get_records 1회 최대 레코드 수
+    EXPIRED_ITERATOR = "ExpiredIteratorException"
+    TRIMMED_DATA = "TrimmedDataAccessException"
+    NOT_FOUND = "ResourceNotFoundException"
+
+    def __init__(self, client, streams_client, table_name: str, segments: int = 1,
+                 attributes: Optional[Sequence[str]] = None):
+        self.client = client
+        self.streams_client = streams_client
+        self.table_name = table_name
+        self.segments = segments  # 부트스트랩 scan 세그먼트 수
+        self.attributes = attributes
+        self._stream_arn: Optional[str] = None
+        self._iterators: Dict[str, Optional[str]] = {}  # shard_id -> 다음 이터레이터
+        self._last_sequence: Dict[str, str] = {}  # shard_id -> 마지막으로 읽은 레코드 시퀀스 번호
+        self._rescan = False  # 다음 poll에서 전체 scan으로 재동기화
+        self.shard_errors = 0
+        self._known_shards = set()
+        self._last_shard_refresh = 0.0
+        self._bootstrapped = False
+
+    def _describe_stream_arn(self) -> str:
+        table = self.client.describe_table(TableName=self.table_name)['Table']
+        stream_arn = table.get('LatestStreamArn')
+        if not stream_arn:
+            raise RuntimeError(f"'{self.table_name}' 테이블에 DynamoDB Streams가 활성화되어 있지 않습니다.")
+        return stream_arn
+
+    def _refresh_shards(self, iterator_type: str) -> None:
+        kwargs = {'StreamArn': self._stream_arn}
+        while True:
+            description = self.streams_client.describe_stream(**kwargs)['StreamDescription']
+            for shard in description.get('Shards', []):
+                shard_id = shard['ShardId']
+                if shard_id in self._known_shards:
+                    continue
+                self._known_shards.add(shard_id)
+                # 부트스트랩 이후 새로 생긴(분할된) 샤드는 처음부터 읽어야 누락이 없습니다.
+                iterator = self.streams_client.get_shard_iterator(
+                    StreamArn=self._stream_arn,
+                    ShardId=shard_id,
+                    ShardIteratorType=iterator_type
+                )['ShardIterator']
+                self._iterators[shard_id] = iterator
+            last_shard_id = description.get('LastEvaluatedShardId')
+            if not last_shard_id:
+                break
+            kwargs['ExclusiveStartShardId'] = last_shard_id
+        self._last_shard_refresh = time.time()
+
+    def _bootstrap(self) -> List[Dict[str, Any]]:
+        self._stream_arn = self._describe_stream_arn()
+        self._iterators.clear()
+        self._known_shards.clear()
+        self._last_sequence.clear()
+        self._rescan = False
+        # 이터레이터(LATEST)를 먼저 잡은 뒤 scan하므로 그 사이의 변경도 스트림에서 다시 읽힙니다.
+        self._refresh_shards('LATEST')
+        items = scan_items(self.client, self.table_name, self.attributes, self.segments)
+        self._bootstrapped = True
+        return items
+
+    @staticmethod
+    def _error_code(error: Exception) -> Optional[str]:
+        """botocore ClientError의 오류 코드 (없으면 예외 클래스 이름)"""
+        code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+        return code or type(error).__name__
+
+    def _recover_shard(self, shard_id: str, code: str) -> None:
+        """만료/잘린 샤드 이터레이터를 새로 받습니다. (이어 읽을 위치를 모르면 전체 scan 재동기화 예약)"""
+        last_sequence = self._last_sequence.get(shard_id)
+        kwargs = {'StreamArn': self._stream_arn, 'ShardId': shard_id}
+        if code == self.EXPIRED_ITERATOR and last_sequence is not None:
+            kwargs.update(ShardIteratorType='AFTER_SEQUENCE_NUMBER', SequenceNumber=last_sequence)
+        else:
+            kwargs['ShardIteratorType'] = 'LATEST'
+            self._rescan = True
+        try:
+            self._iterators[shard_id] = self.streams_client.get_shard_iterator(**kwargs)['ShardIterator']
+        except Exception as e:
+            if kwargs['ShardIteratorType'] == 'LATEST':
+                raise
+            # 마지막 시퀀스도 이미 잘려나간 경우
+            print(f"[change-feed] {shard_id} 샤드 이어 읽기 실패, 최신 위치 + 전체 재동기화: {e}")
+            self._recover_shard(shard_id, self.TRIMMED_DATA)
+
+    def poll(self) -> List[Dict[str, Any]]:
+        if not self._bootstrapped:
+            return self._bootstrap()
+
+        if time.time() - self._last_shard_refresh >= self.SHARD_REFRESH_SECONDS:
+            self._refresh_shards('TRIM_HORIZON')
+
+        latest: Dict[str, Dict[str, Any]] = {}
+        failed = []
+        for shard_id, iterator in list(self._iterators.items()):
+            if iterator is None:
+                continue
+            try:
+                response = self.streams_client.get_records(ShardIterator=iterator, Limit=self.RECORDS_LIMIT)
+            except Exception as e:
+                self.shard_errors += 1
+                code = self._error_code(e)
+                print(f"[change-feed] {shard_id} 샤드 읽기 오류 ({code}): {e}")
+                if code == self.NOT_FOUND:
+                    # 스트림이 다시 만들어졌거나 샤드가 사라짐: 처음부터 다시 부트스트랩
+                    return self._bootstrap()
+                if code in (self.EXPIRED_ITERATOR, self.TRIMMED_DATA):
+                    self._recover_shard(shard_id, code)
+                else:
+                    failed.append(e)  # 같은 이터레이터로 다음 poll에서 다시 시도
+                continue
+            for record in response.get('Records', []):
+                sequence = record.get('dynamodb', {}).get('SequenceNumber')
+                if sequence is not None:
+                    self._last_sequence[shard_id] = sequence
+                if record.get('eventName') not in ('INSERT', 'MODIFY'):
+                    continue
+                image = record.get('dynamodb', {}).get('NewImage')
+                pole_id = _pole_id(image or {})
+                if pole_id:
+                    latest[pole_id] = image
+            next_iterator = response.get('NextShardIterator')
+            if next_iterator is None:
+                # 닫힌 샤드: 더 읽을 레코드 없음
+                del self._iterators[shard_id]
+                self._last_sequence.pop(shard_id, None)
+            else:
+                self._iterators[shard_id] = next_iterator
+        if failed and len(failed) == sum(1 for iterator in self._iterators.values() if iterator is not None):
+            raise failed[-1]
+        if self._rescan:
+            # 놓친 변경분은 현재 상태 전체 scan으로 보충 (scan이 스트림 레코드보다 나중에 읽은 값)
+            self._rescan = False
+            for item in scan_items(self.client, self.table_name, self.attributes, self.segments):
+                pole_id = _pole_id(item)
+                if pole_id:
+                    latest[pole_id] = item
+        return list(latest.values())
+
+
+class InMemoryLoadcellTable:
+    """
+    오프라인 실행/벤치마크용 loadcell 테이블 스탠드인
+
+    put_item 시 현재 상태를 갱신하고, 시퀀스 번호가 붙은 변경 로그에 append합니다.
+    변경 로그는 DynamoDB Streams처럼 길이가 제한되어 있어 오래된 레코드는 잘려나갑니다.
+    scan()은 boto3 client.scan과 같은 형식을 반환하고 Segment/TotalSegments도 지원하므로
+    ScanChangeFeed에도 그대로 물릴 수 있습니다. (프로젝션은 무시하고 전체 속성을 반환)
+    """
+
+    def __init__(self, log_size: int = 100000):
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._log = deque(maxlen=log_size)  # (seq, pole_id)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def put_item(self, Item: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        pole_id = _pole_id(Item)
+        if not pole_id:
+            raise ValueError("loadcel 키가 없는 아이템입니다.")
+        with self._lock:
+            self._items[pole_id] = Item
+            self._log.append((next(self._seq), pole_id))
+        return {}
+
+    def scan(self, Segment: int = 0, TotalSegments: int = 1, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            items = list(self._items.values())
+        if TotalSegments > 1:
+            # 폴대 ID 해시로 구간을 나눕니다 (DynamoDB의 파티션 키 해시 분할과 같은 방식)
+            items = [item for item in items if zlib.crc32(_pole_id(item).encode()) % TotalSegments == Segment]
+        return {'Items': items, 'Count': len(items), 'ScannedCount': len(items)}
+
+    def changes_since(self, cursor: int):
+        """
+        cursor 이후 변경된 폴대들의 최신 아이템과 새 커서를 반환합니다.
+        커서가 로그 보존 범위를 벗어났으면 None을 반환합니다 (전체 재동기화 필요).
+        """
+        with self._lock:
+            if self._log and cursor < self._log[0][0] - 1:
+                return None, self._log[-1][0]
+            changed = set()
+            new_cursor = cursor
+            # 로그 끝에서부터 거꾸로 훑어 cursor 이후 부분만 읽습니다 (업데이트 수에 비례).
+            for seq, pole_id in reversed(self._log):
+                if seq <= cursor:
+                    break
+                changed.add(pole_id)
+                new_cursor = max(new_cursor, seq)
+            return [self._items[p] for p in changed], new_cursor
+
+
+class InMemoryChangeFeed(ChangeFeed):
+    """InMemoryLoadcellTable의 변경 로그를 따라가는 커서 기반 피드"""
+
+    def __init__(self, table: InMemoryLoadcellTable):
+        self.table = table
+        self._cursor = 0
+
+    def poll(self) -> List[Dict[str, Any]]:
+        items, new_cursor = self.table.changes_since(self._cursor)
+        if items is None:
+            # 로그가 잘려나간 경우 전체 상태로 재동기화
+            items = self.table.scan()['Items']
+        self._cursor = new_cursor
+        return items
+
+
+class LocalChangeFeed(ChangeFeed):
+    """
+    STORAGE_BACKEND=sqlite일 때 DynamoDB Streams 대신 쓰는 커서 기반 피드.
+    아이템을 쓸 때마다 붙는 변경 순번(seq)을 따라가므로 읽는 양이 업데이트 수에 비례합니다.
+
+    Args:
+        client: utils.storage.LocalClient
+        table_name: loadcell 테이블 이름
+    """
+
+    def __init__(self, client, table_name: str):
+        self.client = client
+        self.table_name = table_name
+        self._cursor = 0
+
+    def poll(self) -> List[Dict[str, Any]]:
+        latest: Dict[str, Dict[str, Any]] = {}
+        while True:
+            items, new_cursor = self.client.changes_since(self.table_name, self._cursor)
+            for item in items:
+                pole_id = _pole_id(item)
+                if pole_id:
+                    latest[pole_id] = item
+            if new_cursor == self._cursor:
+                break
+            self._cursor = new_cursor
+        return list(latest.values())
+
+
+def _make_item(pole_id: int, weight: float, tick: int) -> Dict[str, Any]:
+    return {
+        'loadcel': {'S': str(pole_id)},
+        'current_weight': {'S': f"{weight:.1f}"},
+        'remaining_sec': {'S': str(int(weight / 250 * 3600))},
+        'nurse_call': {'BOOL': False},
+        'timestamp': {'S': f"tick-{tick:08d}"},
+    }
+
+
+def run_benchmark(poles: int = 300, updates_per_tick: int = 10, ticks: int = 200) -> Dict[str, Any]:
+    """
+    scan 방식과 변경 로그 커서 방식의 틱당 처리량을 오프라인으로 비교합니다.
+
+    Args:
+        poles: 테이블의 폴대 수
+        updates_per_tick: 틱마다 값이 바뀌는 폴대 수
+        ticks: 측정할 틱 수
+
+    Returns:
+        Dict[str, Any]: 방식별 틱당 읽은 아이템 수 / 평균 소요 시간(ms)
+    """
+    import random
+
+    table = InMemoryLoadcellTable()
+    for pole_id in range(1, poles + 1):
+        table.put_item(Item=_make_item(pole_id, 1000.0, 0))
+
+    scan_feed = ScanChangeFeed(table, 'loadcell')
+    memory_feed = InMemoryChangeFeed(table)
+    scan_feed.poll()
+    memory_feed.poll()
+
+    results = {'scan': {'read': 0, 'emitted': 0, 'sec': 0.0}, 'feed': {'read': 0, 'emitted': 0, 'sec': 0.0}}
+    rng = random.Random(0)
+    for tick in range(1, ticks + 1):
+        for pole_id in rng.sample(range(1, poles + 1), min(updates_per_tick, poles)):
+            table.put_item(Item=_make_item(pole_id, rng.uniform(100, 1000), tick))
+
+        start = time.perf_counter()
+        emitted = scan_feed.poll()
+        results['scan']['sec'] += time.perf_counter() - start
+        results['scan']['read'] += poles
+        results['scan']['emitted'] += len(emitted)
+
+        start = time.perf_counter()
+        emitted = memory_feed.poll()
+        results['feed']['sec'] += time.perf_counter() - start
+        results['feed']['read'] += len(emitted)
+        results['feed']['emitted'] += len(emitted)
+
+    return {
+        mode: {
+            'items_read_per_tick': r['read'] / ticks,
+            'items_emitted_per_tick': r['emitted'] / ticks,
+            'avg_poll_ms': r['sec'] / ticks * 1000,
+        }
+        for mode, r in results.items()
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="change-feed 오프라인 벤치마크")
+    parser.add_argument("--poles", type=int, default=300)
+    parser.add_argument("--updates", type=int, default=10, help="틱당 변경 폴대 수")
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"[벤치마크] 폴대 {args.poles}개, 틱당 변경 {args.updates}개, {args.ticks}틱")
+    for mode, stats in run_benchmark(args.poles, args.updates, args.ticks).items():
+        print(f"  {mode:5s} | 읽은 아이템/틱: {stats['items_read_per_tick']:.1f}"
+              f" | 전달 아이템/틱: {stats['items_emitted_per_tick']:.1f}"
+              f" | 평균 poll: {stats['avg_poll_ms']:.3f}ms")
@@ -0,0 +1,186 @@
+"""
+웹소켓 클라이언트별 송신 큐 모듈
+
+handler()에 등록된 연결마다 크기가 제한된 송신 큐와 전용 송신 태스크를 둡니다.
+fanout은 큐에 프레임을 넣기만 하고 기다리지 않으므로, 느리거나 반쯤 끊긴 태블릿이
+다른 클라이언트의 전송이나 다음 DynamoDB 폴링을 지연시키지 않습니다.
+
+큐가 가득 찼을 때의 정책:
+- drop_oldest: 가장 오래된 프레임을 버리고 새 프레임을 넣습니다.
+- coalesce: 대기 중인 프레임들을 폴대별 최신 값 하나로 합칩니다 (폴대 단위 누락 없음).
+
+일정 시간 이상 계속 포화 상태인 클라이언트는 연결을 끊어(evict) 자원을 회수합니다.
+
+알림 프레임은 별도의 작은 큐(알림 채널)에 넣어 대기 중인 delta보다 먼저 보내며,
+coalesce 대상이 아니므로 알림 이벤트가 합쳐지거나 사라지지 않습니다.
+알림 채널까지 가득 찬 클라이언트는 알림을 버리는 대신 바로 evict하고, 재접속 시
+발생 중인 알림 목록을 다시 받게 합니다.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import websockets
+
+import metrics
+from fanout import wire_format  # fanout 모듈이 utils 경로를 추가한 뒤 가져온 와이어 포맷 모듈
+
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+EVICT_CLOSE_CODE = 1013  # Try Again Later
+
+
+class ClientSession:
+    """
+    연결 하나에 대한 제한 크기 송신 큐 + 송신 태스크
+
+    Args:
+        websocket: 클라이언트 연결
+        epoch: 프레임에 넣을 서버 epoch (합쳐진 프레임 인코딩용)
+        max_queue: 큐에 보관할 최대 프레임 수
+        policy: 포화 시 정책 (drop_oldest / coalesce)
+        evict_after_seconds: 이 시간 이상 포화 상태가 이어지면 연결 종료
+        send_timeout: 프레임 하나를 보내는 데 허용되는 최대 시간(초)
+        frame_format: 이 클라이언트와 협상한 프레임 포맷 (json / struct / msgpack)
+    """
+
+    def __init__(self, websocket, epoch: int, max_queue: int = 32, policy: str = COALESCE,
+                 evict_after_seconds: float = 10, send_timeout: float = 5,
+                 frame_format: str = wire_format.JSON):
+        if policy not in (DROP_OLDEST, COALESCE):
+            raise ValueError(f"지원하지 않는 드롭 정책: {policy}")
+        self.websocket = websocket
+        self.epoch = epoch
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.evict_after_seconds = evict_after_seconds
+        self.send_timeout = send_timeout
+        self.frame_format = frame_format
+        self._queue = deque()  # (EncodedFrame 또는 None, 폴대 레코드 리스트, 시작 seq, seq)
+        self._alerts = deque()  # 알림 채널 프레임 (JSON 문자열, 넘치면 버리지 않고 evict)
+        self._wakeup = asyncio.Event()
+        self._saturated_since: Optional[float] = None
+        self.evicted = False
+        self.topics = None  # 구독 폴대 ID frozenset (None이면 전체, SubscriptionIndex가 설정)
+        self.last_seq = 0  # 마지막으로 큐에 넣은 프레임의 seq
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    def _coalesce(self, poles: List[Dict[str, Any]], from_seq: int, seq: int) -> None:
+        merged: Dict[str, Dict[str, Any]] = {}
+        from_seq = self._queue[0][2] if self._queue else from_seq
+        for _, queued_poles, _, _ in self._queue:
+            for pole in queued_poles:
+                merged[pole['loadcel']] = pole
+        for pole in poles:
+            merged[pole['loadcel']] = pole
+        self.frames_dropped += len(self._queue)
+        metrics.FRAMES_DROPPED.inc(len(self._queue), policy=COALESCE)
+        self._queue.clear()
+        # 합쳐진 프레임은 이 클라이언트에만 해당하므로 보낼 때 한 번 인코딩합니다.
+        # from_seq~seq 구간의 변경분을 모두 담고 있으므로 클라이언트는 누락으로 보지 않습니다.
+        self._queue.append((None, list(merged.values()), from_seq, seq))
+
+    def offer(self, frame, poles: List[Dict[str, Any]], seq: int, from_seq: Optional[int] = None) -> bool:
+        """
+        프레임을 기다리지 않고 큐에 넣습니다.
+        from_seq: 프레임이 담고 있는 변경 구간의 시작 seq (구독 필터로 건너뛴 구간 포함, 기본값 seq)
+
+        Returns:
+            bool: 계속 유지할 클라이언트면 True, 포화가 너무 오래 지속되어 evict해야 하면 False
+        """
+        if self.evicted:
+            return False
+        now = time.monotonic()
+        from_seq = seq if from_seq is None else from_seq
+        self.last_seq = seq
+        if len(self._queue) >= self.max_queue:
+            if self._saturated_since is None:
+                self._saturated_since = now
+            if self.policy == COALESCE:
+                self._coalesce(poles, from_seq, seq)
+            else:
+                self._queue.popleft()
+                self.frames_dropped += 1
+                metrics.FRAMES_DROPPED.inc(policy=DROP_OLDEST)
+                self._queue.append((frame, poles, from_seq, seq))
+        else:
+            self._queue.append((frame, poles, from_seq, seq))
+        self._wakeup.set()
+        return not self.is_stale(now)
+
+    def offer_alert(self, payload: str) -> bool:
+        """
+        알림 프레임을 알림 채널 큐에 넣습니다. (delta보다 먼저 전송)
+
+        Returns:
+            bool: 계속 유지할 클라이언트면 True, 알림 채널이 가득 차 evict해야 하면 False
+                  (알림은 버리지 않으며, 재접속 시 발생 중인 알림을 다시 받음)
+        """
+        if self.evicted:
+            return False
+        if len(self._alerts) >= self.max_queue:
+            print(f"[알림 채널 포화] {getattr(self.websocket, 'remote_address', None)} (대기 알림 {len(self._alerts)}개)")
+            return False
+        self._alerts.append(payload)
+        self._wakeup.set()
+        return True
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        if self._saturated_since is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self._saturated_since >= self.evict_after_seconds
+
+    async def evict(self, reason: str = "slow consumer") -> None:
+        """포화 상태가 지속된 클라이언트의 연결을 끊습니다."""
+        if self.evicted:
+            return
+        self.evicted = True
+        metrics.CLIENTS_EVICTED.inc(reason=reason)
+        if self._alerts:
+            # 보내지 못한 알림은 재접속 시 발생 중인 알림 동기화로 다시 전달됨
+            self.frames_dropped += len(self._alerts)
+            metrics.FRAMES_DROPPED.inc(len(self._alerts), policy="evict")
+        self._queue.clear()
+        self._alerts.clear()
+        self._wakeup.set()
+        print(f"[클라이언트 evict] {getattr(self.websocket, 'remote_address', None)} ({reason}, 드롭 {self.frames_dropped}개)")
+        try:
+            await asyncio.wait_for(self.websocket.close(code=EVICT_CLOSE_CODE, reason=reason), self.send_timeout)
+        except Exception:
+            pass
+
+    def _next_payload(self):
+        """보낼 다음 프레임을 (채널, 직렬화된 프레임) 형태로 꺼냅니다. (알림 채널 우선)"""
+        if self._alerts:
+            return "alert", self._alerts.popleft()
+        frame, poles, from_seq, seq = self._queue.popleft()
+        if frame is None:
+            return "delta", wire_format.encode({
+                "type": "delta", "epoch": self.epoch, "from_seq": from_seq, "seq": seq, "poles": poles
+            }, self.frame_format)
+        return "delta", frame.payload(self.frame_format)
+
+    async def run_sender(self) -> None:
+        """큐에 쌓인 프레임을 순서대로 전송하는 클라이언트 전용 태스크"""
+        while not self.evicted:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while (self._alerts or self._queue) and not self.evicted:
+                channel, payload = self._next_payload()
+                try:
+                    await asyncio.wait_for(self.websocket.send(payload), self.send_timeout)
+                except asyncio.TimeoutError:
+                    await self.evict("send timeout")
+                    return
+                except websockets.ConnectionClosed:
+                    return
+                self.frames_sent += 1
+                metrics.FRAMES_SENT.inc(channel=channel)
+                metrics.BYTES_SENT.inc(len(payload), channel=channel)
+            if not self._queue:
+                # 큐를 모두 비웠으면 포화 상태 해제
+                self._saturated_since = None
@@ -0,0 +1,175 @@
+"""
+웹소켓 클라이언트 fanout 모듈
+
+틱마다 들어온 폴대 레코드를 마지막으로 브로드캐스트한 스냅샷과 비교(diff)하여
+바뀐 폴대만 하나의 프레임으로 묶고, 그 프레임을 포맷별로 한 번만 직렬화한 뒤
+같은 결과를 전체 구독 클라이언트의 송신 큐(ClientSession)에 넣습니다.
+폴대/병동을 구독한 클라이언트에는 구독 폴대만 담은 프레임을 보내며,
+같은 폴대 조합을 받는 클라이언트끼리는 직렬화 결과를 공유합니다.
+전송한 delta는 ReplayBuffer에 시퀀스 번호와 함께 보관되어, 접속 시 스냅샷/재접속 시 재전송에 쓰입니다.
+알림 엔진의 이벤트는 시퀀스와 무관한 별도 알림 채널 프레임({"type": "alert", "events": [...]})으로
+같은 구독 규칙에 따라 전송됩니다. (포맷과 관계없이 항상 JSON 텍스트)
+
+프레임 형식 (JSON 기준, 바이너리 포맷은 utils/wire_format.py 참고):
+    {"type": "delta" | "snapshot", "epoch": 서버 기동 시각, "seq": 시퀀스 번호,
+     "from_seq": 구독 필터로 건너뛴 구간의 시작 seq (생략 시 seq),
+     "poles": [{"loadcel": "1", "current_weight": ..., ...}, ...]}
+"""
+
+import asyncio
+import os
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from replay_buffer import ReplayBuffer
+
+# 대시보드와 같은 와이어 포맷 모듈(utils/wire_format.py)을 사용하기 위해 상위 디렉터리를 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import wire_format
+
+
+class EncodedFrame:
+    """
+    프레임 딕셔너리 + 포맷별 직렬화 결과 캐시
+
+    같은 프레임을 여러 클라이언트가 서로 다른 포맷으로 받아도 포맷마다 한 번만 직렬화합니다.
+    """
+
+    def __init__(self, frame: Dict[str, Any], on_encode: Optional[Callable[[int], None]] = None):
+        self.frame = frame
+        self._payloads: Dict[str, Any] = {}
+        self._on_encode = on_encode
+
+    def payload(self, fmt: str = wire_format.JSON):
+        if fmt not in self._payloads:
+            self._payloads[fmt] = wire_format.encode(self.frame, fmt)
+            if self._on_encode is not None:
+                self._on_encode(len(self._payloads[fmt]))
+        return self._payloads[fmt]
+
+
+class DeltaFanout:
+    """마지막 브로드캐스트 스냅샷 대비 변경분만 전송하는 fanout 엔진"""
+
+    def __init__(self, replay_capacity: int = 300):
+        self.replay = ReplayBuffer(replay_capacity)
+        self.frames_sent = 0
+        self.bytes_encoded = 0
+
+    @property
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """pole_id -> 마지막으로 보낸 레코드"""
+        return self.replay.state
+
+    def diff(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """스냅샷과 다른 레코드만 골라냅니다."""
+        changed = []
+        for record in records:
+            pole_id = record.get('loadcel')
+            if not pole_id:
+                continue
+            if self.snapshot.get(pole_id) == record:
+                continue
+            changed.append(record)
+        return changed
+
+    def _count_bytes(self, size: int) -> None:
+        self.bytes_encoded += size
+
+    def encode(self, changed: List[Dict[str, Any]], seq: int, frame_type: str = "delta",
+               from_seq: Optional[int] = None) -> EncodedFrame:
+        """폴대 레코드들을 프레임 하나로 묶습니다 (직렬화는 포맷별로 최초 전송 시 1회)."""
+        frame = {"type": frame_type, "epoch": self.replay.epoch, "seq": seq, "poles": changed}
+        if from_seq is not None and from_seq != seq:
+            frame["from_seq"] = from_seq
+        return EncodedFrame(frame, self._count_bytes)
+
+    def sync_session(self, session, epoch: Optional[int] = None, last_seq: Optional[int] = None) -> None:
+        """
+        접속한 클라이언트의 송신 큐에 놓친 delta를, 이어받을 수 없으면 스냅샷을 넣습니다.
+        구독 중인 클라이언트는 구독 폴대만 받습니다.
+        (이벤트 루프 안에서 await 없이 호출되므로 이후 delta와 순서가 뒤섞이지 않습니다.)
+        """
+        topics = session.topics
+        missed = self.replay.since(epoch, last_seq)
+        if missed is None:
+            seq, poles = self.replay.snapshot()
+            if topics is not None:
+                poles = [pole for pole in poles if pole['loadcel'] in topics]
+            session.offer(self.encode(poles, seq, "snapshot"), poles, seq)
+            return
+        session.last_seq = last_seq
+        if topics is None:
+            for seq, poles, frame in missed:
+                session.offer(frame, poles, seq)
+            return
+        # 구독 클라이언트는 놓친 구간의 구독 폴대 변경분을 폴대별 최신 값 하나로 합쳐 보냅니다.
+        merged: Dict[str, Dict[str, Any]] = {}
+        for _, poles, _ in missed:
+            for pole in poles:
+                if pole['loadcel'] in topics:
+                    merged[pole['loadcel']] = pole
+        if merged:
+            poles = list(merged.values())
+            seq = self.replay.seq
+            session.offer(self.encode(poles, seq, from_seq=last_seq + 1), poles, seq, last_seq + 1)
+
+    def publish(self, records: Iterable[Dict[str, Any]], subscriptions) -> int:
+        """
+        변경분을 계산해 구독에 맞는 클라이언트 송신 큐에만 프레임을 넣습니다.
+        - 전체 구독 클라이언트: 틱당 한 번 직렬화한 같은 프레임
+        - 폴대/병동 구독 클라이언트: 구독 폴대만 담은 프레임 (같은 조합끼리 직렬화 결과 공유)
+        큐에 넣기만 하고 전송을 기다리지 않으며, 포화가 지속된 클라이언트는 evict합니다.
+
+        Returns:
+            int: 이번 틱에 전송된 변경 폴대 수 (0이면 프레임을 보내지 않음)
+        """
+        changed = self.diff(records)
+        if not changed:
+            return 0
+        seq = self.replay.seq + 1
+        frame = self.encode(changed, seq)
+        self.replay.append(changed, frame)
+        for session in list(subscriptions.wildcard):
+            if not session.offer(frame, changed, seq):
+                asyncio.create_task(session.evict())
+        # 구독 클라이언트의 from_seq는 직전에 받은 seq 다음부터이므로 (폴대 조합, 직전 seq)별로 한 번만 직렬화
+        encoded: Dict[Tuple, EncodedFrame] = {}
+        for session, poles in subscriptions.route(changed).items():
+            from_seq = session.last_seq + 1
+            key = (tuple(pole['loadcel'] for pole in poles), from_seq)
+            if key not in encoded:
+                encoded[key] = self.encode(poles, seq, from_seq=from_seq)
+            if not session.offer(encoded[key], poles, seq, from_seq):
+                asyncio.create_task(session.evict())
+        self.frames_sent += 1
+        return len(changed)
+
+    def sync_alerts(self, session, events: List[Dict[str, Any]]) -> None:
+        """접속/구독 변경 시 현재 발생 중인 알림을 알림 채널로 보냅니다."""
+        if session.topics is not None:
+            events = [event for event in events if event['pole'] in session.topics]
+        if events and not session.offer_alert(wire_format.encode({"type": "alert", "events": events})):
+            asyncio.create_task(session.evict("alert overflow"))
+
+    def publish_alerts(self, events: List[Dict[str, Any]], subscriptions) -> int:
+        """
+        알림 이벤트를 구독에 맞는 클라이언트의 알림 채널 큐에 넣습니다. (알림 채널이 가득 찬 클라이언트는 evict)
+
+        Returns:
+            int: 전송한 이벤트 수
+        """
+        if not events:
+            return 0
+        frame = wire_format.encode({"type": "alert", "events": events})
+        for session in list(subscriptions.wildcard):
+            if not session.offer_alert(frame):
+                asyncio.create_task(session.evict("alert overflow"))
+        encoded: Dict[Tuple, str] = {}
+        for session, session_events in subscriptions.route(events, key='pole').items():
+            key = tuple((event['event_id'], event['state']) for event in session_events)
+            if key not in encoded:
+                encoded[key] = wire_format.encode({"type": "alert", "events": session_events})
+            if not session.offer_alert(encoded[key]):
+                asyncio.create_task(session.evict("alert overflow"))
+        return len(events)
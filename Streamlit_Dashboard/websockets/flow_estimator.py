@@ -0,0 +1,156 @@
+"""
+폴대별 투여 속도(flow rate) / 남은 시간 추정 모듈
+
+브로드캐스터가 수집 시점에 한 번만 계산하고, 결과를 프레임 필드로 내보냅니다.
+대시보드는 계산 없이 값을 표시하기만 합니다.
+
+폴대마다 지수 가중 최소제곱(시간 감쇠 EWLS) 누적합만 보관하므로 샘플당 O(1)입니다.
+    weight(t) ≈ a + b·t  →  flow_rate = -b (g/s)
+잔차 분산으로 기울기의 표준오차를 구해 남은 시간의 신뢰 구간(low/high)을 함께 제공합니다.
+
+- 샘플이 충분하지 않거나 추정이 불확실하면 기존 규칙(시간당 250g)을 기본 속도로 사용합니다.
+- 무게가 일정 이상 늘면(수액팩 교체/영점) 상태를 초기화합니다.
+
+추가되는 레코드 필드:
+    flow_rate: 추정 투여 속도 (g/h)
+    remaining_sec_est: 남은 시간 추정 (초, 무게가 없으면 -1)
+    remaining_sec_low / remaining_sec_high: 신뢰 구간 (추정 불가 시 None, 상한이 무한이면 high=None)
+"""
+
+import math
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+DEFAULT_FLOW_RATE_GPH = 250.0  # 기본 투여 속도: 시간당 250ml(=250g)
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """레코드 timestamp(epoch 초/밀리초 또는 ISO 문자열)를 epoch 초로 변환합니다."""
+    if value is None:
+        return None
+    try:
+        number = float(value)
+        return number / 1000 if number > 1e11 else number
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class _PoleFit:
+    """폴대 하나의 시간 감쇠 가중 최소제곱 누적합"""
+
+    __slots__ = ("t0", "last_t", "last_w", "sw", "sww", "st", "sy", "stt", "sty", "syy")
+
+    def __init__(self, t: float, w: float):
+        self.t0 = t
+        self.last_t = t
+        self.last_w = w
+        self.sw = self.sww = self.st = self.sy = self.stt = self.sty = self.syy = 0.0
+
+    def add(self, t: float, w: float, tau: float) -> None:
+        decay = math.exp(-max(0.0, t - self.last_t) / tau)
+        x = t - self.t0
+        self.sw = self.sw * decay + 1.0
+        self.sww = self.sww * decay * decay + 1.0
+        self.st = self.st * decay + x
+        self.sy = self.sy * decay + w
+        self.stt = self.stt * decay + x * x
+        self.sty = self.sty * decay + x * w
+        self.syy = self.syy * decay + w * w
+        self.last_t = t
+        self.last_w = w
+
+
+class FlowEstimator:
+    """
+    폴대별 투여 속도 / 남은 시간 추정기
+
+    Args:
+        tau_seconds: 지수 가중 시간 상수 (이보다 오래된 샘플의 영향은 1/e 이하)
+        min_samples: 추세 추정에 필요한 유효 샘플 수
+        max_relative_error: 추정 속도의 상대 표준오차가 이보다 크면 기본 속도 사용
+        refill_threshold: 이 값(g) 이상 무게가 늘면 수액팩 교체로 보고 초기화
+        z: 신뢰 구간 폭 (표준오차 배수)
+        default_rate_gph: 추정 전 사용할 기본 투여 속도 (g/h)
+    """
+
+    def __init__(self, tau_seconds: float = 600, min_samples: int = 30, max_relative_error: float = 0.25,
+                 refill_threshold: float = 50, z: float = 2.0, default_rate_gph: float = DEFAULT_FLOW_RATE_GPH):
+        self.tau_seconds = tau_seconds
+        self.min_samples = min_samples
+        self.max_relative_error = max_relative_error
+        self.refill_threshold = refill_threshold
+        self.z = z
+        self.default_rate_gph = default_rate_gph
+        self._fits: Dict[str, _PoleFit] = {}
+
+    def reset(self, pole_id: str) -> None:
+        self._fits.pop(pole_id, None)
+
+    def _estimate(self, fit: _PoleFit):
+        """(flow g/h, 표준오차 g/h) 또는 추정 불가 시 None"""
+        n = fit.sw
+        n_eff = n * n / fit.sww if fit.sww else 0.0
+        if n_eff < self.min_samples:
+            return None
+        mt, my = fit.st / n, fit.sy / n
+        var_t = fit.stt / n - mt * mt
+        if var_t <= 1e-9:
+            return None
+        cov = fit.sty / n - mt * my
+        slope = cov / var_t  # g/s
+        resid_var = max(0.0, fit.syy / n - my * my - slope * cov)
+        # 기울기 표준오차: s² / Σ(t - mt)²,  s² = 잔차 분산 · n_eff / (n_eff - 2)
+        dof = max(1.0, n_eff - 2)
+        stderr = math.sqrt(resid_var / (dof * var_t))
+        return -slope * 3600, stderr * 3600
+
+    def update(self, record: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        레코드의 무게 샘플로 폴대 상태를 갱신하고 추정 필드를 추가한 사본을 반환합니다.
+        """
+        pole_id = record.get("loadcel")
+        try:
+            weight = float(record.get("current_weight"))
+        except (TypeError, ValueError):
+            weight = None
+        t = parse_timestamp(record.get("timestamp"))
+        if t is None:
+            t = time.time() if now is None else now
+
+        enriched = dict(record)
+        enriched.update({
+            "flow_rate": None, "remaining_sec_est": -1,
+            "remaining_sec_low": None, "remaining_sec_high": None,
+        })
+        if weight is None or weight <= 0:
+            self.reset(pole_id)
+            return enriched
+
+        fit = self._fits.get(pole_id)
+        if fit is not None and (weight - fit.last_w > self.refill_threshold or t < fit.last_t):
+            fit = None  # 수액팩 교체/영점 또는 시간 역행
+        if fit is None:
+            fit = self._fits[pole_id] = _PoleFit(t, weight)
+        if t > fit.last_t or fit.sw == 0:
+            fit.add(t, weight, self.tau_seconds)
+
+        estimate = self._estimate(fit)
+        if estimate is None or estimate[0] <= 0 or estimate[1] > estimate[0] * self.max_relative_error:
+            # 추세가 아직 뚜렷하지 않으면 기본 속도로 계산
+            rate = self.default_rate_gph
+            enriched["flow_rate"] = rate
+            enriched["remaining_sec_est"] = int(weight / rate * 3600)
+            return enriched
+
+        rate, stderr = estimate
+        enriched["flow_rate"] = round(rate, 1)
+        enriched["remaining_sec_est"] = int(weight / rate * 3600)
+        enriched["remaining_sec_low"] = int(weight / (rate + self.z * stderr) * 3600)
+        upper_rate = rate - self.z * stderr
+        enriched["remaining_sec_high"] = int(weight / upper_rate * 3600) if upper_rate > 0 else None
+        return enriched
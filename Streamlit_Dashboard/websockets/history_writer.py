@@ -0,0 +1,415 @@
+"""
+loadcell_history write-behind 기록 모듈
+
+브로드캐스트 틱에서는 폴대별 샘플링 주기에 따라 히스토리 행을 메모리 버퍼에 쌓기만 하고,
+별도 주기의 flush가 batch_write_item(최대 25개 단위)으로 한꺼번에 기록합니다.
+처리되지 못한 아이템(UnprocessedItems)은 지수 백오프로 재시도하고,
+그래도 남으면 버퍼 앞쪽에 되돌려 다음 flush에서 다시 시도합니다.
+
+- 히스토리 밀도: 폴대당 sample_interval_seconds마다 1행
+- 쓰기 비용: flush당 ceil(버퍼 행 수 / 25)회 요청
+
+BucketHistoryWriter는 같은 샘플을 폴대 x 시간 버킷당 아이템 하나(utils/history_store.py 형식)로
+묶어 기록합니다. 열린 버킷은 샘플이 늘어난 경우에만 flush마다 통째로 다시 쓰고(PutItem 덮어쓰기),
+닫힌 버킷은 마지막으로 기록된 뒤 메모리에서 제거합니다. 시작 전에 열린 버킷은 처음 기록할 때
+기존 아이템을 읽어 합치므로 재시작해도 그 전에 기록된 샘플이 지워지지 않습니다.
+
+RollupWriter는 샘플링 주기와 관계없이 수신한 레코드마다 1분 / 1시간 / 1일 롤업
+(utils/rollups.py 형식)을 증분 갱신하고, 값이 바뀐 구간만 flush마다 덮어씁니다.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+
+# 대시보드와 같은 히스토리 저장 형식(utils/history_store.py)을 사용하기 위해 상위 디렉터리를 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import history_store, rollups
+
+BATCH_WRITE_LIMIT = 25  # DynamoDB batch_write_item 요청당 최대 아이템 수
+
+
+class HistoryWriter:
+    """
+    폴대별 주기 샘플링 + 메모리 버퍼 + 일괄 쓰기 히스토리 기록기
+
+    Args:
+        client: boto3 DynamoDB client
+        table_name: loadcell_history 테이블 이름
+        sample_interval_seconds: 폴대별 히스토리 샘플링 주기
+        max_buffer: 버퍼 최대 행 수 (넘치면 가장 오래된 행부터 버림)
+        max_retries: UnprocessedItems 재시도 횟수
+        ttl_days: expire_at(TTL) 계산용 보관 일수
+    """
+
+    LABEL = "히스토리"  # 로그 표시 이름
+    OPERATION = "history_flush"  # DynamoDB 오류 메트릭 라벨
+
+    def __init__(self, client, table_name: str, sample_interval_seconds: float = 60,
+                 max_buffer: int = 10000, max_retries: int = 5, ttl_days: int = 7):
+        self.client = client
+        self.table_name = table_name
+        self.sample_interval_seconds = sample_interval_seconds
+        self.max_retries = max_retries
+        self.ttl_seconds = ttl_days * 24 * 60 * 60
+        self._buffer = deque(maxlen=max_buffer)
+        self._last_sampled: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.rows_buffered = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.requests = 0
+
+    def _to_item(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        # 1주일(7일) 후 만료 시각 계산
+        expire_at = int(time.time()) + self.ttl_seconds
+        return {
+            'loadcel': {'S': str(record['loadcel'])},
+            'current_weight_history': {'S': str(record['current_weight'])},
+            # 추정기가 계산한 남은 시간이 있으면 그 값을 기록 (조회 측에서 다시 계산하지 않도록)
+            'remaining_sec_history': {'S': str(record.get('remaining_sec_est', record['remaining_sec']))},
+            'timestamp': {'S': str(record['timestamp'])},
+            'expire_at': {'N': str(expire_at)},  # TTL 필드
+        }
+
+    def offer(self, record: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """
+        폴대별 샘플링 주기가 지났으면 레코드를 버퍼에 추가합니다. (메모리 연산만 수행)
+
+        Returns:
+            bool: 버퍼에 추가되었으면 True
+        """
+        now = time.time() if now is None else now
+        pole_id = str(record['loadcel'])
+        last = self._last_sampled.get(pole_id)
+        if last is not None and now - last < self.sample_interval_seconds:
+            return False
+        self._last_sampled[pole_id] = now
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.rows_dropped += 1
+            self._buffer.append(self._to_item(record))
+        self.rows_buffered += 1
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def _item_key(self, item: Dict[str, Any]) -> Tuple[str, str]:
+        return item['loadcel']['S'], item['timestamp']['S']
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        batch = []
+        seen = set()
+        with self._lock:
+            while self._buffer and len(batch) < BATCH_WRITE_LIMIT:
+                item = self._buffer[0]
+                key = self._item_key(item)
+                self._buffer.popleft()
+                # 같은 요청 안의 중복 키는 DynamoDB가 거부하므로 제외
+                if key in seen:
+                    continue
+                seen.add(key)
+                batch.append(item)
+        return batch
+
+    def _requeue(self, items: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for item in reversed(items):
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.rows_dropped += 1
+                    continue
+                self._buffer.appendleft(item)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """배치를 기록하고, 재시도 후에도 처리되지 못한 아이템을 반환합니다."""
+        request_items = {self.table_name: [{'PutRequest': {'Item': item}} for item in batch]}
+        for attempt in range(self.max_retries + 1):
+            response = self.client.batch_write_item(RequestItems=request_items)
+            self.requests += 1
+            unprocessed = response.get('UnprocessedItems', {}).get(self.table_name, [])
+            self.rows_written += sum(len(v) for v in request_items.values()) - len(unprocessed)
+            if not unprocessed:
+                return []
+            request_items = {self.table_name: unprocessed}
+            if attempt < self.max_retries:
+                # 지수 백오프 + 지터
+                time.sleep(min(2.0, 0.05 * (2 ** attempt)) * (0.5 + random.random()))
+        return [request['PutRequest']['Item'] for request in request_items[self.table_name]]
+
+    def flush(self) -> int:
+        """
+        버퍼를 비울 때까지 25개 단위로 일괄 기록합니다. (블로킹 호출)
+
+        Returns:
+            int: 이번 flush에서 기록된 행 수
+        """
+        written_before = self.rows_written
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                break
+            try:
+                leftover = self._write_batch(batch)
+            except Exception:
+                self._requeue(batch)
+                raise
+            if leftover:
+                # 처리량 초과 등으로 남은 행은 다음 flush에서 다시 시도
+                self._requeue(leftover)
+                break
+        return self.rows_written - written_before
+
+    async def run(self, flush_interval_seconds: float, stats=None) -> None:
+        """flush_interval_seconds마다 스레드 풀에서 flush를 실행하는 백그라운드 루프"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(flush_interval_seconds)
+            if not self.pending():
+                continue
+            started = time.perf_counter()
+            try:
+                written = await loop.run_in_executor(None, self.flush)
+                print(f"[{self.LABEL} 업로드] {written}행 기록, 대기 {self.pending()}행")
+                if stats is not None:
+                    stats.record(written, time.perf_counter() - started)
+            except Exception as e:
+                metrics.DYNAMODB_ERRORS.inc(operation=self.OPERATION)
+                if stats is not None:
+                    stats.errors += 1
+                print(f"{self.LABEL} 일괄 업로드 실패: {e}")
+
+
+class BucketHistoryWriter(HistoryWriter):
+    """
+    폴대 x 시간 버킷 단위 히스토리 기록기 (HISTORY_LAYOUT=bucket)
+
+    Args:
+        bucket_seconds: 버킷 길이 (초)
+        그 외 인자는 HistoryWriter와 같습니다. (max_buffer는 기록 대기 버킷 아이템 수)
+    """
+
+    def __init__(self, client, table_name: str, sample_interval_seconds: float = 60,
+                 max_buffer: int = 10000, max_retries: int = 5, ttl_days: int = 7,
+                 bucket_seconds: int = history_store.HISTORY_BUCKET_SECONDS):
+        super().__init__(client, table_name, sample_interval_seconds, max_buffer, max_retries, ttl_days)
+        self.bucket_seconds = bucket_seconds
+        self.started_at = time.time()
+        self._buckets: Dict[Tuple[str, int], history_store.Bucket] = {}  # (pole_id, 버킷 시작) -> 샘플
+        self._dirty = set()  # 마지막 flush 이후 샘플이 추가된 버킷 키
+        self._resume = set()  # 시작 전에 열린 버킷: 처음 기록할 때 기존 아이템과 합침
+
+    def _item_key(self, item: Dict[str, Any]) -> Tuple[str, str]:
+        return item['loadcel']['S'], item['bucket']['N']
+
+    def offer(self, record: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """
+        폴대별 샘플링 주기가 지났으면 샘플을 해당 버킷에 추가합니다. (메모리 연산만 수행)
+
+        Returns:
+            bool: 버킷에 추가되었으면 True
+        """
+        now = time.time() if now is None else now
+        pole_id = str(record['loadcel'])
+        last = self._last_sampled.get(pole_id)
+        if last is not None and now - last < self.sample_interval_seconds:
+            return False
+        try:
+            weight = float(record['current_weight'])
+        except (TypeError, ValueError):
+            return False
+        self._last_sampled[pole_id] = now
+        sample_time, utc_offset = history_store.parse_sample_time(record.get('timestamp'))
+        if sample_time is None:
+            sample_time = now
+        key = (pole_id, history_store.bucket_start(sample_time, self.bucket_seconds))
+        if key[1] + 2 * self.bucket_seconds < now:
+            # 이미 메모리에서 빠진 닫힌 버킷: 새로 만들면 기록된 버킷을 덮어쓰므로 버림
+            self.rows_dropped += 1
+            return False
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = history_store.Bucket(pole_id, key[1], utc_offset)
+                if key[1] < self.started_at:
+                    self._resume.add(key)
+            bucket.add(sample_time, weight, record.get('remaining_sec_est', record.get('remaining_sec')))
+            self._dirty.add(key)
+        self.rows_buffered += 1
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer) + len(self._dirty)
+
+    def _merge_resumed(self, keys) -> None:
+        """재시작 전에 기록된 같은 버킷의 샘플을 읽어 메모리 버킷 앞에 합칩니다. (블로킹 호출)"""
+        for key in keys:
+            response = self.client.get_item(
+                TableName=self.table_name,
+                Key={'loadcel': {'S': key[0]}, 'bucket': {'N': str(key[1])}},
+            )
+            if 'Item' in response:
+                with self._lock:
+                    self._buckets[key].merge_earlier(response['Item'])
+            self._resume.discard(key)
+
+    def _seal(self, now: Optional[float] = None) -> None:
+        """샘플이 늘어난 버킷을 기록 대기 아이템으로 옮기고, 기록이 끝난 닫힌 버킷은 메모리에서 뺍니다."""
+        now = time.time() if now is None else now
+        expire_at = int(now) + self.ttl_seconds
+        with self._lock:
+            resumed = [key for key in self._dirty if key in self._resume]
+        if resumed:
+            self._merge_resumed(resumed)
+        with self._lock:
+            if self._dirty:
+                items = [self._buckets[key].to_item(self.bucket_seconds, expire_at) for key in self._dirty]
+                keys = {self._item_key(item) for item in items}
+                # 재시도로 남아 있던 같은 버킷의 예전 내용은 새 내용으로 대체
+                stale = [item for item in self._buffer if self._item_key(item) in keys]
+                for item in stale:
+                    self._buffer.remove(item)
+                for item in items:
+                    if len(self._buffer) == self._buffer.maxlen:
+                        self.rows_dropped += 1
+                    self._buffer.append(item)
+                self._dirty.clear()
+            closed_before = now - self.bucket_seconds
+            for key in [key for key in self._buckets if key[1] + self.bucket_seconds < closed_before]:
+                del self._buckets[key]
+                self._resume.discard(key)
+
+    def flush(self) -> int:
+        self._seal()
+        return super().flush()
+
+
+class RollupWriter(HistoryWriter):
+    """
+    수집 시점 다중 해상도 롤업 기록기 (1분 / 1시간 / 1일)
+
+    Args:
+        client: boto3 DynamoDB client
+        table_name: 롤업 테이블 이름
+        tiers: 유지할 티어 이름 목록 (기본값 rollups.TIERS 전체)
+        late_seconds: 구간이 끝난 뒤 늦게 도착한 샘플을 받아 주는 시간
+        그 외 인자는 HistoryWriter와 같습니다. (max_buffer는 기록 대기 롤업 아이템 수)
+    """
+
+    LABEL = "롤업"
+    OPERATION = "rollup_flush"
+
+    def __init__(self, client, table_name: str, tiers=None, late_seconds: float = 120,
+                 max_buffer: int = 10000, max_retries: int = 5):
+        super().__init__(client, table_name, 0, max_buffer, max_retries)
+        self.tiers = {tier: rollups.TIERS[tier] for tier in (tiers or rollups.TIERS)}
+        self.late_seconds = late_seconds
+        self.started_at = time.time()
+        self._cells: Dict[Tuple[str, str, int], rollups.RollupCell] = {}  # (pole_id, 티어, 구간 시작) -> 집계
+        self._dirty = set()  # 마지막 flush 이후 값이 바뀐 구간 키
+        self._resume = set()  # 시작 전에 열린 구간: 처음 기록할 때 기존 집계와 합침
+        self._previous: Dict[str, Tuple[float, float]] = {}  # pole_id -> (마지막 샘플 시각, 무게)
+
+    def _item_key(self, item: Dict[str, Any]) -> Tuple[str, str]:
+        return item['series']['S'], item['bucket']['N']
+
+    def offer(self, record: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """
+        레코드 하나를 모든 티어의 해당 구간에 반영합니다. (메모리 연산만 수행)
+        같은 샘플이 다시 오거나 이미 반영한 시각보다 오래된 샘플은 건너뜁니다.
+
+        Returns:
+            bool: 반영되었으면 True
+        """
+        now = time.time() if now is None else now
+        pole_id = str(record['loadcel'])
+        try:
+            weight = float(record['current_weight'])
+        except (TypeError, ValueError):
+            return False
+        sample_time, utc_offset = history_store.parse_sample_time(record.get('timestamp'))
+        if sample_time is None:
+            sample_time = now
+        previous = self._previous.get(pole_id)
+        if previous is not None and sample_time <= previous[0]:
+            return False
+        # 사용량은 직전 샘플 대비 감소분만 더합니다 (통계 페이지와 같은 기준, 리필 증가분 제외)
+        drop = max(0.0, previous[1] - weight) if previous is not None else 0.0
+        self._previous[pole_id] = (sample_time, weight)
+        with self._lock:
+            for tier, seconds in self.tiers.items():
+                start = rollups.cell_start(sample_time, seconds, utc_offset)
+                if start + seconds + self.late_seconds < now:
+                    # 이미 닫혀 메모리에서 빠진 구간: 다시 만들면 기록된 집계를 덮어쓰므로 버림
+                    self.rows_dropped += 1
+                    continue
+                key = (pole_id, tier, start)
+                cell = self._cells.get(key)
+                if cell is None:
+                    cell = self._cells[key] = rollups.RollupCell(pole_id, tier, start, utc_offset)
+                    if start < self.started_at:
+                        self._resume.add(key)
+                cell.add(weight, drop)
+                self._dirty.add(key)
+        self.rows_buffered += 1
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer) + len(self._dirty)
+
+    def _merge_resumed(self, keys) -> None:
+        """재시작 전에 기록된 같은 구간의 집계를 읽어 메모리 셀에 합칩니다. (블로킹 호출)"""
+        for key in keys:
+            cell = self._cells[key]
+            response = self.client.get_item(
+                TableName=self.table_name,
+                Key={'series': {'S': rollups.series_key(cell.pole_id, cell.tier)}, 'bucket': {'N': str(cell.start)}},
+            )
+            if 'Item' in response:
+                with self._lock:
+                    cell.merge_earlier(response['Item'])
+            self._resume.discard(key)
+
+    def _seal(self, now: Optional[float] = None) -> None:
+        """값이 바뀐 구간을 기록 대기 아이템으로 옮기고, 기록이 끝난 닫힌 구간은 메모리에서 뺍니다."""
+        now = time.time() if now is None else now
+        with self._lock:
+            resumed = [key for key in self._dirty if key in self._resume]
+        if resumed:
+            self._merge_resumed(resumed)
+        with self._lock:
+            if self._dirty:
+                items = []
+                for key in self._dirty:
+                    cell = self._cells[key]
+                    # 티어별 보관 기간이 지나면 TTL로 삭제
+                    items.append(cell.to_item(cell.start + rollups.TIER_RETENTION_DAYS[cell.tier] * 24 * 60 * 60))
+                keys = {self._item_key(item) for item in items}
+                # 재시도로 남아 있던 같은 구간의 예전 값은 새 값으로 대체
+                stale = [item for item in self._buffer if self._item_key(item) in keys]
+                for item in stale:
+                    self._buffer.remove(item)
+                for item in items:
+                    if len(self._buffer) == self._buffer.maxlen:
+                        self.rows_dropped += 1
+                    self._buffer.append(item)
+                self._dirty.clear()
+            closed = [key for key in self._cells if key[2] + self.tiers[key[1]] + self.late_seconds < now]
+            for key in closed:
+                del self._cells[key]
+                self._resume.discard(key)
+
+    def flush(self) -> int:
+        self._seal()
+        return super().flush()
+
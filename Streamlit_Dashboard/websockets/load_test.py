@@ -0,0 +1,377 @@
+"""
+병동 규모 부하 생성기 / 장시간(soak) 벤치마크
+
+수집(로컬 저장소) -> 브로드캐스트 파이프라인 -> 클라이언트 송신 큐 경로 전체를 한 프로세스에서 돌려
+처리량, 종단 지연(센서 timestamp -> 가상 클라이언트 수신), 메모리 사용량을 측정합니다.
+AWS 없이 같은 조건으로 반복 실행할 수 있으므로 배포 전에 성능 회귀를 확인하는 데 씁니다.
+
+    python load_test.py --poles 2000 --clients 50 --duration 600
+    python load_test.py --poles 500 --clients 20 --duration 60 --json result.json --max-p99-ms 1500
+
+- 저장소: sqlite(기본값, STORAGE_BACKEND=sqlite + 변경 순번 커서) / memory(INGEST_MODE=memory 스탠드인)
+- 폴대: 수액 백 용량, 투여 속도, 센서 잡음, 빈 백 교체, 너스콜을 흉내 낸 수액 곡선
+- 클라이언트: handler()와 같은 open_session() 경로로 등록되는 가상 웹소켓.
+  probe 클라이언트는 프레임을 해석해 종단 지연을 재고, slow 클라이언트는 느린 태블릿처럼 늦게 받습니다.
+
+브로드캐스터 설정은 환경 변수로 읽히므로 streamlit_websocket은 설정을 마친 뒤 가져옵니다.
+--max-p99-ms / --max-rss-growth-mb를 넘으면 종료 코드 1로 끝나므로 CI에서 회귀 검사로 쓸 수 있습니다.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+# 아래 모듈은 환경 변수를 읽지 않으므로 설정 전에 가져와도 됩니다. (streamlit_websocket은 run_load에서 가져옴)
+from fanout import wire_format
+from flow_estimator import parse_timestamp
+from stage_stats import LatencyStats
+
+KST = timezone(timedelta(hours=9))
+BAG_SIZES = (500.0, 1000.0)  # 수액 백 용량 (g)
+
+
+def rss_megabytes() -> float:
+    """현재 프로세스 RSS (MB). /proc이 없으면 최대 RSS로 대신합니다."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class SimulatedPole:
+    """
+    폴대 하나의 수액 곡선
+
+    백 용량에서 일정한 투여 속도로 줄어들고 센서 잡음이 섞이며,
+    비면 잠시 뒤 새 백으로 교체됩니다. 가끔 너스콜이 일정 시간 켜집니다.
+
+    Args:
+        pole_id: 폴대 ID
+        rng: 난수 생성기 (시드 고정으로 실행마다 같은 곡선)
+        noise_g: 센서 잡음 표준편차 (g)
+        nurse_calls_per_hour: 폴대당 시간당 너스콜 발생 횟수
+    """
+
+    __slots__ = ("pole_id", "rng", "noise_g", "nurse_call_rate", "bag", "weight", "rate", "empty_until",
+                 "nurse_call_until")
+
+    def __init__(self, pole_id: int, rng: random.Random, noise_g: float = 1.5, nurse_calls_per_hour: float = 0.2):
+        self.pole_id = str(pole_id)
+        self.rng = rng
+        self.noise_g = noise_g
+        self.nurse_call_rate = nurse_calls_per_hour / 3600
+        self.bag = rng.choice(BAG_SIZES)
+        self.weight = self.bag * rng.uniform(0.05, 1.0)  # 투여 도중부터 시작
+        self.rate = rng.uniform(40, 250) / 3600  # 투여 속도 (g/s)
+        self.empty_until: Optional[float] = None
+        self.nurse_call_until = 0.0
+
+    def step(self, sim_now: float, dt: float) -> Dict[str, Any]:
+        """시뮬레이션 시각 sim_now까지 dt초 진행한 뒤 loadcell 아이템(client 형식)을 만듭니다."""
+        if self.empty_until is not None:
+            if sim_now >= self.empty_until:
+                # 새 백 교체: 용량과 투여 속도를 다시 정합니다.
+                self.bag = self.rng.choice(BAG_SIZES)
+                self.weight = self.bag
+                self.rate = self.rng.uniform(40, 250) / 3600
+                self.empty_until = None
+        else:
+            self.weight -= self.rate * dt
+            if self.weight <= 0:
+                self.weight = 0.0
+                self.empty_until = sim_now + self.rng.uniform(60, 600)  # 빈 백 교체까지 걸리는 시간
+        if self.rng.random() < self.nurse_call_rate * dt:
+            self.nurse_call_until = sim_now + self.rng.uniform(30, 120)
+        measured = max(0.0, self.weight + self.rng.gauss(0, self.noise_g))
+        return {
+            'loadcel': {'S': self.pole_id},
+            'current_weight': {'S': f"{measured:.1f}"},
+            'remaining_sec': {'S': str(int(self.weight / self.rate)) if self.rate > 0 else "-1"},
+            'nurse_call': {'BOOL': sim_now < self.nurse_call_until},
+            'timestamp': {'S': datetime.now(KST).isoformat()},
+        }
+
+
+class PoleSimulator:
+    """
+    N개 폴대를 폴대별 주기(rate_hz)로 갱신하는 부하 생성기
+
+    Args:
+        poles: 폴대 수
+        rate_hz: 폴대당 초당 갱신 횟수
+        speed: 수액 곡선 가속 배율 (10이면 실제 1초에 10초만큼 투여)
+        seed: 난수 시드
+    """
+
+    def __init__(self, poles: int, rate_hz: float = 1.0, speed: float = 1.0, seed: int = 0, **pole_kwargs):
+        rng = random.Random(seed)
+        self.interval = 1.0 / rate_hz
+        self.speed = speed
+        self.poles = [SimulatedPole(pole_id, random.Random(rng.random()), **pole_kwargs)
+                      for pole_id in range(1, poles + 1)]
+        started = time.monotonic()
+        self._started = started
+        # 모든 폴대가 같은 순간에 몰리지 않도록 첫 갱신 시각을 주기 안에서 흩어 놓습니다.
+        self._next_due = [started + rng.uniform(0, self.interval) for _ in self.poles]
+        self._last = [started] * len(self.poles)
+        self.sim_start = time.time()  # 시뮬레이션 시각 기준 (빈 백 교체/너스콜 타이머용)
+        self.generated = 0
+
+    def due_items(self, now: float) -> List[Dict[str, Any]]:
+        """now(monotonic)까지 갱신 시각이 된 폴대의 아이템 목록"""
+        items = []
+        sim_now = self.sim_start + (now - self._started) * self.speed
+        for index, pole in enumerate(self.poles):
+            if self._next_due[index] > now:
+                continue
+            dt = (now - self._last[index]) * self.speed
+            self._last[index] = now
+            self._next_due[index] += self.interval
+            if self._next_due[index] < now:
+                self._next_due[index] = now + self.interval  # 밀렸으면 따라잡지 않고 다음 주기로
+            items.append(pole.step(sim_now, dt))
+        self.generated += len(items)
+        return items
+
+
+class ProbeWebSocket:
+    """
+    open_session()에 넘기는 가상 웹소켓
+
+    Args:
+        latency: 종단 지연을 기록할 LatencyStats (None이면 프레임을 해석하지 않음)
+        send_delay: 프레임마다 걸리는 전송 시간 (느린 클라이언트 흉내)
+        measure_after: 이 시각(epoch 초) 이전 샘플은 지연 통계에서 제외 (워밍업)
+    """
+
+    def __init__(self, name: str, latency=None, send_delay: float = 0.0, measure_after: float = 0.0):
+        self.remote_address = (name, 0)
+        self.latency = latency
+        self.send_delay = send_delay
+        self.measure_after = measure_after
+        self.frames = 0
+        self.bytes = 0
+
+    async def send(self, payload) -> None:
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        received_at = time.time()
+        self.frames += 1
+        self.bytes += len(payload)
+        if self.latency is None:
+            return
+        frame = json.loads(payload) if isinstance(payload, str) else wire_format.decode(payload)
+        if frame.get("type") != "delta":
+            return
+        for pole in frame.get("poles", []):
+            sampled_at = parse_timestamp(pole.get("timestamp"))
+            if sampled_at is not None and sampled_at >= self.measure_after:
+                self.latency.observe(received_at - sampled_at)
+
+
+def configure_environment(args) -> str:
+    """브로드캐스터가 가져오기 전에 읽을 환경 변수를 설정하고 로컬 DB 경로를 반환합니다."""
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="iv-load-"), "load.db")
+    if args.store == "sqlite":
+        os.environ["STORAGE_BACKEND"] = "sqlite"
+        os.environ["LOCAL_DB_PATH"] = db_path
+        os.environ["INGEST_MODE"] = "stream"  # sqlite 백엔드에서는 변경 순번 커서
+    else:
+        os.environ["INGEST_MODE"] = "memory"
+    os.environ["POLL_DEBUG_LOG"] = "0"
+    os.environ["METRICS_PORT"] = str(args.metrics_port)
+    os.environ["STATS_INTERVAL_SECONDS"] = str(int(args.report_interval))
+    return db_path
+
+
+async def run_load(args) -> Dict[str, Any]:
+    """
+    부하 생성 + 파이프라인 + 가상 클라이언트를 args.duration초 동안 실행하고 결과를 반환합니다.
+    """
+    import streamlit_websocket as broadcaster
+    metrics = broadcaster.metrics
+
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=broadcaster.AWS_IO_WORKERS, thread_name_prefix="aws-io"))
+    simulator = PoleSimulator(args.poles, args.rate, args.speed, args.seed,
+                              noise_g=args.noise, nurse_calls_per_hour=args.nurse_calls)
+    rss_start = rss_megabytes()
+    started = time.time()
+    measure_after = started + args.warmup
+    latency = LatencyStats("e2e", args.max_p99_ms / 1000 if args.max_p99_ms else 1.0, window=args.latency_window)
+
+    def write(items):
+        if args.store == "sqlite":
+            for offset in range(0, len(items), 500):
+                broadcaster.dynamodb_client.batch_write_item(RequestItems={
+                    broadcaster.TABLE_NAME: [{'PutRequest': {'Item': item}} for item in items[offset:offset + 500]]
+                })
+        else:
+            for item in items:
+                broadcaster.local_loadcell_table.put_item(Item=item)
+
+    async def generate():
+        while True:
+            items = simulator.due_items(time.monotonic())
+            if items:
+                await loop.run_in_executor(None, write, items)
+            await asyncio.sleep(args.tick)
+
+    # 가상 클라이언트: 앞쪽 probe개는 지연 측정, 뒤쪽 slow개는 느린 소비자
+    rng = random.Random(args.seed + 1)
+    pole_ids = [pole.pole_id for pole in simulator.poles]
+    sockets = []
+    for index in range(args.clients):
+        topics = None
+        if args.poles_per_client:
+            topics = frozenset(rng.sample(pole_ids, min(args.poles_per_client, len(pole_ids))))
+        websocket = ProbeWebSocket(
+            f"client-{index}",
+            latency=latency if index < args.probe_clients else None,
+            send_delay=args.slow_delay if index >= args.clients - args.slow_clients else 0.0,
+            measure_after=measure_after,
+        )
+        session = broadcaster.open_session(websocket, topics=topics, frame_format=args.format)
+        sockets.append((websocket, session, asyncio.create_task(session.run_sender())))
+
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = await metrics.serve_http("127.0.0.1", args.metrics_port, broadcaster.health_check)
+    tasks = [asyncio.create_task(broadcaster.broadcast_data()), asyncio.create_task(generate())]
+    intervals = []
+    rss_peak = rss_start
+    previous = (time.time(), 0, 0, 0)
+    try:
+        while time.time() - started < args.duration:
+            await asyncio.sleep(min(args.report_interval, max(0.1, args.duration - (time.time() - started))))
+            for task in tasks:
+                if task.done() and task.exception() is not None:
+                    raise task.exception()
+            now = time.time()
+            frames = sum(websocket.frames for websocket, _, _ in sockets)
+            sent_bytes = sum(websocket.bytes for websocket, _, _ in sockets)
+            elapsed = now - previous[0]
+            rss = rss_megabytes()
+            rss_peak = max(rss_peak, rss)
+            row = {
+                'elapsed': round(now - started, 1),
+                'writes_per_sec': round((simulator.generated - previous[1]) / elapsed, 1),
+                'frames_per_sec': round((frames - previous[2]) / elapsed, 1),
+                'mbytes_per_sec': round((sent_bytes - previous[3]) / elapsed / 1024 / 1024, 3),
+                'p50_ms': round(latency.percentile(0.5) * 1000, 1),
+                'p99_ms': round(latency.percentile(0.99) * 1000, 1),
+                'rss_mb': round(rss, 1),
+                'clients': len(broadcaster.clients),
+            }
+            intervals.append(row)
+            previous = (now, simulator.generated, frames, sent_bytes)
+            print(f"[부하] {row['elapsed']:.0f}s | 쓰기 {row['writes_per_sec']:.0f}/s | 프레임 {row['frames_per_sec']:.0f}/s"
+                  f" | {row['mbytes_per_sec']:.2f}MB/s | 지연 p50 {row['p50_ms']:.0f}ms p99 {row['p99_ms']:.0f}ms"
+                  f" | RSS {row['rss_mb']:.0f}MB | 연결 {row['clients']}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        for _, session, sender in sockets:
+            sender.cancel()
+            broadcaster.close_session(session)
+        await asyncio.gather(*tasks, *(sender for _, _, sender in sockets), return_exceptions=True)
+        if metrics_server is not None:
+            metrics_server.close()
+
+    duration = time.time() - started
+    measured = [row for row in intervals if row['elapsed'] > args.warmup] or intervals
+    rss_end = rss_megabytes()
+    return {
+        'config': {key: value for key, value in vars(args).items() if key != 'json'},
+        'duration_sec': round(duration, 1),
+        'writes_total': simulator.generated,
+        'writes_per_sec': round(sum(row['writes_per_sec'] for row in measured) / max(1, len(measured)), 1),
+        'frames_total': sum(websocket.frames for websocket, _, _ in sockets),
+        'frames_per_sec': round(sum(row['frames_per_sec'] for row in measured) / max(1, len(measured)), 1),
+        'latency_ms': {
+            'samples': latency.count,
+            'p50': round(latency.percentile(0.5) * 1000, 1),
+            'p95': round(latency.percentile(0.95) * 1000, 1),
+            'p99': round(latency.percentile(0.99) * 1000, 1),
+            'max': round(latency.max_seconds * 1000, 1),
+        },
+        'frames_dropped': sum(value for _, _, value in metrics.FRAMES_DROPPED.samples()),
+        'clients_evicted': sum(value for _, _, value in metrics.CLIENTS_EVICTED.samples()),
+        'history_pending': broadcaster.history_writer.pending(),
+        'rollup_pending': broadcaster.rollup_writer.pending() if broadcaster.rollup_writer is not None else None,
+        'rss_mb': {'start': round(rss_start, 1), 'peak': round(rss_peak, 1), 'end': round(rss_end, 1),
+                   'growth': round(rss_end - rss_start, 1)},
+        'intervals': intervals,
+    }
+
+
+def check_thresholds(result: Dict[str, Any], args) -> List[str]:
+    """회귀 기준을 넘은 항목 목록 (비어 있으면 통과)"""
+    failures = []
+    if args.max_p99_ms and result['latency_ms']['p99'] > args.max_p99_ms:
+        failures.append(f"p99 지연 {result['latency_ms']['p99']}ms > {args.max_p99_ms}ms")
+    if args.max_rss_growth_mb and result['rss_mb']['growth'] > args.max_rss_growth_mb:
+        failures.append(f"RSS 증가 {result['rss_mb']['growth']}MB > {args.max_rss_growth_mb}MB")
+    if not result['latency_ms']['samples'] and args.probe_clients:
+        failures.append("지연 샘플이 없습니다 (클라이언트가 프레임을 받지 못함)")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="수집 -> 브로드캐스트 -> 클라이언트 경로 부하/soak 벤치마크")
+    parser.add_argument("--poles", type=int, default=500, help="폴대 수")
+    parser.add_argument("--rate", type=float, default=1.0, help="폴대당 초당 갱신 횟수")
+    parser.add_argument("--speed", type=float, default=1.0, help="수액 곡선 가속 배율")
+    parser.add_argument("--noise", type=float, default=1.5, help="센서 잡음 표준편차 (g)")
+    parser.add_argument("--nurse-calls", type=float, default=0.2, help="폴대당 시간당 너스콜 수")
+    parser.add_argument("--clients", type=int, default=20, help="가상 웹소켓 클라이언트 수")
+    parser.add_argument("--poles-per-client", type=int, default=0, help="클라이언트당 구독 폴대 수 (0이면 전체)")
+    parser.add_argument("--probe-clients", type=int, default=4, help="프레임을 해석해 지연을 재는 클라이언트 수")
+    parser.add_argument("--slow-clients", type=int, default=0, help="느린 소비자 클라이언트 수")
+    parser.add_argument("--slow-delay", type=float, default=0.5, help="느린 클라이언트의 프레임당 전송 시간 (초)")
+    parser.add_argument("--format", default="json", choices=("json", "struct", "msgpack"), help="클라이언트 프레임 포맷")
+    parser.add_argument("--store", default="sqlite", choices=("sqlite", "memory"), help="로컬 저장소 종류")
+    parser.add_argument("--db", default=None, help="sqlite 파일 경로 (기본값: 임시 디렉터리)")
+    parser.add_argument("--duration", type=float, default=60, help="측정 시간 (초)")
+    parser.add_argument("--warmup", type=float, default=5, help="지연 통계에서 제외할 시작 구간 (초)")
+    parser.add_argument("--tick", type=float, default=0.05, help="부하 생성 루프 주기 (초)")
+    parser.add_argument("--report-interval", type=float, default=10, help="중간 결과 출력 주기 (초)")
+    parser.add_argument("--latency-window", type=int, default=200000, help="백분위 계산에 쓰는 최근 지연 샘플 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--metrics-port", type=int, default=0, help="/metrics 포트 (0이면 끔)")
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 파일 경로")
+    parser.add_argument("--max-p99-ms", type=float, default=0, help="p99 지연 상한 (넘으면 종료 코드 1)")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=0, help="RSS 증가 상한 (넘으면 종료 코드 1)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    db_path = configure_environment(args)
+    print(f"[부하] 폴대 {args.poles}개 x {args.rate}Hz, 클라이언트 {args.clients}개"
+          f" (probe {args.probe_clients}, slow {args.slow_clients}), {args.duration:.0f}초, 저장소 {args.store}"
+          + (f" ({db_path})" if args.store == "sqlite" else ""))
+    result = asyncio.run(run_load(args))
+    print(json.dumps({key: value for key, value in result.items() if key not in ('intervals', 'config')},
+                     ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(result, output, ensure_ascii=False, indent=2)
+    failures = check_thresholds(result, args)
+    for failure in failures:
+        print(f"[부하] 기준 초과: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
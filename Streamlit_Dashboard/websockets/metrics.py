@@ -0,0 +1,270 @@
+"""
+브로드캐스터 메트릭 / 헬스 체크 HTTP 엔드포인트
+
+웹소켓 서버와 같은 이벤트 루프에서 작은 HTTP 서버(asyncio.start_server)를 띄워
+Prometheus 텍스트 포맷(0.0.4)의 메트릭과 헬스 체크 결과를 제공합니다. 추가 의존성은 없습니다.
+
+    GET /metrics  -> Prometheus 텍스트 포맷
+    GET /healthz  -> 200 {"status": "ok", ...} 또는 503 {"status": "unhealthy", ...}
+
+메트릭 객체는 이 모듈의 REGISTRY에 등록되고, 각 모듈은 아래 공용 메트릭을 가져다 기록합니다.
+단계별 카운터처럼 이미 다른 객체가 들고 있는 값은 register_collector()로 스크레이프 시점에 읽습니다.
+"""
+
+import asyncio
+import json
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Prometheus 기본 버킷보다 짧은 지연을 세밀하게 보도록 조정한 버킷 (초)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+AGE_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+Sample = Tuple[str, Dict[str, str], float]  # (이름, 라벨, 값)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()  # 스레드 풀(boto3 호출)에서도 기록할 수 있도록
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: 라벨이 맞지 않습니다 ({sorted(labels)} != {sorted(self.labelnames)})")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """현재 값 게이지 (set_function으로 스크레이프 시점에 값을 읽을 수도 있음)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def samples(self) -> List[Sample]:
+        value = self._function() if self._function is not None else self._value
+        return [(self.name, {}, value)]
+
+
+class Histogram(_Metric):
+    """누적 버킷 히스토그램 (_bucket / _sum / _count)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._sum += value
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[index] += 1
+                    break
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        samples: List[Sample] = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            samples.append((self.name + "_bucket", {"le": _format_value(bound)}, cumulative))
+        samples.append((self.name + "_sum", {}, total))
+        samples.append((self.name + "_count", {}, cumulative))
+        return samples
+
+
+class Registry:
+    """메트릭과 콜렉터 모음. render()로 Prometheus 텍스트를 만듭니다."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[_Metric, List[Sample]]]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable) -> None:
+        """
+        스크레이프 시점에 (메트릭 정의, 샘플 리스트) 목록을 돌려주는 함수를 등록합니다.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        families = [(metric, metric.samples()) for metric in self._metrics]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                print(f"[메트릭] 콜렉터 오류: {e}")
+        lines = []
+        for metric, samples in families:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ====== 브로드캐스터 공용 메트릭 ======
+POLL_SECONDS = REGISTRY.register(Histogram(
+    "iv_poll_duration_seconds", "loadcell 변경분 읽기(scan/stream) 소요 시간"))
+FANOUT_SECONDS = REGISTRY.register(Histogram(
+    "iv_fanout_duration_seconds", "틱당 알림 평가 + 프레임 직렬화 + 송신 큐 적재 소요 시간"))
+SENSOR_AGE_SECONDS = REGISTRY.register(Histogram(
+    "iv_sensor_to_send_age_seconds", "센서 timestamp부터 클라이언트 송신 큐 적재까지의 경과 시간", AGE_BUCKETS))
+PRIORITY_LATENCY_SECONDS = REGISTRY.register(Histogram(
+    "iv_priority_alert_latency_seconds", "긴급 알림 수집 완료부터 알림 채널 적재까지의 지연"))
+CLIENTS = REGISTRY.register(Gauge(
+    "iv_connected_clients", "현재 연결된 웹소켓 클라이언트 수"))
+BYTES_SENT = REGISTRY.register(Counter(
+    "iv_sent_bytes_total", "클라이언트로 전송한 바이트 수", ("channel",)))
+FRAMES_SENT = REGISTRY.register(Counter(
+    "iv_sent_frames_total", "클라이언트로 전송한 프레임 수", ("channel",)))
+FRAMES_DROPPED = REGISTRY.register(Counter(
+    "iv_dropped_frames_total", "송신 큐 포화로 버리거나 합친 프레임 수", ("policy",)))
+CLIENTS_EVICTED = REGISTRY.register(Counter(
+    "iv_evicted_clients_total", "느린 소비자로 연결을 끊은 클라이언트 수", ("reason",)))
+DYNAMODB_ERRORS = REGISTRY.register(Counter(
+    "iv_dynamodb_errors_total", "DynamoDB 호출 오류 수", ("operation",)))
+ALERT_POLES_EVICTED = REGISTRY.register(Counter(
+    "iv_alert_poles_evicted_total", "오래 수신이 없어 알림 상태를 버린 폴대 수"))
+
+
+def stage_collector(stages) -> Callable:
+    """StageStats 목록을 단계 라벨이 붙은 카운터/게이지로 내보내는 콜렉터를 만듭니다."""
+    items = Counter("iv_stage_items_total", "파이프라인 단계가 처리한 아이템 수", ("stage",))
+    errors = Counter("iv_stage_errors_total", "파이프라인 단계 오류 수", ("stage",))
+    dropped = Counter("iv_stage_dropped_total", "파이프라인 단계에서 버린 아이템 수", ("stage",))
+    busy = Counter("iv_stage_busy_seconds_total", "파이프라인 단계가 처리에 쓴 시간", ("stage",))
+    depth = Gauge("iv_stage_queue_depth", "파이프라인 단계 입력 큐 적체")
+
+    def collect():
+        snapshots = [(stage.name, stage.snapshot()) for stage in stages]
+        return [
+            (items, [(items.name, {"stage": name}, snap['items']) for name, snap in snapshots]),
+            (errors, [(errors.name, {"stage": name}, snap['errors']) for name, snap in snapshots]),
+            (dropped, [(dropped.name, {"stage": name}, snap['dropped']) for name, snap in snapshots]),
+            (busy, [(busy.name, {"stage": name}, snap['busy_seconds']) for name, snap in snapshots]),
+            (depth, [(depth.name, {"stage": name}, snap['queue_depth']) for name, snap in snapshots]),
+        ]
+
+    return collect
+
+
+_STATUS_TEXT = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 503: "Service Unavailable"}
+
+
+async def _handle_http(reader, writer, registry: Registry, health: Callable[[], Tuple[bool, Dict]]) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # 헤더는 읽고 버립니다 (본문 없는 GET만 지원)
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=5)
+            if line in (b"\r\n", b"\n", b""):
+                break
+        parts = request_line.decode("latin-1").split()
+        method, path = (parts[0], parts[1]) if len(parts) >= 2 else ("", "")
+        path = path.split("?", 1)[0]
+        if method != "GET":
+            status, content_type, body = 405, "text/plain; charset=utf-8", "method not allowed\n"
+        elif path == "/metrics":
+            status, content_type, body = 200, "text/plain; version=0.0.4; charset=utf-8", registry.render()
+        elif path in ("/healthz", "/health"):
+            healthy, detail = health()
+            status = 200 if healthy else 503
+            content_type = "application/json; charset=utf-8"
+            body = json.dumps({"status": "ok" if healthy else "unhealthy", **detail}, ensure_ascii=False)
+        else:
+            status, content_type, body = 404, "text/plain; charset=utf-8", "not found\n"
+        payload = body.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_STATUS_TEXT[status]}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_http(host: str, port: int, health: Callable[[], Tuple[bool, Dict]], registry: Registry = REGISTRY):
+    """
+    /metrics, /healthz HTTP 서버를 현재 이벤트 루프에서 시작합니다.
+
+    Args:
+        host: 바인드 주소
+        port: 포트
+        health: (정상 여부, 상세 정보 딕셔너리)를 반환하는 함수
+        registry: 내보낼 메트릭 레지스트리
+
+    Returns:
+        asyncio.Server
+    """
+    server = await asyncio.start_server(lambda r, w: _handle_http(r, w, registry, health), host, port)
+    print(f"[메트릭] http://{host}:{port}/metrics, /healthz 제공 중")
+    return server
@@ -0,0 +1,33 @@
+"""
+pole_stat(배터리/분실 상태) 캐시 모듈 (브로드캐스터용)
+
+캐시 본체는 대시보드와 함께 쓰는 utils/pole_stat_cache.py에 있고,
+여기서는 브로드캐스트 이벤트 루프에서 돌리는 asyncio 갱신 루프만 붙입니다.
+틱 경로에서는 get()으로 메모리 조회만 합니다.
+"""
+
+import asyncio
+import os
+import sys
+
+import metrics
+
+# 공용 캐시(utils/pole_stat_cache.py)를 사용하기 위해 상위 디렉터리를 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import pole_stat_cache as shared
+
+
+class PoleStatCache(shared.PoleStatCache):
+    """utils의 PoleStatCache + 이벤트 루프용 갱신 루프"""
+
+    async def run(self, interval_seconds: float) -> None:
+        """interval_seconds 주기로 캐시를 일괄 갱신하는 백그라운드 루프"""
+        while True:
+            try:
+                count = await asyncio.to_thread(self.refresh)
+                evicted = self.evict_expired()
+                print(f"[pole_stat 캐시] 갱신 {count}개, 만료 제거 {evicted}개")
+            except Exception as e:
+                metrics.DYNAMODB_ERRORS.inc(operation="pole_stat_refresh")
+                print(f"pole_stat 캐시 갱신 실패: {e}")
+            await asyncio.sleep(interval_seconds)
@@ -0,0 +1,56 @@
+"""
+스냅샷 + 시퀀스 번호 재전송 버퍼
+
+브로드캐스트한 delta마다 증가하는 시퀀스 번호를 붙이고,
+- 폴대별 최신 전체 상태(state)
+- 최근 delta들의 고정 크기 링 버퍼
+를 보관합니다.
+
+새로 접속한 클라이언트에게는 즉시 전체 스냅샷을 보내고,
+재접속한 클라이언트가 마지막으로 받은 (epoch, seq)를 알려주면 놓친 delta만 다시 보냅니다.
+epoch는 서버 기동 시각으로, 서버가 재시작되어 시퀀스가 초기화된 경우를 구분합니다.
+"""
+
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ReplayBuffer:
+    """
+    Args:
+        capacity: 보관할 최근 delta 개수 (틱 단위)
+    """
+
+    def __init__(self, capacity: int = 300):
+        self.epoch = int(time.time() * 1000)
+        self.seq = 0
+        self.state: Dict[str, Dict[str, Any]] = {}  # pole_id -> 최신 레코드
+        self._deltas = deque(maxlen=capacity)  # (seq, 변경 폴대 레코드 리스트, 직렬화된 프레임)
+
+    def append(self, changed: List[Dict[str, Any]], frame: str) -> int:
+        """변경분과 이미 직렬화된 프레임을 기록하고 새 시퀀스 번호를 반환합니다."""
+        self.seq += 1
+        for record in changed:
+            self.state[record['loadcel']] = record
+        self._deltas.append((self.seq, changed, frame))
+        return self.seq
+
+    def snapshot(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """현재 시퀀스 번호와 전체 폴대 상태를 반환합니다."""
+        return self.seq, list(self.state.values())
+
+    def since(self, epoch: Optional[int], last_seq: Optional[int]) -> Optional[List[Tuple[int, List[Dict[str, Any]], str]]]:
+        """
+        last_seq 이후의 delta 목록을 반환합니다.
+
+        Returns:
+            놓친 (seq, poles, frame) 리스트. 이어받을 수 없는 경우(서버 재시작, 버퍼 범위 초과 등) None
+        """
+        if epoch != self.epoch or last_seq is None or last_seq > self.seq:
+            return None
+        if last_seq == self.seq:
+            return []
+        if not self._deltas or last_seq + 1 < self._deltas[0][0]:
+            return None
+        return [delta for delta in self._deltas if delta[0] > last_seq]
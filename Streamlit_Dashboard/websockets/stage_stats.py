@@ -0,0 +1,125 @@
+"""
+브로드캐스터 파이프라인 단계별 처리량 통계
+
+각 단계(poller / normalizer / history / fanout)는 자신의 StageStats에
+처리한 배치/아이템 수, 처리에 쓴 시간, 오류 수를 기록합니다.
+report_loop()가 주기적으로 단계별 처리량과 큐 적체를 출력합니다.
+
+긴급 알림 우선 경로처럼 지연 목표(budget)가 따로 있는 경로는 LatencyStats에
+건별 지연을 기록하고, report_loop()가 p50/p99와 목표 초과 건수를 함께 출력합니다.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class StageStats:
+    """파이프라인 한 단계의 누적 카운터"""
+
+    def __init__(self, name: str, queue: Optional[asyncio.Queue] = None):
+        self.name = name
+        self.queue = queue  # 이 단계가 소비하는 입력 큐 (적체 확인용)
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        self.last_duration = 0.0
+
+    def record(self, items: int, duration: float) -> None:
+        self.batches += 1
+        self.items += items
+        self.busy_seconds += duration
+        self.last_duration = duration
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'busy_seconds': self.busy_seconds,
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+        }
+
+
+class LatencyStats:
+    """
+    최근 지연 샘플(초)과 목표 초과 건수
+
+    Args:
+        name: 출력 이름
+        budget_seconds: 지연 목표 (초과 건수를 따로 셉니다)
+        window: 백분위 계산에 쓰는 최근 샘플 수
+    """
+
+    def __init__(self, name: str, budget_seconds: float, window: int = 1024):
+        self.name = name
+        self.budget_seconds = budget_seconds
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.over_budget = 0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds: float) -> None:
+        seconds = max(0.0, seconds)
+        self._samples.append(seconds)
+        self.count += 1
+        self.max_seconds = max(self.max_seconds, seconds)
+        if seconds > self.budget_seconds:
+            self.over_budget += 1
+
+    def percentile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> str:
+        return (
+            f"{self.name}: {self.count}건, p50 {self.percentile(0.5) * 1000:.0f}ms,"
+            f" p99 {self.percentile(0.99) * 1000:.0f}ms, 최대 {self.max_seconds * 1000:.0f}ms,"
+            f" 목표({self.budget_seconds * 1000:.0f}ms) 초과 {self.over_budget}건"
+        )
+
+
+class StageTimer:
+    """with 블록의 소요 시간을 StageStats에 기록하는 헬퍼"""
+
+    def __init__(self, stats: StageStats):
+        self.stats = stats
+        self.items = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        if exc_type is not None:
+            self.stats.errors += 1
+        self.stats.record(self.items, duration)
+        return False
+
+
+async def report_loop(stages, interval_seconds: float, latencies=()) -> None:
+    """interval_seconds마다 단계별 처리량(아이템/초), 가동률, 큐 적체와 지연 통계를 출력합니다."""
+    previous = {stage.name: stage.snapshot() for stage in stages}
+    while True:
+        await asyncio.sleep(interval_seconds)
+        lines = []
+        for stage in stages:
+            now = stage.snapshot()
+            before = previous[stage.name]
+            rate = (now['items'] - before['items']) / interval_seconds
+            busy = (now['busy_seconds'] - before['busy_seconds']) / interval_seconds * 100
+            lines.append(
+                f"{stage.name}: {rate:.1f}건/s, 가동 {busy:.1f}%, 큐 {now['queue_depth']},"
+                f" 오류 {now['errors'] - before['errors']}, 드롭 {now['dropped'] - before['dropped']}"
+            )
+            previous[stage.name] = now
+        print("[파이프라인] " + " | ".join(lines))
+        for latency in latencies:
+            print(f"[지연] {latency.summary()}")
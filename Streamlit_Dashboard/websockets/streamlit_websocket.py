@@ -1,109 +1,504 @@
 import asyncio
 import websockets
-import boto3
 import json
 import os
+import sys
 import time
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from change_feed import ScanChangeFeed, StreamChangeFeed, InMemoryLoadcellTable, InMemoryChangeFeed, LocalChangeFeed
+from pole_stat_cache import PoleStatCache
+from fanout import DeltaFanout, wire_format
+from client_session import ClientSession
+from subscriptions import SubscriptionIndex, resolve_topics
+from history_writer import HistoryWriter, BucketHistoryWriter, RollupWriter
+from flow_estimator import FlowEstimator, parse_timestamp
+from alert_engine import AlertEngine, CRITICAL_KINDS
+from stage_stats import StageStats, StageTimer, LatencyStats, report_loop
+import metrics
 
-clients = set()
+# 대시보드와 같은 저장소/히스토리 설정(utils/)을 사용하기 위해 상위 디렉터리를 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import history_store, rollups, storage
+
+clients = {}  # websocket -> ClientSession
+health_state = {"last_poll_ok": None}  # 마지막으로 폴링에 성공한 시각 (monotonic, 헬스 체크용)
+subscriptions = SubscriptionIndex()  # 폴대/병동 구독 라우팅 인덱스
 
 # DynamoDB 설정
 TABLE_NAME = os.environ.get("DYNAMODB_TABLE", "loadcell")
 POLE_STAT_TABLE = os.environ.get("POLE_STAT_TABLE", "pole_stat")  # 배터리 데이터 테이블
-AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-2")
+AWS_REGION = storage.AWS_REGION  # AWS_REGION 환경 변수
+STORAGE_BACKEND = storage.STORAGE_BACKEND  # dynamodb / sqlite (STORAGE_BACKEND 환경 변수)
 POLL_INTERVAL_SECONDS = 1  # 데이터 읽기: 1초마다
-UPLOAD_INTERVAL_SECONDS = 60  # 히스토리 업로드: 60초마다
-
-dynamodb_client = boto3.client('dynamodb', region_name=AWS_REGION)
-# loadcell_history 테이블 리소스
-history_table = boto3.resource('dynamodb', region_name=AWS_REGION).Table('loadcell_history')
-
-def upload_history(loadcel, current_weight, remaining_sec, timestamp):
-    # 1주일(7일) 후 만료 시각 계산
-    expire_at = int(time.time()) + 7 * 24 * 60 * 60  # 현재 시각 + 7일(초)
-    item = {
-        'loadcel': str(loadcel),
-        'current_weight_history': str(current_weight),
-        'remaining_sec_history': str(remaining_sec),
-        'timestamp': timestamp,
-        'expire_at': expire_at  # TTL 필드 추가
-    }
-    history_table.put_item(Item=item)
-    print(f"[히스토리 업로드] {item}")
+POLL_DEBUG_LOG = os.environ.get("POLL_DEBUG_LOG", "1") == "1"  # 수신 아이템마다 디버그 출력 (부하 시험에서는 끔)
+LOADCELL_SCAN_SEGMENTS = int(os.environ.get("LOADCELL_SCAN_SEGMENTS", "1"))  # loadcell 병렬 scan 세그먼트 수
+LOADCELL_ATTRIBUTES = ("loadcel", "current_weight", "nurse_call", "remaining_sec", "timestamp")  # normalize_item이 쓰는 속성만 읽기
+# 히스토리 기록 설정 (write-behind)
+HISTORY_TABLE = history_store.HISTORY_TABLE  # 행 단위 형식 테이블 (HISTORY_TABLE 환경 변수)
+HISTORY_LAYOUT = history_store.HISTORY_LAYOUT  # row: 샘플당 1행 / bucket: 폴대 x 시간 버킷당 1아이템
+HISTORY_SAMPLE_SECONDS = float(os.environ.get("HISTORY_SAMPLE_SECONDS", "60"))  # 폴대별 히스토리 샘플링 주기
+HISTORY_FLUSH_SECONDS = float(os.environ.get("HISTORY_FLUSH_SECONDS", "10"))  # 버퍼 일괄 기록 주기
+HISTORY_BUFFER_SIZE = int(os.environ.get("HISTORY_BUFFER_SIZE", "10000"))  # 버퍼 최대 행 수
+# 다중 해상도 롤업 설정 (수신 레코드마다 1분/1시간/1일 집계 갱신)
+ROLLUP_ENABLED = os.environ.get("ROLLUP_ENABLED", "1") == "1"
+ROLLUP_TABLE = rollups.ROLLUP_TABLE  # ROLLUP_TABLE 환경 변수
+ROLLUP_FLUSH_SECONDS = float(os.environ.get("ROLLUP_FLUSH_SECONDS", "30"))  # 바뀐 구간 일괄 기록 주기
+ROLLUP_LATE_SECONDS = float(os.environ.get("ROLLUP_LATE_SECONDS", "120"))  # 구간 종료 후 늦은 샘플 허용 시간
+POLE_STAT_REFRESH_SECONDS = int(os.environ.get("POLE_STAT_REFRESH_SECONDS", "30"))  # 배터리 캐시 일괄 갱신 주기
+POLE_STAT_TTL_SECONDS = int(os.environ.get("POLE_STAT_TTL_SECONDS", "120"))  # 배터리 캐시 항목 유효 시간
+# 클라이언트별 송신 큐 설정
+CLIENT_QUEUE_SIZE = int(os.environ.get("CLIENT_QUEUE_SIZE", "32"))  # 클라이언트당 대기 프레임 수 상한
+CLIENT_DROP_POLICY = os.environ.get("CLIENT_DROP_POLICY", "coalesce")  # drop_oldest / coalesce
+CLIENT_EVICT_SECONDS = float(os.environ.get("CLIENT_EVICT_SECONDS", "10"))  # 포화 지속 시 연결 종료까지의 시간
+CLIENT_SEND_TIMEOUT = float(os.environ.get("CLIENT_SEND_TIMEOUT", "5"))  # 프레임 1개 전송 제한 시간
+REPLAY_BUFFER_SIZE = int(os.environ.get("REPLAY_BUFFER_SIZE", "300"))  # 재접속 재전송용 delta 보관 개수 (틱 단위)
+# 파이프라인 설정
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "64"))  # 단계 사이 큐 크기
+AWS_IO_WORKERS = int(os.environ.get("AWS_IO_WORKERS", "8"))  # 블로킹 boto3 호출용 스레드 수
+STATS_INTERVAL_SECONDS = int(os.environ.get("STATS_INTERVAL_SECONDS", "60"))  # 단계별 처리량 출력 주기
+# 투여 속도/남은 시간 추정 설정
+FLOW_TAU_SECONDS = float(os.environ.get("FLOW_TAU_SECONDS", "600"))  # 추정 가중치 시간 상수 (최근 샘플 우선)
+FLOW_MIN_SAMPLES = int(os.environ.get("FLOW_MIN_SAMPLES", "30"))  # 추세 추정에 필요한 유효 샘플 수
+# 알림 엔진 설정 (임계값은 대시보드 기본값과 동일)
+ALERT_ALMOST_WEIGHT = float(os.environ.get("ALERT_ALMOST_WEIGHT", "300"))  # 거의 다 됨 알림 기준 무게 (g)
+ALERT_DONE_WEIGHT = float(os.environ.get("ALERT_DONE_WEIGHT", "150"))  # 투여 완료 알림 기준 무게 (g)
+ALERT_BATTERY_LEVEL = int(os.environ.get("ALERT_BATTERY_LEVEL", "1"))  # 이 레벨 이하이면 배터리 부족 알림
+ALERT_FLAP_SECONDS = float(os.environ.get("ALERT_FLAP_SECONDS", "5"))  # 무게/배터리 알림 해제 확정 대기 시간 (경계 흔들림 흡수)
+POLE_LOST_SECONDS = float(os.environ.get("POLE_LOST_SECONDS", "60"))  # 이 시간 동안 수신이 없으면 폴대 연결 끊김 (0이면 끔)
+POLE_FORGET_SECONDS = float(os.environ.get("POLE_FORGET_SECONDS", "600"))  # 이 시간 동안 수신이 없으면 폴대 알림 상태 정리 (0이면 끔)
+# 긴급 알림 우선 경로 설정 (너스콜 / 투여 완료 / 연결 끊김)
+PRIORITY_QUEUE_SIZE = int(os.environ.get("PRIORITY_QUEUE_SIZE", "1024"))  # 우선 경로 큐 크기
+PRIORITY_LATENCY_BUDGET_MS = float(os.environ.get("PRIORITY_LATENCY_BUDGET_MS", "200"))  # 수집~송신 큐 지연 목표
+# 메트릭/헬스 체크 HTTP 엔드포인트 설정 (웹소켓 서버와 같은 이벤트 루프에서 실행)
+METRICS_HOST = os.environ.get("METRICS_HOST", "0.0.0.0")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))  # 0이면 사용 안 함
+HEALTH_MAX_POLL_AGE_SECONDS = float(os.environ.get("HEALTH_MAX_POLL_AGE_SECONDS", "15"))  # 마지막 폴링 성공 후 허용 시간
+# 변경분 수집 방식: scan(전체 scan + 워터마크), stream(DynamoDB Streams 커서, sqlite 백엔드는 변경 순번 커서), memory(로컬 스탠드인)
+INGEST_MODE = os.environ.get("INGEST_MODE", "scan")
 
-async def broadcast_data():
-    last_upload_time = 0  # 마지막 업로드 시간 추적
+# DynamoDB client 또는 같은 호출 형식의 로컬 SQLite 저장소
+dynamodb_client = storage.get_client()
+# loadcell_history write-behind 기록기 (HISTORY_LAYOUT=bucket이면 시간 버킷 테이블에 기록)
+if HISTORY_LAYOUT == history_store.BUCKET:
+    history_writer = BucketHistoryWriter(
+        dynamodb_client, history_store.HISTORY_BUCKET_TABLE,
+        sample_interval_seconds=HISTORY_SAMPLE_SECONDS,
+        max_buffer=HISTORY_BUFFER_SIZE,
+        bucket_seconds=history_store.HISTORY_BUCKET_SECONDS
+    )
+else:
+    history_writer = HistoryWriter(
+        dynamodb_client, HISTORY_TABLE,
+        sample_interval_seconds=HISTORY_SAMPLE_SECONDS,
+        max_buffer=HISTORY_BUFFER_SIZE
+    )
+# 1분/1시간/1일 롤업 기록기 (통계/보고서 페이지가 원본 히스토리 대신 읽음)
+rollup_writer = RollupWriter(
+    dynamodb_client, ROLLUP_TABLE,
+    late_seconds=ROLLUP_LATE_SECONDS,
+    max_buffer=HISTORY_BUFFER_SIZE
+) if ROLLUP_ENABLED else None
+# pole_stat 배터리/상태 캐시 (별도 주기로 브로드캐스트 중인 폴대마다 최신 한 건씩 갱신)
+pole_stat_cache = PoleStatCache(dynamodb_client, POLE_STAT_TABLE, ttl_seconds=POLE_STAT_TTL_SECONDS,
+                                pole_ids=lambda: list(fanout.snapshot))
+# 변경분 fanout 엔진 (최신 전체 상태 + 재전송 버퍼 보관)
+fanout = DeltaFanout(replay_capacity=REPLAY_BUFFER_SIZE)
+# 폴대별 투여 속도 / 남은 시간 추정기 (수집 시점에 한 번만 계산)
+flow_estimator = FlowEstimator(tau_seconds=FLOW_TAU_SECONDS, min_samples=FLOW_MIN_SAMPLES)
+# 알림 평가 엔진 (샘플마다 한 번 평가, 상태 전이만 알림 채널로 전송)
+alert_engine = AlertEngine(
+    almost_weight=ALERT_ALMOST_WEIGHT,
+    done_weight=ALERT_DONE_WEIGHT,
+    battery_level_threshold=ALERT_BATTERY_LEVEL,
+    flap_seconds=ALERT_FLAP_SECONDS,
+    lost_seconds=POLE_LOST_SECONDS,
+    forget_seconds=POLE_FORGET_SECONDS
+)
+# INGEST_MODE=memory일 때 사용하는 로컬 loadcell 테이블 (오프라인 실행/벤치마크용)
+local_loadcell_table = InMemoryLoadcellTable()
+
+def create_change_feed(mode=INGEST_MODE):
+    """INGEST_MODE에 맞는 loadcell 변경분 피드를 생성합니다."""
+    if mode == "stream":
+        if STORAGE_BACKEND == storage.SQLITE:
+            # 로컬 저장소는 Streams 대신 변경 순번 커서로 변경분만 읽습니다.
+            return LocalChangeFeed(dynamodb_client, TABLE_NAME)
+        return StreamChangeFeed(dynamodb_client, storage.get_streams_client(), TABLE_NAME,
+                                segments=LOADCELL_SCAN_SEGMENTS, attributes=LOADCELL_ATTRIBUTES)
+    if mode == "memory":
+        return InMemoryChangeFeed(local_loadcell_table)
+    return ScanChangeFeed(dynamodb_client, TABLE_NAME, segments=LOADCELL_SCAN_SEGMENTS, attributes=LOADCELL_ATTRIBUTES)
+
+def normalize_item(item):
+    """DynamoDB loadcell 아이템을 브로드캐스트용 레코드로 변환합니다. 필수 값이 없으면 None"""
+    loadcel_id = item.get('loadcel', {}).get('S')
+    current_weight = item.get('current_weight', {}).get('S')
+    nurse_call = item.get('nurse_call', {}).get('BOOL')
+    remaining_sec = item.get('remaining_sec', {}).get('S')
+    timestamp = item.get('timestamp', {}).get('S')
+    
+    # 배터리 데이터는 pole_stat 캐시에서 메모리 조회 (틱 경로에서 DynamoDB 호출 없음)
+    battery_level = pole_stat_cache.battery_level(loadcel_id)
+    
+    # 디버그용 출력
+    if POLL_DEBUG_LOG:
+        print(f"[DynamoDB 폴링] id: {loadcel_id}, 무게: {current_weight}, 배터리 레벨: {battery_level}, 너스콜: {nurse_call}, 남은시간: {remaining_sec}")
     
+    if loadcel_id and current_weight is not None and remaining_sec is not None and timestamp is not None:
+        return {
+            "loadcel": loadcel_id,
+            "current_weight": current_weight,
+            "battery_level": battery_level,  # 배터리 레벨 추가
+            "nurse_call": nurse_call,
+            "remaining_sec": remaining_sec,
+            "timestamp": timestamp
+        }
+    return None
+
+def critical_record(item):
+    """
+    원시 아이템에서 긴급 알림 평가에 필요한 필드만 꺼내, 긴급 레코드이면 반환합니다. (아니면 None)
+    배터리 조회나 디버그 출력 없이 수집 직후 바로 호출할 수 있도록 가볍게 유지합니다.
+    """
+    record = {
+        "loadcel": item.get('loadcel', {}).get('S'),
+        "current_weight": item.get('current_weight', {}).get('S'),
+        "nurse_call": item.get('nurse_call', {}).get('BOOL'),
+        "timestamp": item.get('timestamp', {}).get('S'),
+    }
+    if record["loadcel"] and alert_engine.is_critical(record):
+        return record
+    return None
+
+# ====== 파이프라인 단계 ======
+# poller -> (raw_queue) -> normalizer -> (estimate_queue) -> estimator -> (fanout_queue) -> fanout
+#    |                                                               \-> (history_queue) -> history -> (버퍼) -> history_writer 일괄 기록
+#    |                                                                                            \-> (롤업 구간) -> rollup_writer 일괄 기록
+#    \-> (priority_queue) -> priority: 긴급 알림(너스콜/투여 완료/연결 끊김)은 일반 단계를 거치지 않고 즉시 전송
+# 블로킹 boto3 호출은 모두 스레드 풀(run_in_executor)에서 실행되어 이벤트 루프를 막지 않습니다.
+
+async def poller_stage(feed, out_queue, priority_queue, stats, priority_stats):
+    """loadcell 변경분을 POLL_INTERVAL_SECONDS 주기로 읽어 raw_queue에, 긴급 레코드는 priority_queue에도 넣습니다."""
+    loop = asyncio.get_running_loop()
     while True:
+        started = time.monotonic()
         try:
-            current_time = time.time()
-            
-            # 1. loadcell 테이블에서 수액 데이터 가져오기
-            response = dynamodb_client.scan(TableName=TABLE_NAME)
-            items = response.get('Items', [])
-            
+            with StageTimer(stats) as timer:
+                items = await loop.run_in_executor(None, feed.poll)
+                timer.items = len(items)
+            ingested_at = time.monotonic()
+            metrics.POLL_SECONDS.observe(stats.last_duration)
+            health_state["last_poll_ok"] = ingested_at
             for item in items:
-                loadcel_id = item.get('loadcel', {}).get('S')
-                current_weight = item.get('current_weight', {}).get('S')
-                nurse_call = item.get('nurse_call', {}).get('BOOL')
-                remaining_sec = item.get('remaining_sec', {}).get('S')
-                timestamp = item.get('timestamp', {}).get('S')
-                
-                # 2. pole_stat 테이블에서 배터리 데이터 가져오기
-                battery_level = None
+                record = critical_record(item)
+                if record is None:
+                    continue
                 try:
-                    pole_response = dynamodb_client.query(
-                        TableName=POLE_STAT_TABLE,
-                        KeyConditionExpression='pole_id = :pole_id',
-                        ExpressionAttributeValues={':pole_id': {'S': str(loadcel_id)}},  # 문자열(S) 타입으로 변경
-                        ScanIndexForward=False,  # 최신순 정렬
-                        Limit=1
-                    )
-                    pole_items = pole_response.get('Items', [])
-                    if pole_items:
-                        battery_level = pole_items[0].get('battery_level', {}).get('N')
-                except Exception as e:
-                    print(f"배터리 데이터 조회 실패 (폴대 {loadcel_id}): {e}")
-                
-                # 디버그용 출력
-                print(f"[DynamoDB 폴링] id: {loadcel_id}, 무게: {current_weight}, 배터리 레벨: {battery_level}, 너스콜: {nurse_call}, 남은시간: {remaining_sec}")
-                
-                if loadcel_id and current_weight is not None and remaining_sec is not None and timestamp is not None:
-                    data_to_send = {
-                        "loadcel": loadcel_id,
-                        "current_weight": current_weight,
-                        "battery_level": battery_level,  # 배터리 레벨 추가
-                        "nurse_call": nurse_call,
-                        "remaining_sec": remaining_sec,
-                        "timestamp": timestamp
-                    }
-                    
-                    # 연결된 모든 클라이언트에게 전송 (1초마다)
-                    if clients:
-                        await asyncio.gather(*[client.send(json.dumps(data_to_send)) for client in clients])
-                    
-                    # loadcell_history 테이블에 업로드 (60초마다)
-                    if current_time - last_upload_time >= UPLOAD_INTERVAL_SECONDS:
-                        upload_history(loadcel_id, current_weight, remaining_sec, timestamp)
-                        print(f"[히스토리 업로드] {item}")
-                        last_upload_time = current_time
-                        
+                    # 일반 단계가 밀려 있어도 기다리지 않도록 우선 경로 큐에 먼저 넣습니다.
+                    priority_queue.put_nowait((ingested_at, record))
+                except asyncio.QueueFull:
+                    priority_stats.dropped += 1  # 일반 경로의 fanout 단계에서 뒤늦게라도 평가됨
+            if items:
+                await out_queue.put(items)
+        except Exception as e:
+            metrics.DYNAMODB_ERRORS.inc(operation="poll")
+            print(f"DynamoDB 폴링 오류: {e}")
+        await asyncio.sleep(max(0.0, POLL_INTERVAL_SECONDS - (time.monotonic() - started)))
+
+async def normalizer_stage(in_queue, out_queue, stats):
+    """원시 아이템을 레코드로 변환해 estimator 단계로 보냅니다."""
+    while True:
+        items = await in_queue.get()
+        try:
+            with StageTimer(stats) as timer:
+                records = {}
+                for item in items:
+                    record = normalize_item(item)
+                    if record is not None:
+                        records[record["loadcel"]] = record
+                timer.items = len(records)
         except Exception as e:
-            print(f"DynamoDB 폴링/브로드캐스트 오류: {e}")
-        
-        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            print(f"데이터 변환 오류: {e}")
+            continue
+        if records:
+            await out_queue.put(records)
+
+async def estimator_stage(in_queue, fanout_queue, history_queue, stats, history_stats):
+    """레코드에 투여 속도/남은 시간 추정값을 붙여 fanout/history 단계로 나눠 보냅니다."""
+    while True:
+        records = await in_queue.get()
+        try:
+            with StageTimer(stats) as timer:
+                records = {pole_id: flow_estimator.update(record) for pole_id, record in records.items()}
+                timer.items = len(records)
+        except Exception as e:
+            print(f"남은 시간 추정 오류: {e}")
+            continue
+        await fanout_queue.put(records)
+        try:
+            # 히스토리 기록이 밀려도 브로드캐스트는 기다리지 않습니다.
+            history_queue.put_nowait(list(records.values()))
+        except asyncio.QueueFull:
+            history_stats.dropped += len(records)
+
+async def history_stage(in_queue, stats):
+    """
+    레코드를 폴대별 샘플링 주기에 맞춰 히스토리 버퍼에 쌓고, 레코드마다 롤업 구간을 갱신합니다.
+    (기록은 history_writer / rollup_writer가 각자 주기로 일괄 처리)
+    """
+    writer_dropped = history_writer.rows_dropped
+    while True:
+        records = await in_queue.get()
+        try:
+            with StageTimer(stats) as timer:
+                for record in records:
+                    if history_writer.offer(record):
+                        timer.items += 1
+                    if rollup_writer is not None:
+                        rollup_writer.offer(record)
+                # 기록기에서 버린 행은 증가분만 더함 (estimator_stage의 큐 포화 유실과 같은 카운터)
+                stats.dropped += history_writer.rows_dropped - writer_dropped
+                writer_dropped = history_writer.rows_dropped
+        except Exception as e:
+            print(f"히스토리 샘플링 오류: {e}")
+
+async def priority_stage(in_queue, stats, latency):
+    """
+    긴급 레코드를 받는 즉시 긴급 알림만 평가해 알림 채널로 보냅니다.
+    레코드가 없을 때는 주기적으로 연결 끊김(수신 없음) 폴대를 확인합니다.
+    """
+    last_lost_check = time.monotonic()
+    while True:
+        try:
+            batch = [await asyncio.wait_for(in_queue.get(), timeout=POLL_INTERVAL_SECONDS)]
+        except asyncio.TimeoutError:
+            batch = []
+        while not in_queue.empty():
+            batch.append(in_queue.get_nowait())
+        try:
+            with StageTimer(stats) as timer:
+                events = []
+                for ingested_at, record in batch:
+                    record_events = alert_engine.evaluate(record, kinds=CRITICAL_KINDS)
+                    events.extend(record_events)
+                    if record_events:
+                        latency.observe(time.monotonic() - ingested_at)
+                        metrics.PRIORITY_LATENCY_SECONDS.observe(time.monotonic() - ingested_at)
+                if time.monotonic() - last_lost_check >= POLL_INTERVAL_SECONDS:
+                    last_lost_check = time.monotonic()
+                    events.extend(alert_engine.check_lost())
+                    events.extend(alert_engine.confirm_clears())
+                timer.items = fanout.publish_alerts(events, subscriptions)
+        except Exception as e:
+            print(f"긴급 알림 전송 오류: {e}")
+
+async def fanout_stage(in_queue, stats):
+    """알림을 평가하고, 변경된 폴대만 프레임으로 묶어 구독에 맞는 클라이언트 송신 큐에 넣습니다."""
+    while True:
+        try:
+            records = await asyncio.wait_for(in_queue.get(), timeout=POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            records = {}
+        # 센서 timestamp 기준 경과 시간 (배터리만 바뀐 폴대는 예전 timestamp라 제외)
+        sensor_times = [parse_timestamp(record.get("timestamp")) for record in records.values()]
+        try:
+            with StageTimer(stats) as timer:
+                # loadcell 값은 그대로지만 배터리 상태만 바뀐 폴대도 변경분에 포함
+                for loadcel_id in pole_stat_cache.drain_changed():
+                    if loadcel_id in records or loadcel_id not in fanout.snapshot:
+                        continue
+                    record = dict(fanout.snapshot[loadcel_id])
+                    record["battery_level"] = pole_stat_cache.battery_level(loadcel_id)
+                    records[loadcel_id] = record
+                # 알림은 레코드마다 서버에서 한 번만 평가하고 상태가 바뀐 경우만 알림 채널로 전송
+                events = []
+                for record in records.values():
+                    events.extend(alert_engine.evaluate(record))
+                fanout.publish_alerts(events, subscriptions)
+                timer.items = fanout.publish(records.values(), subscriptions)
+            if timer.items:
+                metrics.FANOUT_SECONDS.observe(stats.last_duration)
+                now = time.time()
+                for sensor_time in sensor_times:
+                    if sensor_time is not None:
+                        metrics.SENSOR_AGE_SECONDS.observe(max(0.0, now - sensor_time))
+        except Exception as e:
+            print(f"브로드캐스트 오류: {e}")
+
+async def broadcast_data():
+    """폴링/우선 경로/변환/추정/히스토리/fanout 단계를 asyncio 큐로 연결해 실행합니다."""
+    feed = create_change_feed()
+    print(f"[수집 모드] {INGEST_MODE}")
+    
+    raw_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    estimate_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    fanout_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    history_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    priority_queue = asyncio.Queue(maxsize=PRIORITY_QUEUE_SIZE)
+    poller_stats = StageStats("poller")
+    priority_stats = StageStats("priority", priority_queue)
+    # 긴급 알림은 일반 틱과 별도의 지연 목표로 추적 (수집 완료 ~ 클라이언트 알림 채널 적재)
+    priority_latency = LatencyStats("priority", PRIORITY_LATENCY_BUDGET_MS / 1000)
+    normalizer_stats = StageStats("normalizer", raw_queue)
+    estimator_stats = StageStats("estimator", estimate_queue)
+    fanout_stats = StageStats("fanout", fanout_queue)
+    history_stats = StageStats("history", history_queue)
+    history_flush_stats = StageStats("history_flush")
+    stages = [poller_stats, priority_stats, normalizer_stats, estimator_stats, fanout_stats, history_stats,
+              history_flush_stats]
+    background = [history_writer.run(HISTORY_FLUSH_SECONDS, history_flush_stats)]
+    if rollup_writer is not None:
+        rollup_flush_stats = StageStats("rollup_flush")
+        stages.append(rollup_flush_stats)
+        background.append(rollup_writer.run(ROLLUP_FLUSH_SECONDS, rollup_flush_stats))
+    metrics.REGISTRY.register_collector(metrics.stage_collector(stages))
+    
+    await asyncio.gather(
+        poller_stage(feed, raw_queue, priority_queue, poller_stats, priority_stats),
+        priority_stage(priority_queue, priority_stats, priority_latency),
+        normalizer_stage(raw_queue, estimate_queue, normalizer_stats),
+        estimator_stage(estimate_queue, fanout_queue, history_queue, estimator_stats, history_stats),
+        fanout_stage(fanout_queue, fanout_stats),
+        history_stage(history_queue, history_stats),
+        *background,
+        report_loop(stages, STATS_INTERVAL_SECONDS, latencies=[priority_latency]),
+    )
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _parse_poles(value):
+    """"1,2,3" 또는 ["1", 2, ...] 형태의 폴대 목록을 문자열 리스트로 바꿉니다."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [pole.strip() for pole in value.split(",") if pole.strip()]
+    if isinstance(value, (list, tuple)):
+        return [str(pole) for pole in value]
+    return None
+
+def handle_client_message(session, message):
+    """
+    클라이언트 제어 메시지를 처리합니다.
+    - {"type": "resume", "epoch": ..., "last_seq": ...}: 놓친 delta(또는 스냅샷) 재전송
+    - {"type": "subscribe", "poles": [...], "ward": "..."}: 구독 교체 후 구독 폴대 스냅샷 전송
+    - {"type": "unsubscribe"}: 전체 구독으로 전환 후 전체 스냅샷 전송
+    """
+    try:
+        data = json.loads(message)
+    except (TypeError, ValueError):
+        return
+    if not isinstance(data, dict):
+        return
+    message_type = data.get("type")
+    if message_type == "resume":
+        fanout.sync_session(session, _parse_int(data.get("epoch")), _parse_int(data.get("last_seq")))
+    elif message_type in ("subscribe", "unsubscribe"):
+        topics = None
+        if message_type == "subscribe":
+            topics = resolve_topics(_parse_poles(data.get("poles")), data.get("ward"))
+        subscriptions.subscribe(session, topics)
+        print(f"[구독] {getattr(session.websocket, 'remote_address', None)}: {'전체' if topics is None else sorted(topics)}")
+        # 새로 구독한 폴대의 현재 상태와 발생 중인 알림을 바로 받을 수 있도록 스냅샷 전송
+        fanout.sync_session(session)
+        fanout.sync_alerts(session, alert_engine.active_events())
+
+def open_session(websocket, epoch=None, last_seq=None, topics=None, frame_format=wire_format.JSON):
+    """
+    연결 하나를 등록합니다: 송신 큐를 만들고, 구독을 설정하고, 스냅샷(또는 놓친 delta)과
+    발생 중인 알림을 큐에 넣은 뒤 clients에 추가합니다. (송신 태스크는 호출한 쪽에서 실행)
+
+    Returns:
+        ClientSession
+    """
+    session = ClientSession(
+        websocket,
+        epoch=fanout.replay.epoch,
+        max_queue=CLIENT_QUEUE_SIZE,
+        policy=CLIENT_DROP_POLICY,
+        evict_after_seconds=CLIENT_EVICT_SECONDS,
+        send_timeout=CLIENT_SEND_TIMEOUT,
+        frame_format=frame_format
+    )
+    subscriptions.subscribe(session, topics)
+    # 접속 즉시 스냅샷(또는 놓친 delta)을 큐에 넣은 뒤 등록하므로 이후 delta와 순서가 보장됩니다.
+    fanout.sync_session(session, epoch, last_seq)
+    fanout.sync_alerts(session, alert_engine.active_events())
+    clients[websocket] = session
+    return session
+
+def close_session(session):
+    """연결 종료 시 구독과 clients에서 제거합니다."""
+    subscriptions.remove(session)
+    clients.pop(session.websocket, None)
 
 async def handler(websocket, path=None):
-    clients.add(websocket)
+    # 재접속 클라이언트는 ws://host:6789/?epoch=...&last_seq=... 로 마지막 수신 위치를 알려줍니다.
+    # 접속 시점부터 구독하려면 ?poles=1,2 또는 ?ward=병동이름 을 함께 보냅니다.
+    # ?format=struct|msgpack 으로 바이너리 프레임을 요청할 수 있습니다 (미지원 시 json).
+    if path is None:
+        path = getattr(getattr(websocket, "request", None), "path", None) or getattr(websocket, "path", "")
+    query = parse_qs(urlparse(path or "").query, keep_blank_values=True)
+    session = open_session(
+        websocket,
+        epoch=_parse_int(query.get("epoch", [None])[0]),
+        last_seq=_parse_int(query.get("last_seq", [None])[0]),
+        topics=resolve_topics(_parse_poles(query.get("poles", [None])[0]), query.get("ward", [None])[0]),
+        frame_format=wire_format.negotiate(query.get("format", [None])[0])
+    )
+    sender_task = asyncio.create_task(session.run_sender())
     try:
-        await websocket.wait_closed()
+        async for message in websocket:
+            handle_client_message(session, message)
+    except websockets.ConnectionClosed:
+        pass
     finally:
-        clients.remove(websocket)
+        sender_task.cancel()
+        close_session(session)
+
+def health_check():
+    """
+    헬스 체크: 마지막 폴링 성공 후 HEALTH_MAX_POLL_AGE_SECONDS 이내이면 정상입니다.
+
+    Returns:
+        (정상 여부, 상세 정보 딕셔너리)
+    """
+    last_poll_ok = health_state["last_poll_ok"]
+    poll_age = None if last_poll_ok is None else round(time.monotonic() - last_poll_ok, 3)
+    healthy = poll_age is not None and poll_age <= HEALTH_MAX_POLL_AGE_SECONDS
+    return healthy, {
+        "ingest_mode": INGEST_MODE,
+        "last_poll_age_seconds": poll_age,
+        "clients": len(clients),
+        "epoch": fanout.replay.epoch,
+        "seq": fanout.replay.seq,
+        "history_pending": history_writer.pending(),
+        "rollup_pending": rollup_writer.pending() if rollup_writer is not None else None,
+    }
+
+metrics.CLIENTS.set_function(lambda: len(clients))
 
 async def main():
     print("WebSocket + DynamoDB 브로드캐스트 서버 실행!")
+    # run_in_executor(None, ...)와 asyncio.to_thread가 모두 이 스레드 풀을 사용합니다.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=AWS_IO_WORKERS, thread_name_prefix="aws-io")
+    )
+    # /metrics, /healthz는 같은 이벤트 루프의 별도 포트에서 제공
+    metrics_server = await metrics.serve_http(METRICS_HOST, METRICS_PORT, health_check) if METRICS_PORT else None
     async with websockets.serve(handler, "0.0.0.0", 6789):
-        await broadcast_data()  # 폴링 및 브로드캐스트 루프 실행
+        # 배터리 캐시는 브로드캐스트 틱과 독립된 느린 주기로 갱신
+        pole_stat_task = asyncio.create_task(pole_stat_cache.run(POLE_STAT_REFRESH_SECONDS))
+        try:
+            await broadcast_data()  # 폴링 및 브로드캐스트 루프 실행
+        finally:
+            pole_stat_task.cancel()
+            if metrics_server is not None:
+                metrics_server.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
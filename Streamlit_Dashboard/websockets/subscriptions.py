@@ -0,0 +1,113 @@
+"""
+폴대/병동 구독 인덱스 모듈
+
+클라이언트는 관심 있는 폴대 ID 목록 또는 병동(ward)을 구독합니다.
+- 구독하지 않은 클라이언트: 모든 폴대를 받습니다 (기존 동작).
+- 구독한 클라이언트: 구독한 폴대의 변경분만 받습니다.
+
+pole_id -> 구독 세션 집합의 역인덱스를 유지하므로, 틱마다 드는 라우팅 비용은
+(변경된 폴대 수 x 해당 폴대 구독자 수)에 비례하고 전체 클라이언트 수와는 무관합니다.
+
+병동 정의는 WARDS_FILE(JSON)에서 읽습니다:
+    {"3병동": ["1", "2"], "5병동": ["3"]}
+"""
+
+import json
+import os
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+WARDS_FILE = os.environ.get(
+    "WARDS_FILE", os.path.abspath(os.path.join(os.path.dirname(__file__), '../wards.json'))
+)
+
+
+def load_ward_poles(ward: str, wards_file: str = WARDS_FILE) -> Set[str]:
+    """
+    병동에 속한 폴대 ID 집합을 반환합니다.
+
+    Args:
+        ward: 병동 이름
+        wards_file: 병동 정의 JSON 파일 경로
+
+    Returns:
+        Set[str]: 폴대 ID 집합 (파일이나 병동이 없으면 빈 집합)
+    """
+    try:
+        with open(wards_file, 'r', encoding='utf-8') as f:
+            wards = json.load(f)
+    except FileNotFoundError:
+        print(f"[구독] 병동 정의 파일이 없습니다: {wards_file}")
+        return set()
+    except Exception as e:
+        print(f"[구독] 병동 정의 파일 로드 실패: {e}")
+        return set()
+    poles = wards.get(ward) if isinstance(wards, dict) else None
+    if poles is None:
+        print(f"[구독] 알 수 없는 병동: {ward}")
+        return set()
+    return set(map(str, poles))
+
+
+def resolve_topics(poles: Optional[Iterable] = None, ward: Optional[str] = None) -> Optional[FrozenSet[str]]:
+    """
+    구독 요청(폴대 목록 / 병동)을 폴대 ID 집합으로 바꿉니다.
+
+    Returns:
+        폴대 ID frozenset, 둘 다 지정하지 않았으면 None (전체 구독)
+    """
+    if poles is None and not ward:
+        return None
+    topics = set(map(str, poles or []))
+    if ward:
+        topics |= load_ward_poles(ward)
+    return frozenset(topics)
+
+
+class SubscriptionIndex:
+    """세션별 구독 폴대와 pole_id -> 세션 역인덱스"""
+
+    def __init__(self):
+        self._wildcard: Set = set()  # 전체 구독 세션
+        self._by_pole: Dict[str, Set] = {}  # pole_id -> 구독 세션 집합
+
+    def subscribe(self, session, topics: Optional[FrozenSet[str]]) -> None:
+        """세션의 구독을 topics로 교체합니다. (None이면 전체 구독)"""
+        self.remove(session)
+        session.topics = topics
+        if topics is None:
+            self._wildcard.add(session)
+            return
+        for pole_id in topics:
+            self._by_pole.setdefault(pole_id, set()).add(session)
+
+    def remove(self, session) -> None:
+        """세션을 인덱스에서 제거합니다."""
+        self._wildcard.discard(session)
+        for pole_id in getattr(session, 'topics', None) or ():
+            sessions = self._by_pole.get(pole_id)
+            if sessions is None:
+                continue
+            sessions.discard(session)
+            if not sessions:
+                del self._by_pole[pole_id]
+
+    @property
+    def wildcard(self) -> Set:
+        return self._wildcard
+
+    def route(self, changed: List[Dict], key: str = 'loadcel') -> Dict[object, List[Dict]]:
+        """
+        변경된 폴대 레코드(또는 알림 이벤트)를 구독 세션별로 나눕니다. (전체 구독 세션은 제외)
+
+        Args:
+            changed: 레코드 리스트
+            key: 레코드에서 폴대 ID를 담은 필드 이름
+
+        Returns:
+            세션 -> 해당 세션이 받을 레코드 리스트
+        """
+        routed: Dict[object, List[Dict]] = {}
+        for record in changed:
+            for session in self._by_pole.get(record[key], ()):
+                routed.setdefault(session, []).append(record)
+        return routed
@@ -0,0 +1,88 @@
+"""
+알림 엔진 회귀 테스트 (발생 → 해제 → 재발생)
+
+    python -m pytest websockets/test_alert_engine.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alert_engine import AlertEngine, DONE, NURSE_CALL, POLE_LOST
+
+
+def _states(events, kind):
+    return [event["state"] for event in events if event["kind"] == kind]
+
+
+def test_nurse_call_raise_after_clear_is_sent():
+    """해제된 너스콜이 다시 발생하면 간격과 관계없이 새 알림으로 보냅니다."""
+    engine = AlertEngine()
+    first = engine.evaluate({"loadcel": "1", "nurse_call": True}, now=0)
+    assert _states(first, NURSE_CALL) == ["raised"]
+    assert _states(engine.evaluate({"loadcel": "1", "nurse_call": False}, now=10), NURSE_CALL) == ["cleared"]
+    again = engine.evaluate({"loadcel": "1", "nurse_call": True}, now=11)
+    assert _states(again, NURSE_CALL) == ["raised"]
+    assert again[0]["event_id"] != first[0]["event_id"]
+    assert [event["kind"] for event in engine.active_events()] == [NURSE_CALL]
+
+
+def test_done_raise_after_confirmed_clear_is_sent():
+    """해제가 확정된 투여 완료 알림은 dedup 시간 안에 다시 발생해도 보냅니다."""
+    engine = AlertEngine(flap_seconds=5)
+    assert _states(engine.evaluate({"loadcel": "1", "current_weight": 100}, now=0), DONE) == ["raised"]
+    assert engine.evaluate({"loadcel": "1", "current_weight": 0}, now=10) == []  # 해제 보류
+    assert _states(engine.confirm_clears(now=15), DONE) == ["cleared"]
+    assert engine.active_events() == []
+    assert _states(engine.evaluate({"loadcel": "1", "current_weight": 100}, now=70), DONE) == ["raised"]
+
+
+def test_done_flapping_inside_hold_is_suppressed():
+    """해제 보류 시간 안에 다시 발생 조건이 되면 이벤트 없이 기존 알림을 유지합니다."""
+    engine = AlertEngine(flap_seconds=5)
+    raised = engine.evaluate({"loadcel": "1", "current_weight": 100}, now=0)
+    assert engine.evaluate({"loadcel": "1", "current_weight": 0}, now=10) == []
+    assert engine.evaluate({"loadcel": "1", "current_weight": 100}, now=12) == []
+    assert engine.confirm_clears(now=30) == []
+    assert [event for event in engine.active_events() if event["kind"] == DONE] == [raised[0]]
+    assert engine.events_suppressed == 2  # 투여 완료 + 거의 다 됨
+
+
+def test_pole_lost_raise_after_clear_is_sent():
+    """연결 끊김이 해제된 뒤 다시 끊기면 새 알림으로 보냅니다."""
+    engine = AlertEngine(lost_seconds=60)
+    engine.evaluate({"loadcel": "1"}, now=0)
+    assert _states(engine.check_lost(now=60), POLE_LOST) == ["raised"]
+    assert _states(engine.evaluate({"loadcel": "1"}, now=70), POLE_LOST) == ["cleared"]
+    assert _states(engine.check_lost(now=130), POLE_LOST) == ["raised"]
+
+
+def test_raise_in_same_record_as_last_clear_stays_active():
+    """폴대의 마지막 알림이 해제되는 레코드에서 발생한 알림도 활성 목록에 남아 다시 발생하지 않습니다."""
+    engine = AlertEngine()
+    engine.evaluate({"loadcel": "1", "current_weight": 100}, now=0)
+    assert engine.evaluate({"loadcel": "1", "current_weight": 1000}, now=1) == []  # 해제 보류
+    events = engine.evaluate({"loadcel": "1", "current_weight": 1000, "nurse_call": True}, now=10)
+    assert _states(events, DONE) == ["cleared"]
+    assert _states(events, NURSE_CALL) == ["raised"]
+    assert [event["kind"] for event in engine.active_events()] == [NURSE_CALL]
+    assert engine.evaluate({"loadcel": "1", "current_weight": 1000, "nurse_call": True}, now=11) == []
+
+
+def test_silent_pole_state_is_forgotten():
+    """오래 수신이 없는 폴대는 상태를 버리고 남은 알림을 해제합니다."""
+    engine = AlertEngine(lost_seconds=60, forget_seconds=600)
+    engine.evaluate({"loadcel": "1"}, now=0)
+    assert _states(engine.check_lost(now=60), POLE_LOST) == ["raised"]
+    assert _states(engine.check_lost(now=600), POLE_LOST) == ["cleared"]
+    assert engine.active_events() == []
+    assert engine.poles_evicted == 1
+    assert engine.check_lost(now=700) == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -1,14 +1,10 @@
 import streamlit as st
-import threading
-import queue
-import websocket
-import time
-import json
 from streamlit_autorefresh import st_autorefresh
 from utils.alert_utils import render_alert_sidebar, check_all_alerts
 from utils.auth_utils import require_auth, render_userbox, render_login_inline, get_current_user
 import os
 from utils.logo_utils import show_logo
+from utils.live_feed import sync_live_state
 
 # 페이지 설정
 st.set_page_config(
@@ -20,83 +16,9 @@ st.set_page_config(
 # 1초마다 자동 새로고침
 # st_autorefresh(interval=5000, key="main_refresh")
 
-# --- WebSocket 초기화 (백그라운드에서 실행) ---
-def ws_listener(q):
-    def on_message(ws, message):
-        print(f"[WebSocket] 메시지 수신: {message}")
-        q.put(message)
-
-    def on_error(ws, error):
-        print(f"[WebSocket] 오류 발생: {error}")
-
-    def on_close(ws, close_status_code, close_msg):
-        print(f"[WebSocket] 연결 종료됨: {close_status_code} {close_msg}")
-
-    def on_open(ws):
-        print("[WebSocket] 연결 성공")
-
-    ws = websocket.WebSocketApp("ws://localhost:6789",
-                              on_message=on_message,
-                              on_error=on_error,
-                              on_close=on_close,
-                              on_open=on_open)
-    ws.run_forever()
-
-# WebSocket 초기화 (세션 상태에 저장)
-if "queue" not in st.session_state:
-    st.session_state.queue = queue.Queue()
-
-if "loadcell_data" not in st.session_state:
-    st.session_state.loadcell_data = {}
-
-if "loadcell_history" not in st.session_state:
-    st.session_state.loadcell_history = {}
-
-# 스레드는 단 한 번만 시작되어야 합니다.
-if "ws_thread_started" not in st.session_state:
-    st.session_state.ws_thread_started = True
-    # 백그라운드에서 WebSocket 리스너 시작
-    threading.Thread(target=ws_listener, args=(st.session_state.queue,), daemon=True).start()
-    print("[Main] WebSocket 리스너 스레드 시작됨")
-
-# 백그라운드에서 메시지 처리 (데이터는 표시하지 않음)
-q = st.session_state.queue
-while not q.empty():
-    msg = q.get()
-    try:
-        data = json.loads(msg)
-        loadcel = data.get("loadcel")
-        if loadcel:
-            # float 캐스팅 시도
-            try:
-                current_weight = float(data.get("current_weight", 0))
-            except:
-                current_weight = 0
-            try:
-                remaining_sec = float(data.get("remaining_sec", -1))
-            except:
-                remaining_sec = -1
-            # 배터리 레벨 처리
-            try:
-                battery_level = int(data.get("battery_level", -1)) if data.get("battery_level") is not None else None
-            except:
-                battery_level = None
-            # 데이터를 세션 상태에 저장 (다른 페이지에서 사용)
-            st.session_state.loadcell_data[loadcel] = {
-                "current_weight": current_weight,
-                "remaining_sec": remaining_sec,
-                "battery_level": battery_level  # 배터리 레벨 추가
-            }
-            # 디버그용 출력
-            print(f"[로드셀 데이터] id: {loadcel}, 무게: {current_weight}, 배터리: {battery_level}, 남은 시간: {remaining_sec}")
-            # 무게 히스토리 저장 (최대 30개)
-            if loadcel not in st.session_state.loadcell_history:
-                st.session_state.loadcell_history[loadcel] = []
-            st.session_state.loadcell_history[loadcel].append(current_weight)
-            if len(st.session_state.loadcell_history[loadcel]) > 30:
-                st.session_state.loadcell_history[loadcel] = st.session_state.loadcell_history[loadcel][-30:]
-    except Exception as e:
-        print(f"메시지 파싱 오류: {msg} | 오류: {e}")
+# --- 실시간 데이터: 서버 프로세스 공용 수신기(LiveFeed)에서 읽기 ---
+# 최신값/히스토리를 세션 상태에 반영 (다른 페이지에서 사용)
+sync_live_state()
 
 render_login_inline(sidebar=False)
 user = get_current_user()
@@ -153,8 +75,6 @@ st.sidebar.markdown("---")
 # ====== 알림 리스트 초기화 ======
 if "alert_list" not in st.session_state:
     st.session_state.alert_list = []
-if "alert_flags" not in st.session_state:
-    st.session_state.alert_flags = set()
 
 # ====== 통합 알림 체크 ======
 check_all_alerts()